@@ -41,6 +41,7 @@ interface AccountRecord {
   org_id?: string | null;
   owner_email?: string | null;
   last_synced_at?: string | null;
+  provider_synced_at?: string | null;
   provider: string;
 }
 
@@ -219,6 +220,12 @@ export default function AccountDetailPage({ params }: { params: Promise<{ id: st
                     <span>{new Date(account.last_synced_at).toLocaleString()}</span>
                   </div>
                 )}
+                {account.provider_synced_at && (
+                  <div className="flex items-center gap-2">
+                    <span className="font-medium">Provider Synced:</span>
+                    <span>{new Date(account.provider_synced_at).toLocaleString()}</span>
+                  </div>
+                )}
               </div>
             </div>
             <div className="text-sm text-ons-grey-75 text-right space-y-1">
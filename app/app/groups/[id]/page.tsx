@@ -32,6 +32,7 @@ interface GroupDetails {
   email?: string;
   provider: string;
   last_synced_at: string | null;
+  provider_synced_at?: string | null;
   slug?: string | null;
 }
 
@@ -170,6 +171,12 @@ export default function GroupDetailsPage({ params }: { params: Promise<{ id: str
                     <span>{new Date(group.last_synced_at).toLocaleString()}</span>
                   </div>
                 )}
+                {group.provider_synced_at && (
+                  <div className="flex items-center gap-2">
+                    <span className="font-medium">Provider Synced:</span>
+                    <span>{new Date(group.provider_synced_at).toLocaleString()}</span>
+                  </div>
+                )}
               </div>
             </div>
             <div className="flex flex-col items-end gap-2 text-sm text-ons-grey-75">
@@ -134,7 +134,7 @@ export async function handleAccountDetail(req: NextRequest, id: string): Promise
     if (!provider || provider === 'aws') {
       const awsAcctSql = `
         SELECT id, account_id, name, email, status, joined_method, joined_at, org_id, parent_id,
-               owner_email, last_synced_at, 'aws' AS provider
+               owner_email, last_synced_at, ingestion_provider_synced_at($2, 'aws_organizations') AS provider_synced_at, 'aws' AS provider
         FROM aws_accounts
         WHERE id = $1 AND tenant_id = $2 AND deleted_at IS NULL
       `;
@@ -228,7 +228,7 @@ export async function handleAccountDetail(req: NextRequest, id: string): Promise
     if (!provider || provider === 'gcp') {
       const gcpProjSql = `
         SELECT id, project_id, project_number, display_name AS name, lifecycle_state AS status,
-               org_id, folder_id, labels, owner_email, last_synced_at, 'gcp' AS provider
+               org_id, folder_id, labels, owner_email, last_synced_at, ingestion_provider_synced_at($2, 'gcp_resource_manager') AS provider_synced_at, 'gcp' AS provider
         FROM gcp_projects
         WHERE id = $1 AND tenant_id = $2 AND deleted_at IS NULL
       `;
@@ -153,7 +153,7 @@ export async function handleGroupDetails(req: NextRequest, id: string): Promise<
     // Google Workspace
     if (!provider || provider === 'google') {
       const gwGroupSql = `
-        SELECT id, name, description, email, google_id, last_synced_at, 'google' AS provider
+        SELECT id, name, description, email, google_id, last_synced_at, ingestion_provider_synced_at($2, 'google_workspace') AS provider_synced_at, 'google' AS provider
         FROM google_workspace_groups
         WHERE id = $1 AND tenant_id = $2
       `;
@@ -180,7 +180,7 @@ export async function handleGroupDetails(req: NextRequest, id: string): Promise<
     // AWS Identity Center
     if (!group && (!provider || provider === 'aws')) {
       const awsGroupSql = `
-        SELECT id, display_name AS name, description, identity_store_id, group_id, last_synced_at, 'aws' AS provider
+        SELECT id, display_name AS name, description, identity_store_id, group_id, last_synced_at, ingestion_provider_synced_at($2, 'aws_identity_center') AS provider_synced_at, 'aws' AS provider
         FROM aws_identity_center_groups
         WHERE id = $1 AND tenant_id = $2
       `;
@@ -207,7 +207,7 @@ export async function handleGroupDetails(req: NextRequest, id: string): Promise<
     // GitHub
     if (!group && (!provider || provider === 'github')) {
       const ghGroupSql = `
-        SELECT id, name, description, slug, node_id, last_synced_at, 'github' AS provider
+        SELECT id, name, description, slug, node_id, last_synced_at, ingestion_provider_synced_at($2, 'github') AS provider_synced_at, 'github' AS provider
         FROM github_teams
         WHERE id = $1 AND tenant_id = $2
       `;
@@ -0,0 +1,55 @@
+-- =================================================================================================
+-- Ingestion Change Detection (PostgreSQL 18) - Multi-Tenant Version
+-- =================================================================================================
+-- Adds a content_hash to every provider-synced table. The ingestion upsert computes a digest of
+-- the columns it would overwrite and only rewrites a row when the digest differs, so unchanged
+-- rows produce no new heap tuple, index entries, TOAST chunks or WAL on each sync.
+--
+-- Skipped rows also keep their last_synced_at, which therefore records the last write, not the
+-- last sync that saw the row; an old value can mean "unchanged" as well as "gone at the source".
+-- ingestion_provider_synced_at() below gives the provider-level freshness to show next to it.
+-- With deletion detection on (07_ingestion_sync_generation.sql) every row a sync sees is
+-- re-stamped and rows it no longer sees are soft-deleted.
+-- =================================================================================================
+
+-- Google Workspace
+ALTER TABLE google_workspace_users        ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE google_workspace_groups       ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE google_workspace_memberships  ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- AWS IAM Identity Center
+ALTER TABLE aws_identity_center_users       ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE aws_identity_center_groups      ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE aws_identity_center_memberships ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- GitHub
+ALTER TABLE github_organisations                 ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_users                         ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_teams                         ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_org_memberships               ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_team_memberships              ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_repositories                  ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_repo_team_permissions         ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE github_repo_collaborator_permissions ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- AWS Organizations + account assignments
+ALTER TABLE aws_accounts            ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE aws_account_assignments ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- GCP Resource Manager
+ALTER TABLE gcp_organisations        ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE gcp_projects             ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE gcp_project_iam_bindings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- End of the provider's latest successful full run (targeted entity runs excluded) for a tenant.
+-- Reported next to a row's own last_synced_at, which stays the time the row was last written
+DROP FUNCTION IF EXISTS ingestion_last_synced_at(UUID, TEXT, TIMESTAMPTZ);
+CREATE OR REPLACE FUNCTION ingestion_provider_synced_at(p_tenant_id UUID, p_provider TEXT)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql STABLE AS $$
+    SELECT r.finished_at FROM ingestion_runs r
+     WHERE r.tenant_id = p_tenant_id AND r.provider = p_provider
+       AND r.status = 'SUCCESS' AND r.entity_type IS NULL
+     ORDER BY r.started_at DESC
+     LIMIT 1
+$$;
@@ -0,0 +1,126 @@
+-- =================================================================================================
+-- Ingestion Raw Response Blob Store (PostgreSQL 18) - Multi-Tenant Version
+-- =================================================================================================
+-- Opt-in content-addressed storage for provider raw_response payloads (INGESTION_RAW_BLOB_PROVIDERS).
+-- Each distinct payload is stored once per tenant in raw_response_blobs, keyed by the SHA-256 of
+-- its JSON text and LZ4-compressed by TOAST. Provider rows written in this mode keep '{}' in
+-- raw_response and reference the payload through raw_response_digest, so an unchanged payload is
+-- neither re-sent nor rewritten on later syncs.
+--
+-- Consumers should read raw_response through ingestion_raw_response() or the <table>_resolved
+-- views below: they have the table's columns, with raw_response holding the stored payload for
+-- blob-backed rows and the inline one otherwise.
+--
+-- Blobs no row references any more are removed by ingestion_prune_raw_blobs(), which the
+-- ingestion post-processing step runs for tenants with INGESTION_RAW_BLOB_PROVIDERS set.
+-- =================================================================================================
+
+CREATE TABLE IF NOT EXISTS raw_response_blobs (
+    tenant_id     UUID NOT NULL,
+    digest        TEXT NOT NULL,               -- hex SHA-256 of the JSON text
+    payload       JSONB NOT NULL,
+    payload_bytes INTEGER NOT NULL,            -- uncompressed JSON text size
+    created_at    TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (tenant_id, digest)
+) WITH (toast_tuple_target = 128);             -- compress payloads well below the 2 kB default
+
+-- LZ4 when the server was built with it (--with-lz4); pglz otherwise
+DO $$
+BEGIN
+    ALTER TABLE raw_response_blobs ALTER COLUMN payload SET COMPRESSION lz4;
+EXCEPTION WHEN feature_not_supported OR invalid_parameter_value THEN
+    RAISE NOTICE 'lz4 not available, raw_response_blobs keeps the default compression';
+END
+$$;
+
+-- Provider tables whose rows may reference a blob
+CREATE OR REPLACE FUNCTION ingestion_raw_blob_tables()
+RETURNS TEXT[]
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT ARRAY[
+        -- Google Workspace
+        'google_workspace_users', 'google_workspace_groups', 'google_workspace_memberships',
+        -- AWS IAM Identity Center
+        'aws_identity_center_users', 'aws_identity_center_groups', 'aws_identity_center_memberships',
+        -- GitHub
+        'github_organisations', 'github_users', 'github_teams', 'github_org_memberships',
+        'github_team_memberships', 'github_repositories', 'github_repo_team_permissions',
+        'github_repo_collaborator_permissions',
+        -- AWS Organizations + account assignments
+        'aws_accounts', 'aws_account_assignments',
+        -- GCP Resource Manager
+        'gcp_organisations', 'gcp_projects', 'gcp_project_iam_bindings'
+    ]
+$$;
+
+-- Inline payload, or the stored blob when the row references one
+CREATE OR REPLACE FUNCTION ingestion_raw_response(p_tenant_id UUID, p_raw JSONB, p_digest TEXT)
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    SELECT CASE
+        WHEN p_digest IS NULL THEN p_raw
+        ELSE COALESCE(
+            (SELECT b.payload FROM raw_response_blobs b
+              WHERE b.tenant_id = p_tenant_id AND b.digest = p_digest),
+            p_raw)
+    END
+$$;
+
+DO $$
+DECLARE
+    t    TEXT;
+    cols TEXT;
+BEGIN
+    FOREACH t IN ARRAY ingestion_raw_blob_tables() LOOP
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS raw_response_digest TEXT', t);
+        -- Referenced digests, for pruning; blob-backed rows only
+        EXECUTE format(
+            'CREATE INDEX IF NOT EXISTS %I ON %I (tenant_id, raw_response_digest) '
+            'WHERE raw_response_digest IS NOT NULL',
+            'idx_' || t || '_raw_digest', t);
+        -- Same columns as the table, raw_response resolved
+        SELECT string_agg(
+                   CASE WHEN column_name = 'raw_response'
+                        THEN 'ingestion_raw_response(t.tenant_id, t.raw_response, '
+                             't.raw_response_digest) AS raw_response'
+                        ELSE format('t.%I', column_name)
+                   END,
+                   ', ' ORDER BY ordinal_position)
+          INTO cols
+          FROM information_schema.columns
+         WHERE table_schema = current_schema() AND table_name = t;
+        -- Dropped first: earlier versions had an extra raw_response_resolved column
+        EXECUTE format('DROP VIEW IF EXISTS %I', t || '_resolved');
+        EXECUTE format(
+            'CREATE VIEW %I WITH (security_invoker = true) AS SELECT %s FROM %I t',
+            t || '_resolved', cols, t);
+    END LOOP;
+END
+$$;
+
+-- Delete the tenant's blobs that no provider row references and that are older than p_min_age.
+-- Blobs a running sync has just looked up (FOR KEY SHARE) are skipped. Returns the rows deleted.
+CREATE OR REPLACE FUNCTION ingestion_prune_raw_blobs(p_tenant_id UUID, p_min_age INTERVAL)
+RETURNS BIGINT
+LANGUAGE plpgsql AS $$
+DECLARE
+    t          TEXT;
+    unrefs     TEXT := '';
+    deleted    BIGINT;
+BEGIN
+    FOREACH t IN ARRAY ingestion_raw_blob_tables() LOOP
+        unrefs := unrefs || format(
+            ' AND NOT EXISTS (SELECT 1 FROM %I r WHERE r.tenant_id = b.tenant_id '
+            'AND r.raw_response_digest = b.digest)', t);
+    END LOOP;
+    EXECUTE format(
+        'DELETE FROM raw_response_blobs d WHERE (d.tenant_id, d.digest) IN ('
+        'SELECT b.tenant_id, b.digest FROM raw_response_blobs b '
+        'WHERE b.tenant_id = $1 AND b.created_at < NOW() - $2%s '
+        'FOR UPDATE SKIP LOCKED)', unrefs)
+    USING p_tenant_id, p_min_age;
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END
+$$;
@@ -3,63 +3,219 @@
 from __future__ import annotations
 
 import logging
+import os
 import time
 import traceback
 from abc import ABC, abstractmethod
-from typing import Any
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
 
+from scripts.ingestion.batching import BatchSizeTuner, estimate_row_bytes
+from scripts.ingestion.cassette import Cassette, open_cassette
+from scripts.ingestion.checkpoint import Checkpoint
 from scripts.ingestion.config import IngestionConfig
-from scripts.ingestion.db import Database
+from scripts.ingestion.db import Database, UpsertStats
+from scripts.ingestion.grants_backfill import GrantScope
+from scripts.ingestion.http_client import HttpClient
+from scripts.ingestion.metrics import DbMetrics, HttpMetrics
+from scripts.ingestion.pipeline import StageTimes, WritePipeline, prefetch
+from scripts.ingestion.projection import FieldMask
+from scripts.ingestion.rowmap import RowMapper
+from scripts.ingestion.spill import RowBuffer
+from scripts.ingestion.spool import Spool, SpoolBatch
 
 logger = logging.getLogger("ingestion.provider")
 
 
 class BaseProvider(ABC):
-    """Each provider overrides sync() and declares PROVIDER_NAME."""
+    """Each provider overrides sync() and declares PROVIDER_NAME.
+
+    SWEEP_TABLES lists the tables the provider fully re-lists on every sync;
+    rows in them that a successful run did not see are soft-deleted.
+
+    ENTITY_KINDS lists the entities (``repo``, ``group``, ...) whose subtree
+    sync_entity() can refresh on its own; such a run sweeps only the scopes
+    it registered with _sweep_scope().
+    """
 
     PROVIDER_NAME: str = ""
+    SWEEP_TABLES: tuple[str, ...] = ()
+    ENTITY_KINDS: tuple[str, ...] = ()
 
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         self.config = config
-        self.db = db
+        self.db = db.for_tenant(config.tenant_id)
         self.tenant_id = config.tenant_id
         self.batch_size = config.batch_size
+        self.load_method = (
+            "copy" if self.PROVIDER_NAME in config.copy_load_providers else "insert"
+        )
+        self.raw_blobs = self.PROVIDER_NAME in config.raw_blob_providers
+        self.raw_projection = self.PROVIDER_NAME in config.raw_projection_providers
+        self.stats = UpsertStats()
+        # Spooled batches of earlier, crashed runs written during this one
+        self.replayed = UpsertStats()
+        self._replayed_runs: dict[str, int] = {}
+        self.tuner = BatchSizeTuner(
+            config.batch_size,
+            target_seconds=config.batch_target_seconds,
+            enabled=config.adaptive_batching,
+        )
+        self.sync_generation: Optional[int] = None
+        self.spool: Optional[Spool] = None
+        self.pipeline: Optional[WritePipeline] = None
+        self.http: Optional[HttpClient] = None
+        # Recorded/replayed API traffic (INGESTION_CASSETTE_MODE)
+        self.cassette: Optional[Cassette] = open_cassette(config, self.PROVIDER_NAME)
+        self.checkpoint = Checkpoint()
+        self._run_id: Optional[str] = None
+        # The current run, full or targeted; stamped on every batch
+        self._batch_run_id: Optional[str] = None
+        self._checkpoint_saved = 0.0
+        self.stage_times = StageTimes()
+        self._seen: dict[str, int] = {}
+        self._masks: dict[tuple[RowMapper, ...], FieldMask] = {}
+        self._partial: dict[str, str] = {}
+        # Targeted runs: (table, scope) pairs to sweep, and the grants to
+        # rebuild afterwards; None for full syncs
+        self._scopes: Optional[list[tuple[str, dict[str, Any]]]] = None
+        self.grant_scopes: list[GrantScope] = []
 
     @abstractmethod
     def sync(self) -> dict[str, int]:
-        """Run the provider sync. Returns {entity_type: records_upserted}."""
+        """Run the provider sync. Returns {entity_type: records_upserted}.
+
+        Counts are rows actually written; unchanged rows are tallied in
+        self.stats and reported in ingestion_runs.run_metadata.
+        """
+
+    def sync_entity(self, kind: str, key: str) -> dict[str, int]:
+        """Refresh one entity of ENTITY_KINDS and its permissions.
 
-    def sync_with_tracking(self) -> dict[str, int]:
-        """Wrap sync() with ingestion_runs tracking and retry logic."""
+        Implementations upsert the entity's subtree, register each table
+        scope they fully re-listed with _sweep_scope() and the affected
+        grants in self.grant_scopes.
+        """
+        raise ValueError(f"{self.PROVIDER_NAME} cannot refresh a single {kind}")
+
+    def sync_with_tracking(
+        self, entity: Optional[tuple[str, str]] = None
+    ) -> dict[str, int]:
+        """Wrap sync() with ingestion_runs tracking and retry logic.
+
+        With ``entity`` (kind, key) only sync_entity() runs: the run is
+        recorded with that entity_type, is neither checkpointed nor resumed,
+        and sweeps only the scopes the refresh registered.
+        """
+        if entity is not None and entity[0] not in self.ENTITY_KINDS:
+            raise ValueError(
+                f"{self.PROVIDER_NAME} cannot refresh a single {entity[0]}"
+            )
+        if entity is None:
+            resumed_from = self._load_checkpoint()
+        else:
+            self.checkpoint, resumed_from = Checkpoint(), None
         run_id = self.db.record_run_start(
             tenant_id=self.tenant_id,
             provider=self.PROVIDER_NAME,
+            entity_type=":".join(entity) if entity else None,
+            metadata={"resumed_from": resumed_from} if resumed_from else None,
         )
+        self._run_id = run_id if entity is None else None
+        self._batch_run_id = run_id
+        self._scopes = [] if entity is not None else None
+        self.grant_scopes = []
+        self.stats = UpsertStats()
+        self.replayed = UpsertStats()
+        self._replayed_runs = {}
+        # A resumed run carries on counting from the interrupted one
+        self._seen = self.checkpoint.seen
+        self._partial = self.checkpoint.partial
+        metrics_before = self.db.metrics.snapshot()
+        http_before = self.http.metrics.snapshot() if self.http else {}
+        self.tuner.load(
+            self.db.get_last_run_metadata(self.tenant_id, self.PROVIDER_NAME).get(
+                "batch_sizes", {}
+            )
+        )
+        if self.config.detect_deletions and self.SWEEP_TABLES:
+            self.sync_generation = (
+                self.checkpoint.generation or self.db.next_sync_generation()
+            )
+        self.checkpoint.generation = self.sync_generation
+        self._checkpoint_saved = time.monotonic()
+        deferred = self._open_spool() or self._open_pipeline()
+        sync_start = time.monotonic()
         try:
-            results = self.sync()
-            total = sum(results.values())
+            results = self.sync() if entity is None else self.sync_entity(*entity)
+            # Every spooled or queued batch must be committed before
+            # counting/sweeping
+            self._close_writers()
+            total = self.stats.written if deferred else sum(results.values())
+            deleted = self._sweep_unseen()
             self.db.record_run_end(
                 run_id=run_id,
                 tenant_id=self.tenant_id,
                 status="SUCCESS",
                 records_upserted=total,
+                records_deleted=sum(deleted.values()),
+                metadata={
+                    **self.stats.as_dict(),
+                    "sync_generation": self.sync_generation,
+                    "deleted": deleted,
+                    "sweep_skipped": self._partial,
+                    "spool_replayed": self._replayed_summary(),
+                    "batch_sizes": self.tuner.snapshot(),
+                    "db": DbMetrics.summary(metrics_before, self.db.metrics.snapshot()),
+                    "http": self._http_summary(http_before),
+                    "pipeline": self._pipeline_summary(sync_start),
+                    **(
+                        {"checkpoint": None}
+                        if self._run_id and self.config.checkpoint_seconds > 0
+                        else {}
+                    ),
+                },
             )
             logger.info(
                 "Sync complete",
                 extra={
                     "provider": self.PROVIDER_NAME,
                     "records": total,
+                    "unchanged": self.stats.unchanged,
+                    "deleted": sum(deleted.values()),
                     "run_id": run_id,
                 },
             )
             return results
         except Exception as exc:
+            drained = True
+            try:
+                self._close_writers()
+            except Exception as writer_exc:
+                drained = False
+                logger.error("Spool/pipeline drain failed: %s", writer_exc)
+            # Everything the checkpoint covers is committed only if drained;
+            # otherwise the last periodic checkpoint stands
+            checkpoint = (
+                {"checkpoint": self._checkpoint_state()}
+                if drained and self._run_id and self.config.checkpoint_seconds > 0
+                else {}
+            )
             self.db.record_run_end(
                 run_id=run_id,
                 tenant_id=self.tenant_id,
                 status="FAILED",
                 error_message=str(exc)[:1000],
                 error_detail={"traceback": traceback.format_exc()},
+                metadata={
+                    **self.stats.as_dict(),
+                    "spool_replayed": self._replayed_summary(),
+                    "batch_sizes": self.tuner.snapshot(),
+                    "db": DbMetrics.summary(metrics_before, self.db.metrics.snapshot()),
+                    "http": self._http_summary(http_before),
+                    "pipeline": self._pipeline_summary(sync_start),
+                    **checkpoint,
+                },
             )
             logger.error(
                 "Sync failed: %s",
@@ -67,11 +223,441 @@ class BaseProvider(ABC):
                 extra={"provider": self.PROVIDER_NAME, "run_id": run_id},
             )
             raise
+        finally:
+            if self.cassette is not None:
+                self.cassette.close()
+
+    def _upsert(
+        self,
+        table: str,
+        columns: list[str],
+        rows: list[tuple],
+        conflict: list[str],
+        update: list[str],
+    ) -> int:
+        """Upsert one batch in its own transaction using the provider's load method.
+
+        Transient database errors retry just this batch (see
+        Database.run_transaction) instead of failing the whole sync.
+        Returns rows actually written; unchanged rows only bump self.stats.
+        With a spool the batch is appended to disk instead, committed later
+        by the spool writer, and the number of rows queued is returned; the
+        write pipeline does the same with a bounded in-memory queue.
+        """
+        self._seen[table] = self._seen.get(table, 0) + len(rows)
+        batch = SpoolBatch(
+            table,
+            columns,
+            list(rows),
+            conflict,
+            update,
+            self.sync_generation,
+            self._batch_run_id,
+        )
+        if self.spool is not None:
+            self.spool.append(batch)
+            return len(rows)
+        if self.pipeline is not None:
+            self.pipeline.append(batch)
+            return len(rows)
+        return self._write_batch(batch)
+
+    def _write_batch(self, batch: SpoolBatch) -> int:
+        stats = self.stats
+        if batch.run_id != self._batch_run_id:
+            # Left in the spool by an earlier run: not this run's rows
+            stats = self.replayed
+            origin = batch.run_id or "unknown"
+            self._replayed_runs[origin] = self._replayed_runs.get(origin, 0) + len(
+                batch.rows
+            )
+        start = time.monotonic()
+        written = self.db.upsert_in_transaction(
+            batch.table,
+            batch.columns,
+            batch.rows,
+            batch.conflict,
+            batch.update,
+            method=self.load_method,
+            stats=stats,
+            generation=batch.generation,
+            raw_blobs=self.raw_blobs,
+        )
+        self.tuner.observe(
+            batch.table,
+            len(batch.rows),
+            time.monotonic() - start,
+            estimate_row_bytes(batch.rows),
+        )
+        return written
+
+    def _upsert_rows(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple],
+        conflict: list[str],
+        update: list[str],
+    ) -> int:
+        """Upsert a full row set: serial batches, or Database.parallel_upsert
+        across config.write_workers connections when that is above 1.
+
+        Serial batches consume ``rows`` lazily.  parallel_upsert needs the
+        whole set to partition it by key, so it is collected first into a
+        RowBuffer; if that crosses INGESTION_SPILL_RSS_MB the set is spilled
+        to disk and streamed back in serial batches instead.  Neither is used
+        while a spool or write pipeline owns the writes.
+        """
+        workers = self.config.write_workers
+        if workers > 1 and self.spool is None and self.pipeline is None:
+            with RowBuffer(
+                self.config.spill_rss_bytes,
+                directory=self.config.spill_dir,
+                label=table,
+            ) as buffer:
+                buffer.extend(rows)
+                if buffer.spilled:
+                    return self._upsert_batches(
+                        table, columns, buffer, conflict, update
+                    )
+                if len(buffer) > self.batch_size:
+                    self._seen[table] = self._seen.get(table, 0) + len(buffer)
+                    timings: list[tuple[int, float, int]] = []
+                    written = self.db.parallel_upsert(
+                        table,
+                        columns,
+                        buffer.rows,
+                        conflict,
+                        update,
+                        workers=workers,
+                        batch_size=self.tuner.size_for(table),
+                        method=self.load_method,
+                        stats=self.stats,
+                        generation=self.sync_generation,
+                        raw_blobs=self.raw_blobs,
+                        timings=timings,
+                    )
+                    # Concurrent batches each take longer than a lone one
+                    # would; the tuner still sees what each commit cost
+                    for batch_rows, seconds, nbytes in timings:
+                        self.tuner.observe(table, batch_rows, seconds, nbytes)
+                    return written
+                return self._upsert_batches(
+                    table, columns, buffer.rows, conflict, update
+                )
+        return self._upsert_batches(table, columns, rows, conflict, update)
+
+    def _upsert_batches(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple],
+        conflict: list[str],
+        update: list[str],
+    ) -> int:
+        total = 0
+        for batch in self._batch_rows(rows, table=table):
+            total += self._upsert(table, columns, batch, conflict, update)
+        return total
+
+    # ------------------------------------------------------------------
+    # Write-ahead spool
+    # ------------------------------------------------------------------
+
+    def _open_spool(self) -> bool:
+        """Start the spool writer when INGESTION_SPOOL_DIR is set.
+
+        Segments a previous, crashed run left behind are replayed first and
+        reported under run_metadata["spool_replayed"].
+        """
+        if not self.config.spool_dir:
+            return False
+        self.spool = Spool(
+            os.path.join(
+                self.config.spool_dir, f"{self.tenant_id}-{self.PROVIDER_NAME}"
+            ),
+            self._write_batch,
+            segment_bytes=self.config.spool_segment_bytes,
+            max_stall_seconds=self.config.spool_max_stall_seconds,
+            is_retryable=self.db.is_retryable,
+        )
+        self.spool.start()
+        return True
+
+    def _replayed_summary(self) -> Optional[dict[str, Any]]:
+        """Rows replayed from earlier runs' spool segments, by origin run_id.
+
+        They are not counted in this run's records_upserted or row stats.
+        """
+        if not self._replayed_runs:
+            return None
+        return {"runs": dict(self._replayed_runs), **self.replayed.as_dict()}
+
+    def _close_spool(self) -> None:
+        """Drain and stop the spool writer (no-op without a spool)."""
+        spool, self.spool = self.spool, None
+        if spool is not None:
+            spool.close()
+
+    # ------------------------------------------------------------------
+    # Fetch/write pipeline
+    # ------------------------------------------------------------------
+
+    def _open_pipeline(self) -> bool:
+        """Start the pipeline writer when INGESTION_PIPELINE_DEPTH is above 0."""
+        self.stage_times = StageTimes()
+        if self.config.pipeline_depth <= 0:
+            return False
+        self.pipeline = WritePipeline(
+            self._write_batch, self.config.pipeline_depth, self.stage_times
+        )
+        self.pipeline.start()
+        return True
+
+    def _close_pipeline(self) -> None:
+        """Drain and stop the pipeline writer (no-op without a pipeline)."""
+        pipeline, self.pipeline = self.pipeline, None
+        if pipeline is not None:
+            pipeline.close()
+
+    def _pipeline_summary(self, sync_start: float) -> Optional[dict[str, Any]]:
+        if self.config.pipeline_depth <= 0 or self.config.spool_dir:
+            return None
+        summary = self.stage_times.summary(time.monotonic() - sync_start)
+        logger.info(
+            "Pipeline stages: fetch %.1fs, write %.1fs, wall %.1fs (%s-bound)",
+            summary["fetch_busy"],
+            summary["write_busy"],
+            summary["wall"],
+            summary["bound"],
+            extra={"provider": self.PROVIDER_NAME},
+        )
+        return summary
+
+    def _close_writers(self) -> None:
+        """Commit everything the spool or pipeline still holds, then stop them."""
+        try:
+            self._close_spool()
+        finally:
+            self._close_pipeline()
+
+    def _flush_writes(self) -> None:
+        """Wait until every spooled or queued batch is committed.
+
+        Call before reading back rows written earlier in the same sync.
+        """
+        if self.spool is not None:
+            self.spool.flush()
+        if self.pipeline is not None:
+            self.pipeline.flush()
+
+    # ------------------------------------------------------------------
+    # Checkpoint / resume
+    # ------------------------------------------------------------------
+
+    def _sweep_scope(self, table: str, **scope: Any) -> None:
+        """Sweep ``table`` rows matching ``scope`` after this targeted run.
+
+        Only for a scope the run re-listed in full; its listing calls raise
+        on API errors, so an empty listing is a real one.
+        """
+        if self._scopes is not None:
+            self._scopes.append((table, scope))
+
+    def _load_checkpoint(self) -> Optional[str]:
+        """Resume an interrupted run's checkpoint; returns that run's id.
+
+        Only with INGESTION_CHECKPOINT_SECONDS set, and only for the
+        provider's latest run if it started within
+        INGESTION_RESUME_MAX_AGE_MINUTES and did not succeed.
+        """
+        self.checkpoint = Checkpoint()
+        interval = self.config.checkpoint_seconds
+        if interval <= 0:
+            return None
+        found = self.db.get_resumable_checkpoint(
+            self.tenant_id,
+            self.PROVIDER_NAME,
+            self.config.resume_max_age_seconds,
+            live_seconds=2 * interval + 60,
+        )
+        if found is None:
+            return None
+        run_id, state = found
+        self.checkpoint = Checkpoint(state)
+        self.db.close_interrupted_run(
+            run_id, self.tenant_id, "Interrupted; resumed by a later run"
+        )
+        logger.info(
+            "Resuming interrupted run %s: %d steps done, %d in progress",
+            run_id,
+            len(self.checkpoint.done_steps),
+            len(self.checkpoint.steps),
+            extra={"provider": self.PROVIDER_NAME},
+        )
+        return run_id
+
+    def _checkpoint_state(self) -> dict[str, Any]:
+        return {**self.checkpoint.as_dict(), "saved_at": time.time()}
+
+    def _save_checkpoint(self, force: bool = False) -> None:
+        """Persist the checkpoint, at most every INGESTION_CHECKPOINT_SECONDS.
+
+        Queued writes are committed first, so the checkpoint never claims
+        progress the database does not hold.
+        """
+        interval = self.config.checkpoint_seconds
+        if interval <= 0 or self._run_id is None:
+            return
+        if not force and time.monotonic() - self._checkpoint_saved < interval:
+            return
+        self._flush_writes()
+        self.db.save_checkpoint(self._run_id, self.tenant_id, self._checkpoint_state())
+        self._checkpoint_saved = time.monotonic()
+
+    def _run_step(self, step: str, fn: Callable[[], int]) -> int:
+        """Run sync step ``step`` unless the interrupted run completed it."""
+        if self.checkpoint.done(step):
+            logger.info(
+                "Skipping %s, completed by the interrupted run",
+                step,
+                extra={"provider": self.PROVIDER_NAME},
+            )
+            return 0
+        result = fn()
+        self._complete_step(step)
+        return result
+
+    def _complete_step(self, step: str) -> None:
+        self.checkpoint.complete(step)
+        self._save_checkpoint(force=True)
+
+    def _finish_key(self, step: str, key: Any) -> None:
+        """Record that the per-item work of ``key`` in ``step`` is written."""
+        self.checkpoint.set_key(step, key)
+        self._save_checkpoint()
+
+    # ------------------------------------------------------------------
+    # Deletion detection (mark-and-sweep)
+    # ------------------------------------------------------------------
+
+    def _mark_partial(self, table: str, reason: str) -> None:
+        """Exclude a table from this run's sweep because its fetch was incomplete."""
+        if table not in self._partial:
+            logger.warning(
+                "Partial fetch for %s, deletion sweep will be skipped: %s",
+                table,
+                reason,
+                extra={"provider": self.PROVIDER_NAME},
+            )
+            self._partial[table] = reason
+
+    def _sweep_unseen(self) -> dict[str, int]:
+        """Soft-delete rows this run did not stamp. Returns {table: deleted}.
+
+        Only called after sync() returned normally.  Tables with a partial
+        fetch are skipped, and so are tables for which the run saw no rows at
+        all -- an empty listing is far more likely to be an API or permission
+        problem than a real mass deletion.  A targeted run sweeps only the
+        scopes it registered.
+        """
+        if self.sync_generation is None:
+            return {}
+        targets: list[tuple[str, Optional[dict[str, Any]]]] = []
+        if self._scopes is not None:
+            targets = [
+                (table, scope)
+                for table, scope in self._scopes
+                if table not in self._partial
+            ]
+        for table in self.SWEEP_TABLES if self._scopes is None else ():
+            if table in self._partial:
+                continue
+            if not self._seen.get(table):
+                self._partial[table] = "no rows seen"
+                continue
+            targets.append((table, None))
+
+        def sweep(cur) -> dict[str, int]:
+            deleted: dict[str, int] = {}
+            for table, scope in targets:
+                deleted[table] = deleted.get(table, 0) + self.db.sweep_unseen(
+                    cur, table, self.tenant_id, self.sync_generation, scope
+                )
+            return deleted
+
+        deleted = self.db.run_transaction(sweep, label="sweep")
+        for table, count in deleted.items():
+            if count:
+                logger.info("Soft-deleted %d unseen rows from %s", count, table)
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Field projection
+    # ------------------------------------------------------------------
+
+    def _field_mask(self, *mappers: RowMapper) -> Optional[FieldMask]:
+        """Allow-list for a listing that feeds ``mappers``; None when off."""
+        if not self.raw_projection:
+            return None
+        if mappers not in self._masks:
+            paths: list[str] = []
+            for mapper in mappers:
+                paths += mapper.paths
+                paths += self.config.raw_extra_fields.get(mapper.table, [])
+            self._masks[mappers] = FieldMask(paths)
+        return self._masks[mappers]
+
+    def _project(self, items: Iterable[Any], *mappers: RowMapper) -> Iterable[Any]:
+        """Trim ``items`` lazily to the field mask of ``mappers``."""
+        mask = self._field_mask(*mappers)
+        return items if mask is None else map(mask.apply, items)
 
     # ------------------------------------------------------------------
     # Pagination / rate-limiting helpers
     # ------------------------------------------------------------------
 
+    def _http_client(
+        self,
+        headers: dict[str, str],
+        endpoint: Optional[Callable[[str], str]] = None,
+    ) -> HttpClient:
+        """The provider's pooled REST client (see http_client.py).
+
+        Its metrics go to the database's metrics sink, and each run's
+        per-endpoint summary to run_metadata["http"].  An active cassette
+        records or replays its traffic.
+        """
+        self.http = HttpClient(
+            self.config.http,
+            headers=headers,
+            provider=self.PROVIDER_NAME,
+            sink=self.db.metrics.sink,
+            endpoint=endpoint,
+            mount=self.cassette.mount if self.cassette is not None else None,
+        )
+        return self.http
+
+    def _boto3_client(self, client: Any) -> Any:
+        """A boto3 client, behind the cassette when one is active."""
+        if self.cassette is not None:
+            self.cassette.boto3(client)
+        return client
+
+    def _grpc_client(self, name: str, factory: Callable[[], Any]) -> Any:
+        """A google-cloud client built by ``factory``, behind the cassette.
+
+        A replaying cassette serves the calls without building the client.
+        """
+        if self.cassette is not None:
+            return self.cassette.grpc_client(name, factory)
+        return factory()
+
+    def _http_summary(self, before: dict[str, Any]) -> Optional[dict[str, Any]]:
+        if self.http is None:
+            return None
+        return HttpMetrics.summary(before, self.http.metrics.snapshot())
+
     @staticmethod
     def _rate_limit_sleep(attempt: int, base_seconds: float = 1.0) -> None:
         """Exponential backoff sleep for rate limiting."""
@@ -80,7 +666,41 @@ class BaseProvider(ABC):
         logger.warning("Rate limited, sleeping %.1fs (attempt %d)", delay, attempt)
         time.sleep(delay)
 
-    def _batch_rows(self, rows: list[Any], size: int | None = None) -> list[list[Any]]:
-        """Split rows into batches of the configured size."""
-        size = size or self.batch_size
-        return [rows[i : i + size] for i in range(0, len(rows), size)]
+    def _batch_rows(
+        self,
+        rows: Iterable[Any],
+        size: int | None = None,
+        table: str | None = None,
+        step: str | None = None,
+    ) -> Iterator[list[Any]]:
+        """Split rows into batches, consuming ``rows`` lazily.
+
+        ``rows`` may be any iterable -- typically a provider's page iterator --
+        and is advanced one batch at a time, so only the current batch is held
+        in memory and it is yielded as soon as its last item has been fetched.
+
+        With the write pipeline on, iterators (not lists) are advanced by a
+        prefetch thread, so the next pages are fetched while this thread
+        builds rows and the writer commits earlier batches.
+
+        An explicit ``size`` wins; otherwise the size comes from the tuner for
+        ``table`` and is re-read before every batch, so feedback from the
+        previous batch's write applies to the next one.
+
+        With a checkpoint ``step`` (a listing that reports its pages to
+        self.checkpoint), the listing's cursor advances each time the caller
+        is done with a batch.
+        """
+        if self.pipeline is not None and not isinstance(rows, (list, tuple)):
+            rows = prefetch(rows, self.config.prefetch_items, self.stage_times)
+        it = iter(rows)
+        processed = 0
+        while True:
+            batch = list(islice(it, size or self.tuner.size_for(table)))
+            if not batch:
+                return
+            yield batch
+            if step is not None:
+                processed += len(batch)
+                self.checkpoint.advance(step, processed)
+                self._save_checkpoint()
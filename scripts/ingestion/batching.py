@@ -0,0 +1,121 @@
+"""Adaptive per-table batch sizing for provider writes.
+
+Rows of wide JSONB entities (Google Workspace users with projection="full")
+are an order of magnitude larger than membership rows, so no single static
+batch size suits every table.  BatchSizeTuner measures each write batch's
+latency and payload bytes and steers the batch size per table towards a
+target transaction duration, bounded by a byte budget per transaction.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+logger = logging.getLogger("ingestion.batching")
+
+MIN_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 10_000
+# Upper bound on payload per transaction, whatever the latency says
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+# Largest single adjustment step (grow x2 / shrink /2)
+MAX_STEP = 2.0
+
+
+def estimate_row_bytes(rows: Sequence[tuple]) -> int:
+    """Approximate wire size of a batch: text length plus 8 bytes per scalar."""
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, (str, bytes)):
+                total += len(value)
+            else:
+                total += 8
+    return total
+
+
+@dataclass
+class _TableState:
+    size: int
+    row_bytes: float = 0.0
+
+
+class BatchSizeTuner:
+    """Per-table batch size controller.
+
+    With ``enabled=False`` every table keeps ``initial_size``, which is the
+    pre-existing static behaviour.
+    """
+
+    def __init__(
+        self,
+        initial_size: int,
+        target_seconds: float = 1.0,
+        enabled: bool = True,
+    ) -> None:
+        self.initial_size = initial_size
+        self.target_seconds = target_seconds
+        self.enabled = enabled
+        self._tables: dict[str, _TableState] = {}
+
+    def size_for(self, table: Optional[str]) -> int:
+        if not self.enabled or table is None:
+            return self.initial_size
+        return self._state(table).size
+
+    def observe(self, table: str, rows: int, seconds: float, nbytes: int) -> None:
+        """Feed back one committed batch and adjust that table's size."""
+        if not self.enabled or rows <= 0:
+            return
+        state = self._state(table)
+        per_row = nbytes / rows
+        state.row_bytes = (
+            per_row if not state.row_bytes else 0.7 * state.row_bytes + 0.3 * per_row
+        )
+        # Short tail batches are dominated by fixed overhead; don't learn from them
+        if rows < state.size // 2 or seconds <= 0:
+            return
+
+        ideal = rows / seconds * self.target_seconds
+        step = min(max(ideal / state.size, 1 / MAX_STEP), MAX_STEP)
+        size = int(state.size * step)
+        if state.row_bytes:
+            size = min(size, int(MAX_BATCH_BYTES / state.row_bytes))
+        size = min(max(size, MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+        if size != state.size:
+            logger.debug(
+                "Batch size for %s: %d -> %d (%.2fs for %d rows, %.0f B/row)",
+                table,
+                state.size,
+                size,
+                seconds,
+                rows,
+                state.row_bytes,
+            )
+            state.size = size
+
+    def load(self, snapshot: dict[str, Any]) -> None:
+        """Warm-start from a previous run's snapshot()."""
+        if not self.enabled:
+            return
+        for table, saved in (snapshot or {}).items():
+            try:
+                size = min(max(int(saved["size"]), MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+                row_bytes = float(saved.get("row_bytes", 0.0))
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._tables[table] = _TableState(size=size, row_bytes=row_bytes)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Tuned state per table, stored in ingestion_runs.run_metadata."""
+        return {
+            table: {"size": state.size, "row_bytes": round(state.row_bytes)}
+            for table, state in self._tables.items()
+        }
+
+    def _state(self, table: str) -> _TableState:
+        state = self._tables.get(table)
+        if state is None:
+            state = self._tables[table] = _TableState(size=self.initial_size)
+        return state
@@ -0,0 +1,6 @@
+"""Ad-hoc performance benchmarks for the ingestion write path.
+
+Each module is runnable with ``python -m scripts.ingestion.benchmarks.<name>``
+against the database configured via DATABASE_URL / PG_* variables.  Rows are
+written under a throwaway tenant id and removed afterwards.
+"""
@@ -0,0 +1,95 @@
+"""Shared helpers for the ingestion benchmarks."""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Generator
+
+from dotenv import load_dotenv
+
+from scripts.ingestion.config import DatabaseConfig
+from scripts.ingestion.db import Database, create_database
+from scripts.ingestion.secrets import resolve_database_url
+
+# Column layout mirrors GitHubOrgProvider._upsert_repo_collab_perms
+COLLAB_TABLE = "github_repo_collaborator_permissions"
+COLLAB_COLUMNS = [
+    "tenant_id",
+    "repo_node_id",
+    "user_node_id",
+    "permission",
+    "is_outside_collaborator",
+    "raw_response",
+    "last_synced_at",
+]
+COLLAB_CONFLICT = ["tenant_id", "repo_node_id", "user_node_id"]
+COLLAB_UPDATE = ["permission", "is_outside_collaborator", "raw_response"]
+
+
+def open_database(max_connections: int = 10, backend: str = "psycopg2") -> Database:
+    """Connect using the same env resolution as the ingestion CLI."""
+    load_dotenv()
+    return create_database(
+        DatabaseConfig(
+            url=resolve_database_url(),
+            min_connections=1,
+            max_connections=max_connections,
+            backend=backend,
+        )
+    )
+
+
+def collab_rows(tenant_id: str, count: int, users_per_repo: int = 50) -> list[tuple]:
+    """Synthetic collaborator-permission rows with realistic raw_response size."""
+    rows = []
+    for i in range(count):
+        repo, user = divmod(i, users_per_repo)
+        payload = {
+            "login": f"user-{user}",
+            "id": user,
+            "node_id": f"U_bench{user:07d}",
+            "type": "User",
+            "site_admin": False,
+            "avatar_url": f"https://avatars.example.com/u/{user}?v=4",
+            "permissions": {
+                "admin": False,
+                "maintain": False,
+                "push": i % 3 == 0,
+                "triage": False,
+                "pull": True,
+            },
+            "role_name": "write" if i % 3 == 0 else "read",
+        }
+        rows.append(
+            (
+                tenant_id,
+                f"R_bench{repo:07d}",
+                f"U_bench{user:07d}",
+                "push" if i % 3 == 0 else "pull",
+                False,
+                json.dumps(payload),
+                "NOW()",
+            )
+        )
+    return rows
+
+
+def new_tenant_id() -> str:
+    return str(uuid.uuid4())
+
+
+def delete_tenant_rows(db: Database, table: str, tenant_id: str) -> None:
+    with db.transaction() as cur:
+        cur.execute(f"DELETE FROM {table} WHERE tenant_id = %s", (tenant_id,))
+
+
+@contextmanager
+def timed(results: dict[str, float], key: str) -> Generator:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[key] = time.perf_counter() - start
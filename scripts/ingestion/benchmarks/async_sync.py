@@ -0,0 +1,149 @@
+"""Benchmark: end-to-end sync time, thread-based Database vs AsyncDatabase.
+
+Simulates a paginated provider sync: every page costs ``--fetch-ms`` of
+network latency and yields ``--page-size`` collaborator-permission rows
+that are upserted in one transaction, bracketed by run tracking.
+
+  - thread: today's provider loop -- fetch a page, write it, fetch the next
+  - async:  one task per page on AsyncDatabase, at most ``--concurrency``
+            in flight, so fetches overlap each other and the writes
+
+Usage:
+  python -m scripts.ingestion.benchmarks.async_sync
+  python -m scripts.ingestion.benchmarks.async_sync --pages 400 --fetch-ms 50 --concurrency 4 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from scripts.ingestion.benchmarks._common import (
+    COLLAB_COLUMNS,
+    COLLAB_CONFLICT,
+    COLLAB_TABLE,
+    COLLAB_UPDATE,
+    collab_rows,
+    delete_tenant_rows,
+    new_tenant_id,
+    open_database,
+    timed,
+)
+from scripts.ingestion.config import DatabaseConfig
+from scripts.ingestion.db import Database
+from scripts.ingestion.db_async import AsyncDatabase
+from scripts.ingestion.secrets import resolve_database_url
+
+
+def _pages(rows: list[tuple], page_size: int) -> list[list[tuple]]:
+    return [rows[i : i + page_size] for i in range(0, len(rows), page_size)]
+
+
+def _thread_sync(db: Database, tenant_id: str, pages: list, fetch_s: float) -> int:
+    run_id = db.record_run_start(tenant_id, "benchmark", "async_sync")
+    total = 0
+    for page in pages:
+        time.sleep(fetch_s)
+        with db.transaction() as cur:
+            total += db.upsert_batch(
+                cur, COLLAB_TABLE, COLLAB_COLUMNS, page, COLLAB_CONFLICT, COLLAB_UPDATE
+            )
+    db.record_run_end(run_id, tenant_id, "SUCCESS", records_upserted=total)
+    return total
+
+
+async def _async_sync(
+    db: AsyncDatabase, tenant_id: str, pages: list, fetch_s: float, concurrency: int
+) -> int:
+    run_id = await db.record_run_start(tenant_id, "benchmark", "async_sync")
+    slots = asyncio.Semaphore(concurrency)
+
+    async def fetch_and_write(page: list[tuple]) -> int:
+        async with slots:
+            await asyncio.sleep(fetch_s)
+            async with db.transaction() as cur:
+                return await db.upsert_batch(
+                    cur,
+                    COLLAB_TABLE,
+                    COLLAB_COLUMNS,
+                    page,
+                    COLLAB_CONFLICT,
+                    COLLAB_UPDATE,
+                )
+
+    total = sum(await asyncio.gather(*(fetch_and_write(p) for p in pages)))
+    await db.record_run_end(run_id, tenant_id, "SUCCESS", records_upserted=total)
+    return total
+
+
+async def _run_async(
+    url: str, pool_size: int, tenant_id: str, pages: list, fetch_s: float, conc: int
+) -> int:
+    config = DatabaseConfig(
+        url=url, async_min_connections=pool_size, async_max_connections=pool_size
+    )
+    async with AsyncDatabase(config) as db:
+        return await _async_sync(db, tenant_id, pages, fetch_s, conc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--fetch-ms", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    db = open_database()
+    url = resolve_database_url()
+    fetch_s = args.fetch_ms / 1000
+    fmt = "{:<12}  {:>10}  {:>10}"
+    print(
+        f"{args.pages} pages x {args.page_size} rows, {args.fetch_ms:g} ms/fetch, "
+        f"async pool {args.pool_size}"
+    )
+    print(fmt.format("VARIANT", "TOTAL (s)", "ROWS/s"))
+    variants = [("thread", 0)] + [(f"async x{c}", c) for c in args.concurrency]
+    try:
+        for label, concurrency in variants:
+            tenant_id = new_tenant_id()
+            pages = _pages(
+                collab_rows(tenant_id, args.pages * args.page_size), args.page_size
+            )
+            timings: dict[str, float] = {}
+            try:
+                with timed(timings, "total"):
+                    if concurrency:
+                        written = asyncio.run(
+                            _run_async(
+                                url,
+                                args.pool_size,
+                                tenant_id,
+                                pages,
+                                fetch_s,
+                                concurrency,
+                            )
+                        )
+                    else:
+                        written = _thread_sync(db, tenant_id, pages, fetch_s)
+            finally:
+                delete_tenant_rows(db, COLLAB_TABLE, tenant_id)
+                with db.transaction() as cur:
+                    cur.execute(
+                        "DELETE FROM ingestion_runs WHERE tenant_id = %s", (tenant_id,)
+                    )
+            print(
+                fmt.format(
+                    label,
+                    f"{timings['total']:.2f}",
+                    f"{written / timings['total']:.0f}",
+                )
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Report: raw_response bytes and row-building time saved by field masks.
+
+For every RowMapper backed by a providerschema entity, builds a synthetic
+item holding every field path listed for that entity in
+providerschema/field_path_index.json (one element per list, one string per
+leaf), then compares the full item with its FieldMask projection
+(INGESTION_RAW_PROJECTION_PROVIDERS):
+
+  - bytes of raw_response as stored, full vs projected
+  - time to build a row (map + raw_response encoding); for Google the
+    projection is done by the API (fields= mask), elsewhere it is applied
+    per item and included in the projected time
+
+Entities without a schema (AWS Organizations, sso-admin assignments) are
+not listed.  API transfer time is not measured; for Google it shrinks
+with the same bytes.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.field_masks
+  python -m scripts.ingestion.benchmarks.field_masks --rows 100000 --masks
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable
+
+from scripts.ingestion.projection import FieldMask
+from scripts.ingestion.providers import (
+    aws_identity_center,
+    github_org,
+    google_workspace,
+)
+from scripts.ingestion.rowmap import FIELD_PATH_INDEX, RowMapper
+from scripts.ingestion.serialization import dumps
+
+# Listing -> mappers fed by it, as in the providers' _field_mask() calls
+LISTINGS: list[tuple[str, tuple[RowMapper, ...]]] = [
+    ("users", (google_workspace.USER_ROWS,)),
+    ("groups", (google_workspace.GROUP_ROWS,)),
+    ("members", (google_workspace.MEMBERSHIP_ROWS,)),
+    ("Users", (aws_identity_center.USER_ROWS,)),
+    ("Groups", (aws_identity_center.GROUP_ROWS,)),
+    ("GroupMemberships", (aws_identity_center.MEMBERSHIP_ROWS,)),
+    ("members", (github_org.USER_ROWS, github_org.ORG_MEMBERSHIP_ROWS)),
+    ("teams", (github_org.TEAM_ROWS,)),
+    ("team members", (github_org.TEAM_MEMBERSHIP_ROWS,)),
+    ("repos", (github_org.REPO_ROWS,)),
+    ("repo teams", (github_org.REPO_TEAM_ROWS,)),
+    ("collaborators", (github_org.COLLABORATOR_ROWS,)),
+]
+
+# Mapped fields outside the extracted schemas that are not plain strings
+_EXTRA_VALUES: dict[str, Any] = {
+    "permissions": {"admin": False, "maintain": False, "push": True, "pull": True},
+}
+
+
+def _set(node: dict, parts: list[str]) -> None:
+    key = "key" if parts[0] == "{*}" else parts[0]
+    rest = parts[1:]
+    if not rest:
+        node.setdefault(key, _EXTRA_VALUES.get(key, f"{key}-value"))
+    elif rest[0] == "[]":
+        items = node.get(key)
+        if len(rest) == 1:
+            if not isinstance(items, list):
+                node[key] = [f"{key}-1", f"{key}-2"]
+            return
+        if not (isinstance(items, list) and isinstance(items[0], dict)):
+            items = node[key] = [{}]
+        _set(items[0], rest[1:])
+    else:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            child = node[key] = {}
+        _set(child, rest)
+
+
+def _synthetic(paths: list[str], mapped: tuple[str, ...]) -> dict:
+    item: dict = {}
+    for path in sorted(paths, key=len):
+        _set(item, path.replace("[]", ".[]").split("."))
+    for path in mapped:
+        _set(item, path.split("."))
+    return item
+
+
+def _seconds(build: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument(
+        "--masks", action="store_true", help="print the Google fields= masks"
+    )
+    args = parser.parse_args()
+
+    with open(FIELD_PATH_INDEX) as fh:
+        index = json.load(fh)["field_paths"]
+
+    fmt = "{:<38}  {:>10}  {:>10}  {:>6}  {:>9}  {:>9}  {:>9}"
+    print(
+        fmt.format(
+            "TABLE",
+            "FULL B",
+            "KEPT B",
+            "SAVED",
+            "FULL us",
+            "KEPT us",
+            "GAINED",
+        )
+    )
+    masks = []
+    for listing, mappers in LISTINGS:
+        mask = FieldMask(path for m in mappers for path in m.paths)
+        provider, entity = mappers[0].schema
+        item = _synthetic(index[provider][entity], mask.paths)
+        kept = mask.apply(item)
+        if provider == "google_workspace":
+            masks.append((mappers[0].table, mask.google_fields(listing)))
+        for mapper in mappers:
+            extra = ("x",) * len(mapper.args)
+            items = [item] * args.rows
+            full = _seconds(lambda: mapper.rows(items, *extra))
+            if provider == "google_workspace":
+                projected = [kept] * args.rows
+                trimmed = _seconds(lambda: mapper.rows(projected, *extra))
+            else:
+                trimmed = _seconds(lambda: mapper.rows(map(mask.apply, items), *extra))
+            full_bytes = len(dumps(item).encode())
+            kept_bytes = len(dumps(kept).encode())
+            print(
+                fmt.format(
+                    mapper.table,
+                    f"{full_bytes:,}",
+                    f"{kept_bytes:,}",
+                    f"{1 - kept_bytes / full_bytes:.0%}",
+                    f"{full / args.rows * 1e6:.2f}",
+                    f"{trimmed / args.rows * 1e6:.2f}",
+                    f"{full / trimmed:.2f}x",
+                )
+            )
+    if args.masks:
+        print()
+        for table, fields in masks:
+            print(f"{table}: fields={fields}")
+
+
+if __name__ == "__main__":
+    main()
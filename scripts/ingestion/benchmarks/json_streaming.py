@@ -0,0 +1,140 @@
+"""Benchmark: whole-page JSON decoding vs jsonstream compact records.
+
+Builds a synthetic GitHub collaborator listing (the largest per-repo
+listing the GitHub provider reads) and turns it into
+github_repo_collaborator_permissions rows, batch by batch:
+
+  - page:   decode the body as a whole (resp.json()) and dumps() each item
+            back into raw_response -- the default path
+  - stream: iter_array_items + GitHubCollaborator.from_item, raw_response
+            taken from each element's original text (INGESTION_STREAM_JSON)
+
+Time is measured untraced; peak memory above the body itself is measured
+in a second run under tracemalloc.  No database or network is needed.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.json_streaming
+  python -m scripts.ingestion.benchmarks.json_streaming --items 200000 --chunk 65536
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+from scripts.ingestion.jsonstream import iter_array_items, raw_json
+from scripts.ingestion.providers.github_org import GitHubCollaborator
+from scripts.ingestion.serialization import loads
+
+
+def _body(items: int) -> bytes:
+    return json.dumps(
+        [
+            {
+                "login": f"user-{i}",
+                "id": i,
+                "node_id": f"U_bench{i:07d}",
+                "avatar_url": f"https://avatars.example.com/u/{i}?v=4",
+                "gravatar_id": "",
+                "url": f"https://api.github.com/users/user-{i}",
+                "html_url": f"https://github.com/user-{i}",
+                "followers_url": f"https://api.github.com/users/user-{i}/followers",
+                "repos_url": f"https://api.github.com/users/user-{i}/repos",
+                "type": "User",
+                "site_admin": False,
+                "permissions": {
+                    "admin": False,
+                    "maintain": False,
+                    "push": i % 3 == 0,
+                    "triage": i % 3 == 0,
+                    "pull": True,
+                },
+                "role_name": "write" if i % 3 == 0 else "read",
+            }
+            for i in range(items)
+        ]
+    ).encode()
+
+
+def _rows(items: Iterable[Any], batch_size: int) -> int:
+    """Build collaborator rows one batch at a time, like _upsert_rows."""
+    it = iter(items)
+    total = 0
+    while True:
+        batch = [
+            (
+                "tenant",
+                "R_bench",
+                c["node_id"],
+                "push" if c.get("permissions", {}).get("push") else "pull",
+                c.get("type") != "User",
+                raw_json(c),
+                "NOW()",
+            )
+            for c in islice(it, batch_size)
+        ]
+        if not batch:
+            return total
+        total += len(batch)
+
+
+def _measure(run: Callable[[], int]) -> tuple[int, float, int]:
+    start = time.perf_counter()
+    rows = run()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, seconds, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--chunk", type=int, default=0, help="feed the body in chunks of this size"
+    )
+    args = parser.parse_args()
+
+    fmt = "{:>8}  {:<7}  {:>9}  {:>12}  {:>13}"
+    print(fmt.format("ITEMS", "MODE", "TIME (s)", "PEAK (MiB)", "BODY (MiB)"))
+    for count in args.items:
+        body = _body(count)
+
+        def chunks() -> Iterator[bytes]:
+            size = args.chunk or len(body)
+            for i in range(0, len(body), size):
+                yield body[i : i + size]
+
+        modes = {
+            "page": lambda: _rows(loads(body), args.batch_size),
+            "stream": lambda: _rows(
+                (
+                    GitHubCollaborator.from_item(raw, data)
+                    for raw, data in iter_array_items(chunks())
+                ),
+                args.batch_size,
+            ),
+        }
+        for mode, run in modes.items():
+            rows, seconds, peak = _measure(run)
+            assert rows == count
+            print(
+                fmt.format(
+                    count,
+                    mode,
+                    f"{seconds:.2f}",
+                    f"{peak / 2**20:.1f}",
+                    f"{len(body) / 2**20:.1f}",
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
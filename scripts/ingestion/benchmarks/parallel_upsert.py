@@ -0,0 +1,105 @@
+"""Benchmark: serial _batch_rows loop vs Database.parallel_upsert.
+
+Writes a github_repo_collaborator_permissions-sized workload (default 200k
+rows: 4k repos x 50 collaborators) once serially -- one transaction per
+batch, exactly like the providers' _batch_rows loops -- and then with
+parallel_upsert at each worker count.  Every variant runs a cold pass
+(inserts) and a warm pass with every row changed (conflict updates).
+
+Usage:
+  python -m scripts.ingestion.benchmarks.parallel_upsert
+  python -m scripts.ingestion.benchmarks.parallel_upsert --rows 1000000 --workers 2 4 8
+  python -m scripts.ingestion.benchmarks.parallel_upsert --backend psycopg3
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from scripts.ingestion.benchmarks._common import (
+    COLLAB_COLUMNS,
+    COLLAB_CONFLICT,
+    COLLAB_TABLE,
+    COLLAB_UPDATE,
+    collab_rows,
+    delete_tenant_rows,
+    new_tenant_id,
+    open_database,
+    timed,
+)
+from scripts.ingestion.db import DB_BACKENDS, Database
+
+
+def _serial(db: Database, rows: list[tuple], batch_size: int) -> int:
+    total = 0
+    for i in range(0, len(rows), batch_size):
+        with db.transaction() as cur:
+            total += db.upsert_batch(
+                cur,
+                COLLAB_TABLE,
+                COLLAB_COLUMNS,
+                rows[i : i + batch_size],
+                COLLAB_CONFLICT,
+                COLLAB_UPDATE,
+            )
+    return total
+
+
+def _parallel(db: Database, rows: list[tuple], batch_size: int, workers: int) -> int:
+    return db.parallel_upsert(
+        COLLAB_TABLE,
+        COLLAB_COLUMNS,
+        rows,
+        COLLAB_CONFLICT,
+        COLLAB_UPDATE,
+        workers=workers,
+        batch_size=batch_size,
+    )
+
+
+def _changed(rows: list[tuple]) -> list[tuple]:
+    """Same keys with a different permission, so the warm pass really writes."""
+    return [row[:3] + ("admin",) + row[4:] for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--backend", choices=DB_BACKENDS, default="psycopg2")
+    args = parser.parse_args()
+
+    db = open_database(max_connections=max(args.workers) + 1, backend=args.backend)
+    fmt = "{:<12}  {:>10}  {:>10}  {:>12}"
+    print(f"{args.rows} rows, batch size {args.batch_size}, {args.backend}")
+    print(fmt.format("VARIANT", "COLD (s)", "WARM (s)", "ROWS/s WARM"))
+    variants = [("serial", 0)] + [(f"parallel x{w}", w) for w in args.workers]
+    try:
+        for label, workers in variants:
+            tenant_id = new_tenant_id()
+            rows = collab_rows(tenant_id, args.rows)
+            timings: dict[str, float] = {}
+            try:
+                for phase, data in (("cold", rows), ("warm", _changed(rows))):
+                    with timed(timings, phase):
+                        if workers:
+                            _parallel(db, data, args.batch_size, workers)
+                        else:
+                            _serial(db, data, args.batch_size)
+            finally:
+                delete_tenant_rows(db, COLLAB_TABLE, tenant_id)
+            print(
+                fmt.format(
+                    label,
+                    f"{timings['cold']:.2f}",
+                    f"{timings['warm']:.2f}",
+                    f"{args.rows / timings['warm']:.0f}",
+                )
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
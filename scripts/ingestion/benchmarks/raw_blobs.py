@@ -0,0 +1,143 @@
+"""Benchmark: inline raw_response vs the content-addressed raw_response_blobs.
+
+Seeds a throwaway tenant with synthetic github_repo_collaborator_permissions
+rows, once per mode, in three passes batched like BaseProvider._batch_rows:
+
+  - cold:    every row inserted
+  - changed: every row's permission flips (new payloads)
+  - revert:  the flip is undone, so every payload is one seen two runs ago
+
+and then reports the stored raw_response bytes (pg_column_size, i.e. after
+TOAST compression) for the tenant: the inline column, or the '{}'
+placeholders plus the tenant's blobs.  Requires
+schema/08_ingestion_raw_blobs.sql.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.raw_blobs
+  python -m scripts.ingestion.benchmarks.raw_blobs --rows 200000 --users-per-repo 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from scripts.ingestion.benchmarks._common import (
+    COLLAB_COLUMNS,
+    COLLAB_CONFLICT,
+    COLLAB_TABLE,
+    COLLAB_UPDATE,
+    collab_rows,
+    delete_tenant_rows,
+    new_tenant_id,
+    open_database,
+    timed,
+)
+from scripts.ingestion.db import DB_BACKENDS, RAW_BLOB_TABLE, Database
+
+_RAW_IDX = COLLAB_COLUMNS.index("raw_response")
+_PERM_IDX = COLLAB_COLUMNS.index("permission")
+
+
+def _load(db: Database, rows: list[tuple], raw_blobs: bool, batch_size: int) -> int:
+    total = 0
+    for i in range(0, len(rows), batch_size):
+        total += db.upsert_in_transaction(
+            COLLAB_TABLE,
+            COLLAB_COLUMNS,
+            rows[i : i + batch_size],
+            COLLAB_CONFLICT,
+            COLLAB_UPDATE,
+            raw_blobs=raw_blobs,
+        )
+    return total
+
+
+def _flipped(rows: list[tuple]) -> list[tuple]:
+    """Same rows with the permission (and its payload fields) toggled."""
+    out = []
+    for row in rows:
+        payload = json.loads(row[_RAW_IDX])
+        push = not payload["permissions"]["push"]
+        payload["permissions"]["push"] = push
+        payload["role_name"] = "write" if push else "read"
+        row = list(row)
+        row[_PERM_IDX] = "push" if push else "pull"
+        row[_RAW_IDX] = json.dumps(payload)
+        out.append(tuple(row))
+    return out
+
+
+def _stored_bytes(db: Database, tenant_id: str) -> tuple[int, int, int]:
+    """(row raw_response bytes, blob payload bytes, blob count) for the tenant."""
+    with db.transaction() as cur:
+        cur.execute(
+            f"SELECT COALESCE(SUM(pg_column_size(raw_response)), 0) "
+            f"FROM {COLLAB_TABLE} WHERE tenant_id = %s",
+            (tenant_id,),
+        )
+        inline = cur.fetchone()[0]
+        cur.execute(
+            f"SELECT COALESCE(SUM(pg_column_size(payload)), 0), COUNT(*) "
+            f"FROM {RAW_BLOB_TABLE} WHERE tenant_id = %s",
+            (tenant_id,),
+        )
+        blob_bytes, blobs = cur.fetchone()
+    return int(inline), int(blob_bytes), int(blobs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users-per-repo", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--backend", choices=DB_BACKENDS, default="psycopg2")
+    args = parser.parse_args()
+
+    fmt = "{:<7}  {:>9}  {:>11}  {:>10}  {:>12}  {:>10}  {:>8}"
+    print(
+        fmt.format(
+            "MODE",
+            "COLD (s)",
+            "CHANGED (s)",
+            "REVERT (s)",
+            "ROWS/s REV",
+            "RAW (MB)",
+            "BLOBS",
+        )
+    )
+    db = open_database(backend=args.backend)
+    try:
+        for raw_blobs in (False, True):
+            tenant_id = new_tenant_id()
+            rows = collab_rows(tenant_id, args.rows, args.users_per_repo)
+            flipped = _flipped(rows)
+            timings: dict[str, float] = {}
+            try:
+                with timed(timings, "cold"):
+                    _load(db, rows, raw_blobs, args.batch_size)
+                with timed(timings, "changed"):
+                    _load(db, flipped, raw_blobs, args.batch_size)
+                with timed(timings, "revert"):
+                    _load(db, rows, raw_blobs, args.batch_size)
+                inline, blob_bytes, blobs = _stored_bytes(db, tenant_id)
+            finally:
+                delete_tenant_rows(db, COLLAB_TABLE, tenant_id)
+                delete_tenant_rows(db, RAW_BLOB_TABLE, tenant_id)
+            print(
+                fmt.format(
+                    "blobs" if raw_blobs else "inline",
+                    f"{timings['cold']:.2f}",
+                    f"{timings['changed']:.2f}",
+                    f"{timings['revert']:.2f}",
+                    f"{args.rows / timings['revert']:.0f}",
+                    f"{(inline + blob_bytes) / 1e6:.1f}",
+                    blobs,
+                )
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: full provider syncs replayed from a recorded cassette.
+
+Runs ``--runs`` tracked syncs of one provider with its API traffic served
+from ``{--dir}/{provider}.ndjson.gz`` (recorded with
+INGESTION_CASSETTE_MODE=record, see cassette.py) and reports wall time and
+records written per second.  The first run writes every row, later ones
+exercise the unchanged-row path.  Everything else -- database, batching,
+spool/pipeline, projection -- comes from the usual environment, so point
+it at a scratch database.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.replay_sync --provider github --dir cassettes
+  python -m scripts.ingestion.benchmarks.replay_sync -p google_workspace --dir cassettes --runs 5 --latency-scale 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+
+from scripts.ingestion.cli import PROVIDER_REGISTRY, _get_provider
+from scripts.ingestion.config import load_config
+from scripts.ingestion.db import create_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--provider", "-p", required=True, choices=sorted(PROVIDER_REGISTRY)
+    )
+    parser.add_argument("--dir", required=True, help="cassette directory")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=0.0,
+        help="sleep this multiple of each recorded response time (default: 0)",
+    )
+    args = parser.parse_args()
+
+    config = replace(
+        load_config(),
+        cassette_mode="replay",
+        cassette_dir=args.dir,
+        cassette_latency_scale=args.latency_scale,
+    )
+    db = create_database(config.database)
+    try:
+        provider = _get_provider(args.provider, config, db)
+        if provider is None:
+            raise SystemExit(f"{args.provider} is not configured")
+        fmt = "{:>4}  {:>10}  {:>10}  {:>10}  {:>12}"
+        print(fmt.format("RUN", "SECONDS", "WRITTEN", "UNCHANGED", "RECORDS/S"))
+        for run in range(1, args.runs + 1):
+            start = time.perf_counter()
+            provider.sync_with_tracking()
+            seconds = time.perf_counter() - start
+            stats = provider.stats
+            print(
+                fmt.format(
+                    run,
+                    f"{seconds:.2f}",
+                    stats.written,
+                    stats.unchanged,
+                    f"{(stats.written + stats.unchanged) / seconds:,.0f}",
+                )
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,538 @@
+"""Benchmark: hand-written row builders vs compiled RowMapper specs.
+
+For every provider table built from API dicts, builds rows from synthetic
+items with the loop the provider used before (kept here verbatim) and with
+the table's RowMapper.rows(), after checking that both produce exactly the
+same tuples -- for a fully populated item and for one with every optional
+field missing.  No database or network is needed.
+
+The old builders are kept as one function per row, so BEFORE pays a call
+per row, as map() does; rows() builds a batch without one, like the inline
+loops the providers had.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.row_mappers
+  python -m scripts.ingestion.benchmarks.row_mappers --rows 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from scripts.ingestion.jsonstream import raw_json
+from scripts.ingestion.providers import (
+    aws_identity_center,
+    aws_organizations,
+    github_org,
+    google_workspace,
+)
+from scripts.ingestion.rowmap import RowMapper
+from scripts.ingestion.serialization import dumps
+
+T = "00000000-0000-0000-0000-000000000001"
+
+
+# ----------------------------------------------------------------------
+# Row builders as written in the providers before RowMapper
+# ----------------------------------------------------------------------
+
+
+def _google_user(u: dict) -> tuple:
+    name = u.get("name", {})
+    return (
+        T,
+        u["id"],
+        u["primaryEmail"],
+        name.get("fullName"),
+        u.get("suspended", False),
+        u.get("archived", False),
+        u.get("isAdmin", False),
+        u.get("isDelegatedAdmin", False),
+        u.get("isEnrolledIn2Sv", False),
+        u.get("isEnforcedIn2Sv", False),
+        u.get("customerId"),
+        u.get("suspensionReason"),
+        u.get("creationTime"),
+        u.get("lastLoginTime"),
+        u.get("orgUnitPath"),
+        dumps(u),
+        "NOW()",
+    )
+
+
+def _google_group(g: dict) -> tuple:
+    return (
+        T,
+        g["id"],
+        g["email"],
+        g.get("name"),
+        g.get("description"),
+        g.get("adminCreated", True),
+        g.get("directMembersCount"),
+        dumps(g),
+        "NOW()",
+    )
+
+
+def _google_member(m: dict, gid: str) -> tuple:
+    return (
+        T,
+        gid,
+        m["id"],
+        m.get("type", "USER"),
+        m.get("email"),
+        m.get("role", "MEMBER"),
+        m.get("status", "ACTIVE"),
+        dumps(m),
+        "NOW()",
+    )
+
+
+def _aws_user(u: dict, store: str) -> tuple:
+    emails = u.get("Emails", [])
+    primary_email = None
+    for e in emails:
+        if e.get("Primary"):
+            primary_email = e.get("Value")
+            break
+    if not primary_email and emails:
+        primary_email = emails[0].get("Value")
+
+    name = u.get("Name", {})
+    return (
+        T,
+        store,
+        u["UserId"],
+        u.get("UserName", ""),
+        u.get("DisplayName"),
+        u.get("Active", True),
+        u.get("UserStatus"),
+        primary_email,
+        name.get("GivenName"),
+        name.get("FamilyName"),
+        dumps(u),
+        "NOW()",
+    )
+
+
+def _aws_group(g: dict, store: str) -> tuple:
+    return (
+        T,
+        store,
+        g["GroupId"],
+        g.get("DisplayName", ""),
+        g.get("Description"),
+        dumps(g),
+        "NOW()",
+    )
+
+
+def _aws_membership(m: dict, store: str, gid: str) -> tuple:
+    member_id_obj = m.get("MemberId", {})
+    user_id = member_id_obj.get("UserId", "")
+    return (T, m["MembershipId"], store, gid, user_id, dumps(m), "NOW()")
+
+
+def _aws_assignment(a: dict, store: str, ps_names: dict) -> tuple:
+    return (
+        T,
+        store,
+        a["AccountId"],
+        a["PermissionSetArn"],
+        ps_names.get(a["PermissionSetArn"], ""),
+        a["PrincipalType"],
+        a["PrincipalId"],
+        dumps(a),
+        "NOW()",
+    )
+
+
+def _aws_account(a: dict) -> tuple:
+    joined_at = a.get("JoinedTimestamp")
+    if joined_at:
+        joined_at = (
+            joined_at.isoformat() if hasattr(joined_at, "isoformat") else str(joined_at)
+        )
+    return (
+        T,
+        a["Id"],
+        a.get("Name", ""),
+        a.get("Email"),
+        a.get("Status", "ACTIVE"),
+        a.get("JoinedMethod"),
+        joined_at,
+        a.get("_org_id"),
+        a.get("_parent_id"),
+        dumps(a),
+        "NOW()",
+    )
+
+
+def _github_user(u: dict) -> tuple:
+    return (
+        T,
+        u["id"],
+        u["node_id"],
+        u["login"],
+        u.get("name"),
+        u.get("email"),
+        u.get("type", "User"),
+        u.get("site_admin", False),
+        u.get("avatar_url"),
+        raw_json(u),
+        "NOW()",
+    )
+
+
+def _github_membership(m: dict, parent_node_id: str) -> tuple:
+    return (
+        T,
+        parent_node_id,
+        m["node_id"],
+        m.get("role", "member"),
+        "active",
+        raw_json(m),
+        "NOW()",
+    )
+
+
+def _github_team(t: dict, org_node_id: str) -> tuple:
+    parent = t.get("parent") or {}
+    return (
+        T,
+        t["id"],
+        t["node_id"],
+        org_node_id,
+        t["name"],
+        t["slug"],
+        t.get("description"),
+        t.get("privacy"),
+        t.get("permission"),
+        parent.get("id"),
+        parent.get("node_id"),
+        raw_json(t),
+        "NOW()",
+    )
+
+
+def _github_repo(r: dict, org_node_id: str) -> tuple:
+    return (
+        T,
+        r["id"],
+        r["node_id"],
+        org_node_id,
+        r["name"],
+        r["full_name"],
+        r.get("private", False),
+        r.get("visibility"),
+        r.get("archived", False),
+        r.get("default_branch"),
+        r.get("description"),
+        r.get("fork", False),
+        r.get("language"),
+        r.get("pushed_at"),
+        raw_json(r),
+        "NOW()",
+    )
+
+
+def _github_repo_team(t: dict, repo_node_id: str) -> tuple:
+    return (
+        T,
+        repo_node_id,
+        t["node_id"],
+        t.get("permission", "pull"),
+        raw_json(t),
+        "NOW()",
+    )
+
+
+def _github_collaborator(c: dict, repo_node_id: str) -> tuple:
+    perms = c.get("permissions", {})
+    permission = "read"
+    for level in ("admin", "maintain", "push", "triage", "pull"):
+        if perms.get(level):
+            permission = level
+            break
+    return (
+        T,
+        repo_node_id,
+        c["node_id"],
+        permission,
+        c.get("permissions", {}).get("admin", False) is False
+        and c.get("type") != "User",
+        raw_json(c),
+        "NOW()",
+    )
+
+
+# ----------------------------------------------------------------------
+# Cases: mapper, hand-written builder, Arg values after tenant_id, and a
+# full and a minimal item
+# ----------------------------------------------------------------------
+
+_JOINED = datetime(2021, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+_PS = "arn:aws:sso:::permissionSet/ssoins-1/ps-1"
+
+CASES: list[tuple[RowMapper, Callable[..., tuple], tuple, dict, dict]] = [
+    (
+        google_workspace.USER_ROWS,
+        _google_user,
+        (),
+        {
+            "id": "104857600000000000001",
+            "primaryEmail": "jane.doe@example.com",
+            "name": {"givenName": "Jane", "familyName": "Doe", "fullName": "Jane Doe"},
+            "suspended": False,
+            "archived": False,
+            "isAdmin": True,
+            "isDelegatedAdmin": False,
+            "isEnrolledIn2Sv": True,
+            "isEnforcedIn2Sv": True,
+            "customerId": "C01abcdef",
+            "creationTime": "2021-02-11T16:40:12.000Z",
+            "lastLoginTime": "2024-05-01T09:14:03.000Z",
+            "orgUnitPath": "/Engineering/Platform",
+        },
+        {"id": "1", "primaryEmail": "a@example.com"},
+    ),
+    (
+        google_workspace.GROUP_ROWS,
+        _google_group,
+        (),
+        {
+            "id": "03x8tuzt1abcdef",
+            "email": "eng@example.com",
+            "name": "Engineering",
+            "description": "All engineers",
+            "adminCreated": False,
+            "directMembersCount": "42",
+        },
+        {"id": "1", "email": "g@example.com"},
+    ),
+    (
+        google_workspace.MEMBERSHIP_ROWS,
+        _google_member,
+        ("03x8tuzt1abcdef",),
+        {
+            "id": "104857600000000000001",
+            "email": "jane.doe@example.com",
+            "role": "OWNER",
+            "type": "USER",
+            "status": "ACTIVE",
+        },
+        {"id": "1"},
+    ),
+    (
+        aws_identity_center.USER_ROWS,
+        _aws_user,
+        ("d-1234567890",),
+        {
+            "UserId": "u1b2c3d4-5678-90ab-cdef-111122223333",
+            "UserName": "jane.doe",
+            "DisplayName": "Jane Doe",
+            "UserStatus": "ENABLED",
+            "Name": {"GivenName": "Jane", "FamilyName": "Doe"},
+            "Emails": [
+                {"Value": "jdoe@example.com"},
+                {"Value": "jane.doe@example.com", "Primary": True},
+            ],
+        },
+        {"UserId": "u1", "Emails": [{"Value": "", "Primary": True}, {"Value": "x"}]},
+    ),
+    (
+        aws_identity_center.GROUP_ROWS,
+        _aws_group,
+        ("d-1234567890",),
+        {
+            "GroupId": "g1b2c3d4-5678-90ab-cdef-111122223333",
+            "DisplayName": "Admins",
+            "Description": "Administrators",
+        },
+        {"GroupId": "g1"},
+    ),
+    (
+        aws_identity_center.MEMBERSHIP_ROWS,
+        _aws_membership,
+        ("d-1234567890", "g1b2c3d4"),
+        {
+            "IdentityStoreId": "d-1234567890",
+            "MembershipId": "a1b2c3d4-5678-90ab-cdef-111122223333",
+            "GroupId": "g1b2c3d4",
+            "MemberId": {"UserId": "u1b2c3d4-5678-90ab-cdef-111122223333"},
+        },
+        {"MembershipId": "m1"},
+    ),
+    (
+        aws_identity_center.ASSIGNMENT_ROWS,
+        _aws_assignment,
+        ("d-1234567890", {_PS: "AdministratorAccess"}),
+        {
+            "AccountId": "123456789012",
+            "PermissionSetArn": _PS,
+            "PrincipalType": "GROUP",
+            "PrincipalId": "g1b2c3d4",
+        },
+        {
+            "AccountId": "1",
+            "PermissionSetArn": "arn:other",
+            "PrincipalType": "USER",
+            "PrincipalId": "u1",
+        },
+    ),
+    (
+        aws_organizations.ACCOUNT_ROWS,
+        _aws_account,
+        (),
+        {
+            "Id": "123456789012",
+            "Arn": "arn:aws:organizations::111111111111:account/o-abc/123456789012",
+            "Email": "aws-prod@example.com",
+            "Name": "production",
+            "Status": "ACTIVE",
+            "JoinedMethod": "CREATED",
+            "JoinedTimestamp": _JOINED,
+            "_org_id": "o-abc",
+            "_parent_id": "ou-abc-123",
+        },
+        {"Id": "1"},
+    ),
+    (
+        github_org.USER_ROWS,
+        _github_user,
+        (),
+        {
+            "login": "octocat",
+            "id": 583231,
+            "node_id": "MDQ6VXNlcjU4MzIzMQ==",
+            "name": "The Octocat",
+            "email": "octocat@example.com",
+            "type": "User",
+            "site_admin": False,
+            "avatar_url": "https://avatars.githubusercontent.com/u/583231?v=4",
+        },
+        {"login": "o", "id": 1, "node_id": "U1"},
+    ),
+    (
+        github_org.ORG_MEMBERSHIP_ROWS,
+        _github_membership,
+        ("O_kgDOABCDEF",),
+        {"login": "octocat", "node_id": "MDQ6VXNlcjU4MzIzMQ==", "role": "admin"},
+        {"node_id": "U1"},
+    ),
+    (
+        github_org.TEAM_MEMBERSHIP_ROWS,
+        _github_membership,
+        ("T_kwDOABCDEF",),
+        {"login": "octocat", "node_id": "MDQ6VXNlcjU4MzIzMQ==", "role": "maintainer"},
+        {"node_id": "U1"},
+    ),
+    (
+        github_org.TEAM_ROWS,
+        _github_team,
+        ("O_kgDOABCDEF",),
+        {
+            "id": 1,
+            "node_id": "T_kwDOABCDEF",
+            "name": "Platform",
+            "slug": "platform",
+            "description": "Platform team",
+            "privacy": "closed",
+            "permission": "pull",
+            "parent": {"id": 2, "node_id": "T_kwDOPARENT"},
+        },
+        {"id": 1, "node_id": "T1", "name": "t", "slug": "t", "parent": None},
+    ),
+    (
+        github_org.REPO_ROWS,
+        _github_repo,
+        ("O_kgDOABCDEF",),
+        {
+            "id": 1296269,
+            "node_id": "MDEwOlJlcG9zaXRvcnkxMjk2MjY5",
+            "name": "Hello-World",
+            "full_name": "octocat/Hello-World",
+            "private": True,
+            "visibility": "internal",
+            "archived": False,
+            "default_branch": "main",
+            "description": "This your first repo!",
+            "fork": False,
+            "language": "Python",
+            "pushed_at": "2024-05-01T12:30:00Z",
+        },
+        {"id": 1, "node_id": "R1", "name": "r", "full_name": "o/r"},
+    ),
+    (
+        github_org.REPO_TEAM_ROWS,
+        _github_repo_team,
+        ("R_kgDOABCDEF",),
+        {"node_id": "T_kwDOABCDEF", "slug": "platform", "permission": "push"},
+        {"node_id": "T1"},
+    ),
+    (
+        github_org.COLLABORATOR_ROWS,
+        _github_collaborator,
+        ("R_kgDOABCDEF",),
+        {
+            "login": "octocat",
+            "node_id": "MDQ6VXNlcjU4MzIzMQ==",
+            "type": "User",
+            "permissions": {
+                "admin": False,
+                "maintain": False,
+                "push": True,
+                "triage": True,
+                "pull": True,
+            },
+            "role_name": "write",
+        },
+        {"node_id": "B1", "type": "Bot"},
+    ),
+]
+
+
+def _rate(build: Callable[[], Any], rows: int, repeat: int = 3) -> float:
+    """Rows per second of the fastest of ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+    return rows / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    fmt = "{:<38}  {:>12}  {:>12}  {:>12}  {:>7}"
+    print(fmt.format("TABLE", "BEFORE r/s", "MAP r/s", "ROWS r/s", "SPEEDUP"))
+    for mapper, before, extra, full, minimal in CASES:
+        for item in (full, minimal):
+            expected = before(item, *extra)
+            actual = mapper.map(item, T, *extra)
+            assert actual == expected, (mapper.table, actual, expected)
+            assert len(actual) == len(mapper.columns), mapper.table
+
+        items = [full] * args.rows
+        base = _rate(lambda: [before(i, *extra) for i in items], args.rows)
+        single = _rate(lambda: [mapper.map(i, T, *extra) for i in items], args.rows)
+        fast = _rate(lambda: mapper.rows(items, T, *extra), args.rows)
+        print(
+            fmt.format(
+                mapper.table,
+                f"{base:,.0f}",
+                f"{single:,.0f}",
+                f"{fast:,.0f}",
+                f"{fast / base:.2f}x",
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Benchmark: raw_response encoding cost per provider row shape.
+
+Encodes a synthetic payload shaped like each provider's API items with the
+call the providers used before (``json.dumps``, plus ``default=str`` for
+the boto3 providers), with the standard-library path of
+serialization.dumps, and with serialization.dumps itself (orjson when
+installed).  No database is needed.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.serialization
+  python -m scripts.ingestion.benchmarks.serialization --rows 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from scripts.ingestion import serialization
+
+_NOW = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+# (row shape, payload, payload contains datetimes)
+SHAPES: list[tuple[str, dict[str, Any], bool]] = [
+    (
+        "google_workspace_users",
+        {
+            "kind": "admin#directory#user",
+            "id": "104857600000000000001",
+            "primaryEmail": "jane.doe@example.com",
+            "name": {"givenName": "Jane", "familyName": "Doe", "fullName": "Jane Doe"},
+            "isAdmin": False,
+            "isDelegatedAdmin": False,
+            "lastLoginTime": "2024-05-01T09:14:03.000Z",
+            "creationTime": "2021-02-11T16:40:12.000Z",
+            "agreedToTerms": True,
+            "suspended": False,
+            "archived": False,
+            "changePasswordAtNextLogin": False,
+            "ipWhitelisted": False,
+            "emails": [
+                {"address": "jane.doe@example.com", "primary": True},
+                {"address": "jdoe@example.com"},
+            ],
+            "languages": [{"languageCode": "en", "preference": "preferred"}],
+            "customerId": "C01abcdef",
+            "orgUnitPath": "/Engineering/Platform",
+            "isMailboxSetup": True,
+            "isEnrolledIn2Sv": True,
+            "isEnforcedIn2Sv": True,
+            "includeInGlobalAddressList": True,
+        },
+        False,
+    ),
+    (
+        "google_workspace_memberships",
+        {
+            "kind": "admin#directory#member",
+            "etag": '"abcdEFGHijklMNOPqrstUVWXyz0123456789"',
+            "id": "104857600000000000001",
+            "email": "jane.doe@example.com",
+            "role": "MEMBER",
+            "type": "USER",
+            "status": "ACTIVE",
+        },
+        False,
+    ),
+    (
+        "aws_identity_center_memberships",
+        {
+            "IdentityStoreId": "d-1234567890",
+            "MembershipId": "a1b2c3d4-5678-90ab-cdef-111122223333",
+            "GroupId": "g1b2c3d4-5678-90ab-cdef-111122223333",
+            "MemberId": {"UserId": "u1b2c3d4-5678-90ab-cdef-111122223333"},
+        },
+        False,
+    ),
+    (
+        "aws_accounts",
+        {
+            "Id": "123456789012",
+            "Arn": "arn:aws:organizations::111111111111:account/o-abc/123456789012",
+            "Email": "aws-prod@example.com",
+            "Name": "production",
+            "Status": "ACTIVE",
+            "JoinedMethod": "CREATED",
+            "JoinedTimestamp": _NOW,
+        },
+        True,
+    ),
+    (
+        "github_repo_collaborator_permissions",
+        {
+            "login": "octocat",
+            "id": 583231,
+            "node_id": "MDQ6VXNlcjU4MzIzMQ==",
+            "type": "User",
+            "site_admin": False,
+            "avatar_url": "https://avatars.githubusercontent.com/u/583231?v=4",
+            "permissions": {
+                "admin": False,
+                "maintain": False,
+                "push": True,
+                "triage": True,
+                "pull": True,
+            },
+            "role_name": "write",
+        },
+        False,
+    ),
+    (
+        "gcp_project_iam_bindings",
+        {
+            "role": "roles/editor",
+            "member": "user:jane.doe@example.com",
+            "condition": None,
+        },
+        False,
+    ),
+]
+
+
+def _rate(encode: Callable[[Any], str], payload: Any, rows: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rows):
+        encode(payload)
+    return rows / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"serialization.dumps encoder: {serialization.ENCODER}")
+    fmt = "{:<38}  {:>12}  {:>12}  {:>12}  {:>7}"
+    print(fmt.format("ROW SHAPE", "BEFORE r/s", "STDLIB r/s", "DUMPS r/s", "SPEEDUP"))
+    for name, payload, has_datetimes in SHAPES:
+        if has_datetimes:
+            before = lambda v: json.dumps(v, default=str)  # noqa: E731
+        else:
+            before = json.dumps
+        base = _rate(before, payload, args.rows)
+        stdlib = _rate(serialization._encoder.encode, payload, args.rows)
+        fast = _rate(serialization.dumps, payload, args.rows)
+        print(
+            fmt.format(
+                name,
+                f"{base:,.0f}",
+                f"{stdlib:,.0f}",
+                f"{fast:,.0f}",
+                f"{fast / base:.1f}x",
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
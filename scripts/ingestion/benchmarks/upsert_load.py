@@ -0,0 +1,96 @@
+"""Benchmark: execute_values vs COPY staging merge in Database.upsert_batch.
+
+For every backend, row count and load method, the same synthetic
+github_repo_collaborator_permissions rows are written twice: a cold pass
+(all inserts) and a warm pass (all conflict updates), batched exactly like
+BaseProvider._batch_rows.
+
+Usage:
+  python -m scripts.ingestion.benchmarks.upsert_load
+  python -m scripts.ingestion.benchmarks.upsert_load --rows 10000 100000 --batch-size 5000
+  python -m scripts.ingestion.benchmarks.upsert_load --backends psycopg2 psycopg3
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from scripts.ingestion.benchmarks._common import (
+    COLLAB_COLUMNS,
+    COLLAB_CONFLICT,
+    COLLAB_TABLE,
+    COLLAB_UPDATE,
+    collab_rows,
+    delete_tenant_rows,
+    new_tenant_id,
+    open_database,
+    timed,
+)
+from scripts.ingestion.db import DB_BACKENDS, LOAD_METHODS, Database
+
+
+def _load(db: Database, rows: list[tuple], method: str, batch_size: int) -> int:
+    total = 0
+    for i in range(0, len(rows), batch_size):
+        with db.transaction() as cur:
+            total += db.upsert_batch(
+                cur,
+                COLLAB_TABLE,
+                COLLAB_COLUMNS,
+                rows[i : i + batch_size],
+                COLLAB_CONFLICT,
+                COLLAB_UPDATE,
+                method=method,
+            )
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--methods", nargs="+", choices=LOAD_METHODS, default=LOAD_METHODS
+    )
+    parser.add_argument(
+        "--backends", nargs="+", choices=DB_BACKENDS, default=["psycopg2"]
+    )
+    args = parser.parse_args()
+
+    fmt = "{:<9}  {:>10}  {:<8}  {:>10}  {:>10}  {:>12}"
+    print(
+        fmt.format("BACKEND", "ROWS", "METHOD", "COLD (s)", "WARM (s)", "ROWS/s WARM")
+    )
+    for backend in args.backends:
+        db = open_database(backend=backend)
+        try:
+            for count in args.rows:
+                for method in args.methods:
+                    tenant_id = new_tenant_id()
+                    rows = collab_rows(tenant_id, count)
+                    timings: dict[str, float] = {}
+                    try:
+                        with timed(timings, "cold"):
+                            _load(db, rows, method, args.batch_size)
+                        with timed(timings, "warm"):
+                            _load(db, rows, method, args.batch_size)
+                    finally:
+                        delete_tenant_rows(db, COLLAB_TABLE, tenant_id)
+                    print(
+                        fmt.format(
+                            backend,
+                            count,
+                            method,
+                            f"{timings['cold']:.2f}",
+                            f"{timings['warm']:.2f}",
+                            f"{count / timings['warm']:.0f}",
+                        )
+                    )
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+"""Record and replay provider API traffic ("cassettes").
+
+With INGESTION_CASSETTE_MODE=record every provider API response is
+appended to ``{INGESTION_CASSETTE_DIR}/{provider}.ndjson.gz``; with
+``replay`` the providers are served those responses instead of calling
+the APIs, so a production-shaped sync can be profiled or benchmarked
+offline.  The providers' sync code is unchanged -- the cassette sits at
+each client's transport:
+
+  - GitHub REST (HttpClient): a requests transport adapter; retries,
+    pagination and metrics run as usual on the replayed responses
+  - Google Admin SDK: the httplib2 object googleapiclient sends through
+  - boto3 (identitystore, sso-admin, organizations): botocore's
+    before-call/after-call events, parsed responses included
+  - GCP Resource Manager (gRPC): a proxy around the client recording each
+    method's result; pagers are consumed in full when recorded
+
+An entry is one JSON line (one gzip member, so appends of several runs and
+a torn last line after a crash are harmless): the transport, a request key
+(method and URL, or operation and parameters), the response and the time
+it took.  Replay serves the entries of a key in recorded order and repeats
+the last one once they run out, and sleeps INGESTION_CASSETTE_LATENCY_SCALE
+times the recorded time per response (0 = as fast as possible).  A request
+that was never recorded raises CassetteMiss.
+
+Request credentials are not recorded, but responses are: cassettes hold
+production directory data and belong with the database dumps, not in git.
+"""
+
+from __future__ import annotations
+
+import base64
+import collections
+import gzip
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from scripts.ingestion.config import IngestionConfig
+
+logger = logging.getLogger("ingestion.cassette")
+
+CASSETTE_SUFFIX = ".ndjson.gz"
+MODES = ("record", "replay")
+
+# Response headers describing the wire encoding, not the (decoded) body
+_DROP_HEADERS = frozenset(
+    {
+        "connection",
+        "content-encoding",
+        "content-length",
+        "set-cookie",
+        "transfer-encoding",
+    }
+)
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded response for a request."""
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode()}
+    raise TypeError(f"cannot record {type(value).__name__}")
+
+
+def _object_hook(obj: dict) -> Any:
+    if len(obj) == 1:
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+    return obj
+
+
+def _body(content: bytes) -> Any:
+    """Text bodies are kept readable; anything else is base64."""
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content
+
+
+def _content(body: Any) -> bytes:
+    return body.encode("utf-8") if isinstance(body, str) else body
+
+
+class Cassette:
+    """The recorded traffic of one provider."""
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 0.0) -> None:
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._fh = None
+        # (transport, key) -> entries not yet served; loaded on first replay
+        self._entries: Optional[dict[tuple[str, str], collections.deque]] = None
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def close(self) -> None:
+        """End of a run: flush a recording; the next replay starts over."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._entries = None
+
+    # -- recording --------------------------------------------------------
+
+    def record(
+        self, transport: str, key: str, response: dict[str, Any], elapsed: float
+    ) -> None:
+        line = json.dumps(
+            {"transport": transport, "key": key, "elapsed": elapsed, **response},
+            default=_default,
+            separators=(",", ":"),
+        )
+        member = gzip.compress(line.encode() + b"\n", compresslevel=6)
+        with self._lock:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._fh = open(self.path, "ab")
+            self._fh.write(member)
+
+    # -- replay -----------------------------------------------------------
+
+    def _load(self) -> dict[tuple[str, str], collections.deque]:
+        entries: dict[tuple[str, str], collections.deque] = {}
+        count = 0
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line, object_hook=_object_hook)
+                    except ValueError:
+                        break  # torn last line of a crashed recording
+                    key = (entry.pop("transport"), entry.pop("key"))
+                    entries.setdefault(key, collections.deque()).append(entry)
+                    count += 1
+        except FileNotFoundError:
+            raise CassetteMiss(f"no cassette at {self.path}") from None
+        except (EOFError, zlib.error, gzip.BadGzipFile) as exc:
+            logger.warning(
+                "Cassette %s truncated after %d entries: %s", self.path, count, exc
+            )
+        logger.info("Replaying %d responses from %s", count, self.path)
+        return entries
+
+    def play(self, transport: str, key: str) -> dict[str, Any]:
+        """The next recorded response for ``key``, after its recorded latency."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            queue = self._entries.get((transport, key))
+            if not queue:
+                raise CassetteMiss(f"{transport} {key} not in {self.path}")
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+        if self.latency_scale > 0:
+            time.sleep(entry["elapsed"] * self.latency_scale)
+        return entry
+
+    # -- transports -------------------------------------------------------
+
+    def mount(self, session: Any) -> None:
+        """Put the cassette in front of a requests.Session's adapters."""
+        for prefix in ("https://", "http://"):
+            inner = session.get_adapter(prefix)
+            session.mount(
+                prefix,
+                (
+                    _ReplayAdapter(self)
+                    if self.replaying
+                    else _RecordingAdapter(self, inner)
+                ),
+            )
+
+    def httplib2(self, http: Any = None) -> Any:
+        """An httplib2-style object for googleapiclient's ``build(http=...)``.
+
+        Recording wraps ``http`` (an authorised httplib2.Http).
+        """
+        return _ReplayHttp(self) if self.replaying else _RecordingHttp(self, http)
+
+    def boto3(self, client: Any) -> Any:
+        """Record or replay every call of a boto3 client; returns the client."""
+        # First in line, ahead of any other handler that answers the call
+        events = client.meta.events
+        if self.replaying:
+            events.register_first("before-call.*.*", self._boto3_replay)
+        else:
+            events.register_first("before-call.*.*", self._boto3_start)
+            events.register("after-call.*.*", self._boto3_record)
+        return client
+
+    def grpc_client(self, name: str, factory: Callable[[], Any]) -> Any:
+        """A google-cloud client from ``factory``, recorded or replayed.
+
+        Replay never calls ``factory``, so no credentials are needed.
+        """
+        if self.replaying:
+            return _ReplayClient(self, name)
+        return _RecordingClient(self, name, factory())
+
+    # boto3 events
+
+    @staticmethod
+    def _boto3_key(model: Any, params: dict[str, Any]) -> str:
+        body = params.get("body") or b""
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        query = params.get("query_string") or ""
+        if not isinstance(query, str):
+            query = json.dumps(query, sort_keys=True)
+        return (
+            f"{model.service_model.service_name}.{model.name} "
+            f"{params.get('url_path', '')}{query} {body}"
+        )
+
+    def _boto3_start(self, model: Any, params: dict, context: dict, **kwargs: Any):
+        context["cassette"] = (self._boto3_key(model, params), time.monotonic())
+
+    def _boto3_record(
+        self, http_response: Any, parsed: dict, context: dict, **kwargs: Any
+    ) -> None:
+        key, start = context.pop("cassette", (None, 0.0))
+        if key is None:
+            return
+        parsed = {k: v for k, v in parsed.items() if k != "ResponseMetadata"}
+        self.record(
+            "boto3",
+            key,
+            {"status": http_response.status_code, "parsed": parsed},
+            time.monotonic() - start,
+        )
+
+    def _boto3_replay(self, model: Any, params: dict, **kwargs: Any):
+        from botocore.awsrequest import AWSResponse
+
+        entry = self.play("boto3", self._boto3_key(model, params))
+        return (
+            AWSResponse(params.get("url", ""), entry["status"], {}, None),
+            entry["parsed"],
+        )
+
+
+class _RecordingAdapter(BaseAdapter):
+    def __init__(self, cassette: Cassette, inner: BaseAdapter) -> None:
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        start = time.monotonic()
+        resp = self.inner.send(request, **kwargs)
+        content = resp.content  # read here so the elapsed time covers the body
+        self.cassette.record(
+            "http",
+            f"{request.method} {request.url}",
+            {
+                "status": resp.status_code,
+                "reason": resp.reason,
+                "headers": {
+                    k: v
+                    for k, v in resp.headers.items()
+                    if k.lower() not in _DROP_HEADERS
+                },
+                "body": _body(content),
+            },
+            time.monotonic() - start,
+        )
+        return resp
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class _ReplayAdapter(BaseAdapter):
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:
+        entry = self.cassette.play("http", f"{request.method} {request.url}")
+        resp = Response()
+        resp.status_code = entry["status"]
+        resp.reason = entry.get("reason") or ""
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = _content(entry["body"])
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+def _httplib2_key(uri: str, method: str, body: Any) -> str:
+    return f"{method} {uri}" + (f" {body}" if body else "")
+
+
+class _RecordingHttp:
+    def __init__(self, cassette: Cassette, http: Any) -> None:
+        self.cassette = cassette
+        self.http = http
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        start = time.monotonic()
+        resp, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+        self.cassette.record(
+            "httplib2",
+            _httplib2_key(uri, method, body),
+            {"headers": dict(resp), "body": _body(content)},
+            time.monotonic() - start,
+        )
+        return resp, content
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.http, name)
+
+
+class _ReplayHttp:
+    def __init__(self, cassette: Cassette) -> None:
+        self.cassette = cassette
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        import httplib2
+
+        entry = self.cassette.play("httplib2", _httplib2_key(uri, method, body))
+        # The headers include httplib2's "status"
+        return httplib2.Response(entry["headers"]), _content(entry["body"])
+
+    def close(self) -> None:
+        pass
+
+
+# google-cloud clients: protobuf messages travel as {"type", "json"}
+
+
+def _qualname(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _resolve(path: str) -> Any:
+    module, _, qualname = path.partition(":")
+    obj: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _encode_message(value: Any) -> Any:
+    from google.protobuf import json_format
+
+    cls = type(value)
+    if hasattr(cls, "pb") and hasattr(cls, "wrap"):  # proto-plus
+        pb = cls.pb(value)
+    elif hasattr(value, "DESCRIPTOR") and hasattr(value, "SerializeToString"):
+        pb = value
+    else:
+        return value
+    return {
+        "type": _qualname(cls),
+        "json": json_format.MessageToJson(pb, indent=None, sort_keys=True),
+    }
+
+
+def _decode_message(value: Any) -> Any:
+    from google.protobuf import json_format
+
+    if not (isinstance(value, dict) and value.keys() == {"type", "json"}):
+        return value
+    cls = _resolve(value["type"])
+    if hasattr(cls, "pb") and hasattr(cls, "wrap"):
+        pb = json_format.Parse(value["json"], cls.pb()(), ignore_unknown_fields=True)
+        return cls.wrap(pb)
+    return json_format.Parse(value["json"], cls(), ignore_unknown_fields=True)
+
+
+def _grpc_key(name: str, method: str, args: tuple, kwargs: dict) -> str:
+    call = {
+        "args": [_encode_message(a) for a in args],
+        "kwargs": {k: _encode_message(v) for k, v in kwargs.items()},
+    }
+    return f"{name}.{method} {json.dumps(call, sort_keys=True, default=str)}"
+
+
+class _RecordingClient:
+    def __init__(self, cassette: Cassette, name: str, client: Any) -> None:
+        self._cassette = cassette
+        self._name = name
+        self._client = client
+
+    def __getattr__(self, method: str) -> Any:
+        fn = getattr(self._client, method)
+        if not callable(fn):
+            return fn
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            key = _grpc_key(self._name, method, args, kwargs)
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+                if _encode_message(result) is result and hasattr(result, "__iter__"):
+                    result = list(result)  # a pager: every page, now
+            except Exception as exc:
+                self._cassette.record(
+                    "grpc",
+                    key,
+                    {"error": {"type": _qualname(type(exc)), "message": str(exc)}},
+                    time.monotonic() - start,
+                )
+                raise
+            if isinstance(result, list):
+                recorded: dict[str, Any] = {
+                    "items": [_encode_message(r) for r in result]
+                }
+            else:
+                recorded = {"result": _encode_message(result)}
+            self._cassette.record("grpc", key, recorded, time.monotonic() - start)
+            return result
+
+        return call
+
+
+class _ReplayClient:
+    def __init__(self, cassette: Cassette, name: str) -> None:
+        self._cassette = cassette
+        self._name = name
+
+    def __getattr__(self, method: str) -> Any:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            entry = self._cassette.play(
+                "grpc", _grpc_key(self._name, method, args, kwargs)
+            )
+            if "error" in entry:
+                error = entry["error"]
+                try:
+                    exc = _resolve(error["type"])(error["message"])
+                except Exception:
+                    exc = RuntimeError(f"{error['type']}: {error['message']}")
+                raise exc
+            if "items" in entry:
+                return [_decode_message(item) for item in entry["items"]]
+            return _decode_message(entry["result"])
+
+        return call
+
+
+def open_cassette(config: IngestionConfig, provider: str) -> Optional[Cassette]:
+    """The provider's cassette per INGESTION_CASSETTE_*, or None when off."""
+    if not config.cassette_mode:
+        return None
+    if not config.cassette_dir:
+        raise ValueError("INGESTION_CASSETTE_DIR is required with a cassette mode")
+    return Cassette(
+        os.path.join(config.cassette_dir, provider + CASSETTE_SUFFIX),
+        config.cassette_mode,
+        config.cassette_latency_scale,
+    )
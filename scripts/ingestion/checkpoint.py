@@ -0,0 +1,126 @@
+"""Resumable progress of a provider sync.
+
+A Lambda timeout or a Cloud Run preemption kills a sync without running any
+cleanup, so a long GitHub or Google Workspace sync used to start over from
+the first page.  With INGESTION_CHECKPOINT_SECONDS set, BaseProvider saves
+a Checkpoint into the running ingestion_runs row at most that often (after
+committing every queued write), and the next run of the same provider
+resumes from it when the interrupted run is recent enough
+(INGESTION_RESUME_MAX_AGE_MINUTES).  A checkpoint records:
+
+  - ``done``: sync steps (e.g. ``acme/members``) that finished
+  - ``steps``: for a step in progress, the ``cursor`` of the listing page
+    holding its first unprocessed item and the ``skip`` count of items on
+    that page already written, and/or the ``key`` of the last team, repo,
+    group or project whose per-item fetch finished
+  - the run's sync generation, rows seen per table and partial tables, so
+    that the resumed run's deletion sweep still counts the rows the
+    interrupted run stamped
+
+Writes are idempotent upserts, so resuming a little early (a page or a
+batch) only repeats work; a checkpoint never points past unwritten rows.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional
+
+
+class Checkpoint:
+    """In-memory progress, loaded from and saved as a JSON-able dict."""
+
+    def __init__(self, state: Optional[dict[str, Any]] = None) -> None:
+        state = state or {}
+        self.generation: Optional[int] = state.get("generation")
+        self.done_steps: list[str] = list(state.get("done", []))
+        self.steps: dict[str, dict[str, Any]] = {
+            step: dict(entry) for step, entry in state.get("steps", {}).items()
+        }
+        self.seen: dict[str, int] = dict(state.get("seen", {}))
+        self.partial: dict[str, str] = dict(state.get("partial", {}))
+        # Keys of the interrupted run, until the resumed listing passes them
+        self._resume_keys = {
+            step: entry["key"] for step, entry in self.steps.items() if "key" in entry
+        }
+        # step -> [(index of the page's first item, page cursor)], oldest first;
+        # appended by a prefetch thread while the consumer advances
+        self._pages: dict[str, list[tuple[int, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def done(self, step: str) -> bool:
+        return step in self.done_steps
+
+    def complete(self, step: str) -> None:
+        if step not in self.done_steps:
+            self.done_steps.append(step)
+        self.steps.pop(step, None)
+        self._resume_keys.pop(step, None)
+        with self._lock:
+            self._pages.pop(step, None)
+
+    # -- listing cursors -------------------------------------------------
+
+    def resume_cursor(self, step: str) -> Optional[tuple[Any, int]]:
+        """(page cursor, items to skip on it) to restart a listing from."""
+        entry = self.steps.get(step)
+        if not entry or "cursor" not in entry:
+            return None
+        return entry["cursor"], entry.get("skip", 0)
+
+    def page(self, step: str, start: int, cursor: Any) -> None:
+        """A listing fetched the page at ``cursor``; its first item is ``start``.
+
+        ``start`` counts the items the listing yielded before this page; a
+        resumed listing starts at minus the items it skipped.
+        """
+        with self._lock:
+            self._pages.setdefault(step, []).append((start, cursor))
+
+    def advance(self, step: str, processed: int) -> None:
+        """The first ``processed`` items of the listing are written."""
+        with self._lock:
+            pages = self._pages.get(step)
+            if not pages:
+                return
+            i = len(pages) - 1
+            while i > 0 and pages[i][0] > processed:
+                i -= 1
+            start, cursor = pages[i]
+            del pages[:i]
+        entry = self.steps.setdefault(step, {})
+        entry["cursor"] = cursor
+        entry["skip"] = processed - start
+        # Per-item keys were relative to the batch just finished
+        entry.pop("key", None)
+
+    # -- per-item keys ---------------------------------------------------
+
+    def key(self, step: str) -> Optional[Any]:
+        """Last item key of ``step`` finished by this or the interrupted run."""
+        return self.steps.get(step, {}).get("key")
+
+    def set_key(self, step: str, key: Any) -> None:
+        self.steps.setdefault(step, {})["key"] = key
+
+    def unfinished(self, step: str, batch: list, keys: list) -> list:
+        """``batch`` without the leading items the interrupted run finished.
+
+        ``keys`` are the batch items' keys.  Until the interrupted run's
+        last key turns up, batches are returned whole (redoing work is
+        safe; skipping unfinished items is not).
+        """
+        last = self._resume_keys.get(step)
+        if last is None or last not in keys:
+            return batch
+        del self._resume_keys[step]
+        return batch[keys.index(last) + 1 :]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "done": list(self.done_steps),
+            "steps": {step: dict(entry) for step, entry in self.steps.items()},
+            "seen": dict(self.seen),
+            "partial": dict(self.partial),
+        }
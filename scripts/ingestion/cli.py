@@ -1,4 +1,4 @@
-"""CLI entry point: sync, scheduler, status."""
+"""CLI entry point: sync, scheduler, status, shards."""
 
 from __future__ import annotations
 
@@ -7,7 +7,7 @@ import logging
 import sys
 
 from scripts.ingestion.config import load_config
-from scripts.ingestion.db import Database
+from scripts.ingestion.db import Database, create_database
 from scripts.ingestion.logging_config import configure_logging
 
 logger = logging.getLogger("ingestion.cli")
@@ -49,6 +49,19 @@ PROVIDER_REGISTRY: dict[str, tuple[str, str, str]] = {
 }
 
 
+# sync --<selector> KEY -> (providers refreshing that entity, in order, help)
+ENTITY_SELECTORS: dict[str, tuple[tuple[str, ...], str]] = {
+    "repo": (("github",), "GitHub repository as org/name"),
+    "team": (("github",), "GitHub team as org/slug (or slug with one org)"),
+    "group": (("google_workspace",), "Google Workspace group email"),
+    "project": (("gcp_resource_manager",), "GCP project id"),
+    "account": (
+        ("aws_organizations", "aws_identity_center"),
+        "AWS account id",
+    ),
+}
+
+
 def _get_provider(name: str, config, db: Database):
     """Instantiate a provider by name. Returns None if unconfigured."""
     import importlib
@@ -68,7 +81,7 @@ def _get_provider(name: str, config, db: Database):
 
 
 def _run_post_process(config, db: Database) -> dict[str, int]:
-    """Run identity resolution and grants backfill."""
+    """Run identity resolution, grants backfill and raw blob pruning."""
     from scripts.ingestion.identity_resolver import IdentityResolver
     from scripts.ingestion.grants_backfill import GrantsBackfill
 
@@ -82,15 +95,70 @@ def _run_post_process(config, db: Database) -> dict[str, int]:
     backfill_results = backfill.rebuild()
     results.update(backfill_results)
 
+    if config.raw_blob_providers:
+        results["raw_blobs_pruned"] = db.prune_raw_blobs(config.tenant_id)
+
     return results
 
 
+def _sync_entities(entities: list[tuple[str, str]], config, db: Database) -> list[str]:
+    """Refresh single entities, then rebuild only the grants they affect.
+
+    Each (kind, key) is a tracked run of every provider serving that kind.
+    A failing refresh is logged and the remaining ones still run; grants
+    are rebuilt for every refresh that completed.  Identity resolution is
+    not re-run: entity refreshes write no user rows.  Returns the failed
+    refreshes and grant rebuilds, as log labels.
+    """
+    from scripts.ingestion.grants_backfill import GrantsBackfill
+
+    scopes = []
+    failed = []
+    for kind, key in entities:
+        for name in ENTITY_SELECTORS[kind][0]:
+            provider = _get_provider(name, config, db)
+            if provider is None:
+                continue
+            logger.info("Refreshing %s %s from %s", kind, key, name)
+            try:
+                results = provider.sync_with_tracking(entity=(kind, key))
+            except Exception:
+                logger.exception("Refresh of %s %s from %s failed", kind, key, name)
+                failed.append(f"{name} {kind} {key}")
+                continue
+            logger.info("Refresh results for %s %s: %s", kind, key, results)
+            scopes += [s for s in provider.grant_scopes if s not in scopes]
+
+    backfill = GrantsBackfill(config, db)
+    for scope in scopes:
+        try:
+            results = backfill.rebuild(scope)
+        except Exception:
+            logger.exception("Grants rebuild for %s failed", scope)
+            failed.append(f"grants {scope}")
+            continue
+        logger.info("Grants rebuilt for %s: %s", scope, results)
+    return failed
+
+
 def cmd_sync(args: argparse.Namespace) -> None:
     """Run one-shot sync for specified provider(s)."""
     config = load_config()
-    db = Database(config.database)
+    db = create_database(config.database)
 
     try:
+        entities = [
+            (kind, key)
+            for kind in ENTITY_SELECTORS
+            for key in getattr(args, kind) or []
+        ]
+        if entities:
+            failed = _sync_entities(entities, config, db)
+            if failed:
+                logger.error("%d refresh step(s) failed: %s", len(failed), failed)
+                sys.exit(1)
+            return
+
         providers_to_sync: list[str] = []
         if args.provider == "all":
             providers_to_sync = [
@@ -132,7 +200,7 @@ def cmd_scheduler(args: argparse.Namespace) -> None:
     from scripts.ingestion.scheduler import start_scheduler
 
     config = load_config()
-    db = Database(config.database)
+    db = create_database(config.database)
     try:
         start_scheduler(config, db)
     finally:
@@ -142,7 +210,7 @@ def cmd_scheduler(args: argparse.Namespace) -> None:
 def cmd_status(args: argparse.Namespace) -> None:
     """Show recent ingestion runs."""
     config = load_config()
-    db = Database(config.database)
+    db = create_database(config.database)
 
     try:
         runs = db.get_recent_runs(
@@ -188,6 +256,48 @@ def cmd_status(args: argparse.Namespace) -> None:
         db.close()
 
 
+def cmd_shards(args: argparse.Namespace) -> None:
+    """Report per-shard ingestion load from each shard's ingestion_runs."""
+    config = load_config()
+    db = create_database(config.database)
+
+    try:
+        mapped = db.shard_tenants()
+        fmt = "{:<40}  {:>7}  {:>7}  {:>6}  {:>7}  {:>6}  {:>10}  {:>8}  {:>10}"
+        print(f"Ingestion load over the last {args.hours}h")
+        print(
+            fmt.format(
+                "SHARD",
+                "MAPPED",
+                "TENANTS",
+                "RUNS",
+                "RUNNING",
+                "FAILED",
+                "UPSERTED",
+                "DELETED",
+                "RUN HOURS",
+            )
+        )
+        print("-" * 120)
+        for label, shard in db.shards().items():
+            load = shard.shard_load(hours=args.hours)
+            print(
+                fmt.format(
+                    label[:40],
+                    len(mapped.get(label, [])) or "-",
+                    load["tenants"],
+                    load["runs"],
+                    load["running"],
+                    load["failed"],
+                    load["records_upserted"],
+                    load["records_deleted"],
+                    f"{load['run_seconds'] / 3600:.1f}",
+                )
+            )
+    finally:
+        db.close()
+
+
 def main() -> None:
     """Main CLI entry point."""
     configure_logging()
@@ -207,6 +317,14 @@ def main() -> None:
         default="all",
         help="Provider to sync (default: all)",
     )
+    for kind, (_, help_text) in ENTITY_SELECTORS.items():
+        sync_parser.add_argument(
+            f"--{kind}",
+            action="append",
+            metavar="KEY",
+            help=f"Refresh only this {help_text} and its permissions "
+            "(repeatable; ignores --provider)",
+        )
     sync_parser.set_defaults(func=cmd_sync)
 
     # scheduler command
@@ -231,5 +349,17 @@ def main() -> None:
     )
     status_parser.set_defaults(func=cmd_status)
 
+    # shards command
+    shards_parser = subparsers.add_parser(
+        "shards", help="Report per-shard load from ingestion_runs"
+    )
+    shards_parser.add_argument(
+        "--hours",
+        type=int,
+        default=24,
+        help="Look-back window in hours (default: 24)",
+    )
+    shards_parser.set_defaults(func=cmd_shards)
+
     args = parser.parse_args()
     args.func(args)
@@ -15,7 +15,11 @@ from typing import Optional
 
 from dotenv import load_dotenv
 
-from scripts.ingestion.secrets import resolve_database_url, resolve_secret
+from scripts.ingestion.secrets import (
+    resolve_database_url,
+    resolve_secret,
+    resolve_shard_map,
+)
 
 
 @dataclass(frozen=True)
@@ -23,6 +27,28 @@ class DatabaseConfig:
     url: str
     min_connections: int = 2
     max_connections: int = 10
+    # "psycopg2" (ThreadedConnectionPool) or "psycopg3" (pipeline mode)
+    backend: str = "psycopg2"
+    # Pool of db_async.AsyncDatabase, sized separately from the thread pool
+    async_min_connections: int = 1
+    async_max_connections: int = 10
+    # Batch-level retries of transient errors (Database.run_transaction)
+    retry_attempts: int = 4
+    retry_base_delay: float = 0.2
+    retry_max_delay: float = 10.0
+    # Rows per round trip for Database.iter_query / chunk size of iter_keyset
+    itersize: int = 2000
+    # Instrumentation (see metrics.py): sink, slow-statement and leak thresholds
+    metrics_sink: str = "none"
+    slow_statement_ms: float = 1000.0
+    leak_seconds: float = 600.0
+    # tenant_id -> DSN of the shard holding that tenant; others use ``url``
+    shards: dict[str, str] = field(default_factory=dict)
+    # Optional streaming replica for Database.read_only() reads
+    replica_url: Optional[str] = None
+    # Reads go to the primary while the replica lags more than this
+    replica_max_lag_seconds: float = 30.0
+    replica_check_seconds: float = 5.0
 
 
 @dataclass(frozen=True)
@@ -58,6 +84,24 @@ class GcpConfig:
     sa_key_file: Optional[str] = None  # None = use Workload Identity / ADC
 
 
+@dataclass(frozen=True)
+class HttpConfig:
+    # Keep-alive connections per host and fetching thread (each thread has
+    # its own session; callers beyond it wait for a free connection)
+    pool_size: int = 4
+    # Per attempt
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    # Retries of connection errors, timeouts, 429/5xx and rate limits, with
+    # jittered exponential backoff unless Retry-After/X-RateLimit-Reset say
+    retry_attempts: int = 5
+    retry_base_delay: float = 1.0
+    retry_max_delay: float = 60.0
+    # Longest single wait, and the budget of one call with all its retries
+    max_wait_seconds: float = 300.0
+    budget_seconds: float = 900.0
+
+
 @dataclass(frozen=True)
 class SchedulerConfig:
     google_workspace_interval_min: int = 60
@@ -75,12 +119,60 @@ class IngestionConfig:
     tenant_id: str
     database: DatabaseConfig
     scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    # REST API client of the providers (see http_client.py)
+    http: HttpConfig = field(default_factory=HttpConfig)
     google_workspace: Optional[GoogleWorkspaceConfig] = None
     aws_identity_center: Optional[AwsIdentityCenterConfig] = None
     aws_organizations: Optional[AwsOrganizationsConfig] = None
     github: Optional[GitHubConfig] = None
     gcp: Optional[GcpConfig] = None
     batch_size: int = 500
+    # Providers whose batches are bulk-loaded via COPY + staging-table merge
+    # instead of execute_values (see Database.upsert_batch)
+    copy_load_providers: list[str] = field(default_factory=list)
+    # Providers whose raw_response payloads go to the content-addressed
+    # raw_response_blobs store (see Database.upsert_batch raw_blobs)
+    raw_blob_providers: list[str] = field(default_factory=list)
+    # Providers whose items are projected to the mapped fields plus
+    # raw_extra_fields[table] (Google: fields= masks; see projection.py)
+    raw_projection_providers: list[str] = field(default_factory=list)
+    raw_extra_fields: dict[str, list[str]] = field(default_factory=dict)
+    # Soft-delete rows a complete sync did not see (mark-and-sweep).  Every
+    # seen row is then re-stamped each run, unchanged or not (see db_sql.py
+    # on_conflict_sql), so it is off by default
+    detect_deletions: bool = False
+    # Concurrent writer connections for large row sets (1 = serial batches)
+    write_workers: int = 1
+    # Grow/shrink batch_size per table towards this transaction duration
+    adaptive_batching: bool = True
+    batch_target_seconds: float = 1.0
+    # Write-ahead spool directory; None writes batches to the database inline
+    spool_dir: Optional[str] = None
+    spool_segment_bytes: int = 4 * 1024 * 1024
+    # How long the spool writer waits out an unavailable database
+    spool_max_stall_seconds: float = 900.0
+    # Batches queued for the pipeline writer thread (0 = write inline) and
+    # fetched items buffered ahead of row building (see pipeline.py)
+    pipeline_depth: int = 0
+    prefetch_items: int = 2000
+    # Decode listing pages element by element into compact records that keep
+    # each element's original text (see jsonstream.py; GitHub listings)
+    stream_json: bool = False
+    # RSS above which row sets collected for write_workers spill to a temp
+    # file in spill_dir (0 = never; see spill.py)
+    spill_rss_bytes: int = 0
+    spill_dir: Optional[str] = None
+    # Save resumable sync progress to ingestion_runs at most this often
+    # (0 = off), and resume interrupted runs started within the max age
+    # (see checkpoint.py)
+    checkpoint_seconds: float = 0.0
+    resume_max_age_seconds: float = 3600.0
+    # "record" provider API responses to, or "replay" them from, cassettes
+    # in cassette_dir ("" = live APIs), replaying at this multiple of the
+    # recorded latencies (0 = none; see cassette.py)
+    cassette_mode: str = ""
+    cassette_dir: Optional[str] = None
+    cassette_latency_scale: float = 0.0
 
 
 def load_config() -> IngestionConfig:
@@ -101,6 +193,33 @@ def load_config() -> IngestionConfig:
         url=db_url,
         min_connections=int(os.environ.get("DB_MIN_CONNECTIONS", "2")),
         max_connections=int(os.environ.get("DB_MAX_CONNECTIONS", "10")),
+        backend=os.environ.get("DB_BACKEND", "psycopg2"),
+        async_min_connections=int(os.environ.get("DB_ASYNC_MIN_CONNECTIONS", "1")),
+        async_max_connections=int(os.environ.get("DB_ASYNC_MAX_CONNECTIONS", "10")),
+        retry_attempts=int(os.environ.get("DB_RETRY_ATTEMPTS", "4")),
+        retry_base_delay=float(os.environ.get("DB_RETRY_BASE_DELAY", "0.2")),
+        retry_max_delay=float(os.environ.get("DB_RETRY_MAX_DELAY", "10")),
+        itersize=int(os.environ.get("DB_ITERSIZE", "2000")),
+        metrics_sink=os.environ.get("DB_METRICS_SINK", "none"),
+        slow_statement_ms=float(os.environ.get("DB_SLOW_STATEMENT_MS", "1000")),
+        leak_seconds=float(os.environ.get("DB_LEAK_SECONDS", "600")),
+        shards=resolve_shard_map(),
+        replica_url=resolve_secret(os.environ.get("DATABASE_REPLICA_URL", "")) or None,
+        replica_max_lag_seconds=float(
+            os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", "30")
+        ),
+        replica_check_seconds=float(os.environ.get("DB_REPLICA_CHECK_SECONDS", "5")),
+    )
+
+    http = HttpConfig(
+        pool_size=int(os.environ.get("HTTP_POOL_SIZE", "4")),
+        connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.environ.get("HTTP_READ_TIMEOUT", "30")),
+        retry_attempts=int(os.environ.get("HTTP_RETRY_ATTEMPTS", "5")),
+        retry_base_delay=float(os.environ.get("HTTP_RETRY_BASE_DELAY", "1")),
+        retry_max_delay=float(os.environ.get("HTTP_RETRY_MAX_DELAY", "60")),
+        max_wait_seconds=float(os.environ.get("HTTP_MAX_WAIT_SECONDS", "300")),
+        budget_seconds=float(os.environ.get("HTTP_BUDGET_SECONDS", "900")),
     )
 
     # Google Workspace (optional)
@@ -165,13 +284,66 @@ def load_config() -> IngestionConfig:
             sa_key_file=os.environ.get("GCP_SA_KEY_FILE"),  # optional
         )
 
+    # Bulk-load mode (optional) -- comma-separated provider names
+    copy_raw = os.environ.get("INGESTION_COPY_PROVIDERS", "")
+    copy_load_providers = [s.strip() for s in copy_raw.split(",") if s.strip()]
+    blob_raw = os.environ.get("INGESTION_RAW_BLOB_PROVIDERS", "")
+    raw_blob_providers = [s.strip() for s in blob_raw.split(",") if s.strip()]
+    projection_raw = os.environ.get("INGESTION_RAW_PROJECTION_PROVIDERS", "")
+    raw_projection_providers = [
+        s.strip() for s in projection_raw.split(",") if s.strip()
+    ]
+    # table:path,path;table:path
+    raw_extra_fields: dict[str, list[str]] = {}
+    for entry in os.environ.get("INGESTION_RAW_EXTRA_FIELDS", "").split(";"):
+        table, _, paths = entry.partition(":")
+        if table.strip():
+            raw_extra_fields[table.strip()] = [
+                p.strip() for p in paths.split(",") if p.strip()
+            ]
+
     return IngestionConfig(
         tenant_id=tenant_id,
         database=database,
+        http=http,
         google_workspace=google_workspace,
         aws_identity_center=aws_idc,
         aws_organizations=aws_orgs,
         github=github,
         gcp=gcp,
         batch_size=int(os.environ.get("INGESTION_BATCH_SIZE", "500")),
+        copy_load_providers=copy_load_providers,
+        raw_blob_providers=raw_blob_providers,
+        raw_projection_providers=raw_projection_providers,
+        raw_extra_fields=raw_extra_fields,
+        detect_deletions=os.environ.get("INGESTION_DETECT_DELETIONS", "false").lower()
+        == "true",
+        write_workers=int(os.environ.get("INGESTION_WRITE_WORKERS", "1")),
+        adaptive_batching=os.environ.get("INGESTION_ADAPTIVE_BATCH", "true").lower()
+        == "true",
+        batch_target_seconds=float(
+            os.environ.get("INGESTION_BATCH_TARGET_SECONDS", "1.0")
+        ),
+        spool_dir=os.environ.get("INGESTION_SPOOL_DIR") or None,
+        spool_segment_bytes=int(
+            os.environ.get("INGESTION_SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024))
+        ),
+        spool_max_stall_seconds=float(
+            os.environ.get("INGESTION_SPOOL_MAX_STALL_SECONDS", "900")
+        ),
+        pipeline_depth=int(os.environ.get("INGESTION_PIPELINE_DEPTH", "0")),
+        prefetch_items=int(os.environ.get("INGESTION_PREFETCH_ITEMS", "2000")),
+        stream_json=os.environ.get("INGESTION_STREAM_JSON", "false").lower() == "true",
+        spill_rss_bytes=int(os.environ.get("INGESTION_SPILL_RSS_MB", "0")) * 2**20,
+        spill_dir=os.environ.get("INGESTION_SPILL_DIR") or None,
+        checkpoint_seconds=float(os.environ.get("INGESTION_CHECKPOINT_SECONDS", "0")),
+        resume_max_age_seconds=float(
+            os.environ.get("INGESTION_RESUME_MAX_AGE_MINUTES", "60")
+        )
+        * 60,
+        cassette_mode=os.environ.get("INGESTION_CASSETTE_MODE", "").lower(),
+        cassette_dir=os.environ.get("INGESTION_CASSETTE_DIR") or None,
+        cassette_latency_scale=float(
+            os.environ.get("INGESTION_CASSETTE_LATENCY_SCALE", "0")
+        ),
     )
@@ -2,41 +2,277 @@
 
 from __future__ import annotations
 
+import hashlib
+import io
 import logging
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime, timezone
-from typing import Any, Generator, Optional, Sequence
+from typing import Any, Callable, Generator, Iterator, Optional, Sequence, TypeVar
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 import psycopg2.pool
 
+from scripts.ingestion.batching import estimate_row_bytes
 from scripts.ingestion.config import DatabaseConfig
+from scripts.ingestion.db_sql import (
+    LAST_RUN_METADATA_SQL,
+    RETRYABLE_SQLSTATES,
+    RUN_END_SQL,
+    RUN_START_SQL,
+    SWEEP_SQL,
+    UpsertStats,
+    copy_stage_sql,
+    prepare_upsert,
+    retry_delay,
+    sqlstate,
+    tally,
+)
+from scripts.ingestion.metrics import DbMetrics, load_sink
 
 logger = logging.getLogger("ingestion.db")
 
+# Supported Database.upsert_batch transfer methods
+LOAD_METHODS = ("insert", "copy")
+
+# Selectable DatabaseConfig.backend values (see create_database)
+DB_BACKENDS = ("psycopg2", "psycopg3")
+
+# Target size of one execute_values statement; wide rows get smaller pages
+MAX_STATEMENT_BYTES = 4 * 1024 * 1024
+
+T = TypeVar("T")
+
+# Replay lag (0 when fully caught up or not a standby) and replayed WAL
+# position in bytes.  pg_current_wal_lsn() is only reached on a primary.
+_REPLICA_STATUS_SQL = """SELECT
+    CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp())
+    END::float8,
+    COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn()) - '0/0'::pg_lsn"""
+
+# How long a read with a WAL fence waits for the replica before using the primary
+REPLICA_FENCE_WAIT_SECONDS = 1.0
+
+# COPY text-format escapes for backslashes and the row/field delimiters
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+# Content-addressed raw_response storage (schema/08_ingestion_raw_blobs.sql)
+RAW_BLOB_TABLE = "raw_response_blobs"
+
+# KEY SHARE keeps ingestion_prune_raw_blobs() off blobs this batch will reference
+_BLOB_EXISTING_SQL = f"""SELECT digest FROM {RAW_BLOB_TABLE}
+   WHERE tenant_id = %s AND digest = ANY(%s)
+   FOR KEY SHARE"""
+
+_BLOB_PRUNE_SQL = "SELECT ingestion_prune_raw_blobs(%s, make_interval(secs => %s))"
+
+_BLOB_INSERT_SQL = f"""INSERT INTO {RAW_BLOB_TABLE}
+   (tenant_id, digest, payload, payload_bytes)
+   SELECT %s, d, p::jsonb, n
+   FROM unnest(%s::text[], %s::text[], %s::int[]) AS b(d, p, n)
+   ON CONFLICT (tenant_id, digest) DO NOTHING"""
+
+
+def _externalise_raw(
+    columns: list[str], rows: Sequence[tuple], update_columns: list[str]
+) -> tuple[list[str], list[tuple], list[str], dict[tuple[str, str], str]]:
+    """Swap each raw_response payload for '{}' plus a raw_response_digest.
+
+    Returns (columns, rows, update_columns, blobs) where ``blobs`` maps
+    (tenant_id, digest) to the JSON text to store in raw_response_blobs.
+    """
+    raw_idx = columns.index("raw_response")
+    tenant_idx = columns.index("tenant_id")
+    blobs: dict[tuple[str, str], str] = {}
+    out = []
+    for row in rows:
+        payload = row[raw_idx]
+        if payload is None:
+            out.append(row + (None,))
+            continue
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        blobs[(str(row[tenant_idx]), digest)] = payload
+        out.append(row[:raw_idx] + ("{}",) + row[raw_idx + 1 :] + (digest,))
+    if "raw_response" in update_columns:
+        update_columns = [*update_columns, "raw_response_digest"]
+    return [*columns, "raw_response_digest"], out, update_columns, blobs
+
+
+_SAVE_CHECKPOINT_SQL = """UPDATE ingestion_runs
+   SET run_metadata = COALESCE(run_metadata, '{}'::jsonb)
+                      || jsonb_build_object('checkpoint', %s::jsonb)
+   WHERE id = %s AND tenant_id = %s"""
+
+_LATEST_RUN_SQL = """SELECT id, status, run_metadata->'checkpoint',
+          EXTRACT(EPOCH FROM NOW())::float8
+   FROM ingestion_runs
+   WHERE tenant_id = %s AND provider = %s AND entity_type IS NULL
+     AND started_at > NOW() - make_interval(secs => %s)
+   ORDER BY started_at DESC LIMIT 1"""
+
+_INTERRUPTED_RUN_SQL = """UPDATE ingestion_runs
+   SET status = 'FAILED', finished_at = NOW(), error_message = %s
+   WHERE id = %s AND tenant_id = %s AND status = 'RUNNING'"""
+
+
+def _copy_value(value: Any) -> str:
+    """Render one Python value in PostgreSQL COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _copy_buffer(rows: Sequence[tuple]) -> io.StringIO:
+    """Serialise rows into an in-memory COPY FROM STDIN payload."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_value(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def shard_label(dsn: str) -> str:
+    """host:port/dbname of a DSN, without credentials, for reports and logs."""
+    params = psycopg2.extensions.parse_dsn(dsn)
+    return "{}:{}/{}".format(
+        params.get("host") or "local",
+        params.get("port") or 5432,
+        params.get("dbname") or "",
+    )
+
+
+def create_database(config: DatabaseConfig) -> Database:
+    """Construct the Database implementation selected by config.backend."""
+    if config.backend == "psycopg2":
+        return Database(config)
+    if config.backend == "psycopg3":
+        from scripts.ingestion.db_psycopg3 import Psycopg3Database
+
+        return Psycopg3Database(config)
+    raise ValueError(f"Unknown database backend {config.backend!r}")
+
 
 class Database:
-    """Thin wrapper around a ThreadedConnectionPool with upsert helpers."""
+    """Thin wrapper around a ThreadedConnectionPool with upsert helpers.
+
+    Driver-specific behaviour lives in a handful of hooks (_open_pool,
+    _insert_values, _copy_rows, _json) so alternative backends such as
+    db_psycopg3.Psycopg3Database share all SQL and run-tracking logic.
+    """
+
+    # Driver exceptions raised when the connection itself is gone
+    _DISCONNECT_ERRORS: tuple[type[BaseException], ...] = (
+        psycopg2.OperationalError,
+        psycopg2.InterfaceError,
+    )
 
     def __init__(self, config: DatabaseConfig) -> None:
-        self._pool = psycopg2.pool.ThreadedConnectionPool(
+        self.max_connections = config.max_connections
+        self.retry_attempts = config.retry_attempts
+        self.retry_base_delay = config.retry_base_delay
+        self.retry_max_delay = config.retry_max_delay
+        self.itersize = config.itersize
+        self.metrics = DbMetrics(
+            load_sink(config.metrics_sink),
+            slow_statement_ms=config.slow_statement_ms,
+            leak_seconds=config.leak_seconds,
+        )
+        self._config = config
+        self._shard_lock = threading.Lock()
+        self._shard_dbs: dict[str, Database] = {}
+        self.replica_max_lag_seconds = config.replica_max_lag_seconds
+        self.replica_check_seconds = config.replica_check_seconds
+        self._replica_lock = threading.Lock()
+        self._replica_checked_at = float("-inf")
+        self._replica_lag: Optional[float] = None
+        self._replica_lsn = -1
+        self._pool = self._open_pool(config)
+        self._replica_pool = (
+            self._open_pool(replace(config, url=config.replica_url))
+            if config.replica_url
+            else None
+        )
+
+    def _open_pool(self, config: DatabaseConfig):
+        return psycopg2.pool.ThreadedConnectionPool(
             minconn=config.min_connections,
             maxconn=config.max_connections,
             dsn=config.url,
         )
 
+    def _close_pool(self, pool) -> None:
+        pool.closeall()
+
     def close(self) -> None:
-        self._pool.closeall()
+        for shard in self._shard_dbs.values():
+            shard.close()
+        if self._replica_pool is not None:
+            self._close_pool(self._replica_pool)
+        self._close_pool(self._pool)
+
+    # ------------------------------------------------------------------
+    # Tenant sharding
+    # ------------------------------------------------------------------
+
+    def for_tenant(self, tenant_id: str) -> Database:
+        """The Database holding ``tenant_id``'s data.
+
+        Tenants in DatabaseConfig.shards get a Database (same backend, pool
+        sizes and settings) on their shard's DSN, created on first use and
+        shared by every tenant on that DSN; all others live on this one.
+        Providers, IdentityResolver and GrantsBackfill bind to it once, so
+        their writes and run tracking reach the right shard.
+        """
+        dsn = self._config.shards.get(tenant_id)
+        if dsn is None or dsn == self._config.url:
+            return self
+        with self._shard_lock:
+            shard = self._shard_dbs.get(dsn)
+            if shard is None:
+                shard = type(self)(
+                    replace(self._config, url=dsn, shards={}, replica_url=None)
+                )
+                self._shard_dbs[dsn] = shard
+            return shard
+
+    def shards(self) -> dict[str, Database]:
+        """Every shard (the default one first), keyed by shard_label."""
+        result = {shard_label(self._config.url): self}
+        for tenant_id in self._config.shards:
+            shard = self.for_tenant(tenant_id)
+            result.setdefault(shard_label(shard._config.url), shard)
+        return result
+
+    def shard_tenants(self) -> dict[str, list[str]]:
+        """Mapped tenant ids per shard label (the default shard lists none)."""
+        result: dict[str, list[str]] = {shard_label(self._config.url): []}
+        for tenant_id, dsn in self._config.shards.items():
+            result.setdefault(shard_label(dsn), []).append(tenant_id)
+        return result
 
     @contextmanager
-    def connection(self) -> Generator:
-        conn = self._pool.getconn()
+    def connection(self, pool=None) -> Generator:
+        pool = pool or self._pool
+        start = time.monotonic()
+        conn = pool.getconn()
+        self.metrics.checkout(conn, time.monotonic() - start)
         try:
             yield conn
         finally:
-            self._pool.putconn(conn)
+            self.metrics.checkin(conn)
+            pool.putconn(conn)
 
     @contextmanager
     def transaction(self) -> Generator:
@@ -47,9 +283,91 @@ class Database:
                     yield cur
                 conn.commit()
             except Exception:
-                conn.rollback()
+                # A dropped connection cannot roll back; the pool discards it
+                if not conn.closed:
+                    conn.rollback()
                 raise
 
+    def is_retryable(self, exc: BaseException) -> bool:
+        """True for transient errors after which the same transaction may succeed."""
+        state = sqlstate(exc)
+        if state:
+            return state in RETRYABLE_SQLSTATES or state.startswith("08")
+        # No SQLSTATE: the server never answered, e.g. a killed connection
+        return isinstance(exc, self._DISCONNECT_ERRORS)
+
+    def run_transaction(self, fn: Callable[[Any], T], label: str = "batch") -> T:
+        """Run ``fn(cur)`` in a transaction, retrying it on transient errors.
+
+        Deadlocks, serialization failures and dropped connections roll the
+        transaction back and re-run ``fn`` on a fresh pooled connection (the
+        pools discard closed connections), after a jittered exponential
+        backoff.  ``fn`` must therefore be safe to re-run: it should only
+        touch state derived from its own successful return.
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.transaction() as cur:
+                    return fn(cur)
+            except Exception as exc:
+                if attempt >= self.retry_attempts or not self.is_retryable(exc):
+                    raise
+                delay = retry_delay(
+                    attempt, self.retry_base_delay, self.retry_max_delay
+                )
+                attempt += 1
+                logger.warning(
+                    "Transient database error in %s (%s), retrying in %.2fs "
+                    "(attempt %d/%d): %s",
+                    label,
+                    sqlstate(exc) or type(exc).__name__,
+                    delay,
+                    attempt,
+                    self.retry_attempts,
+                    exc,
+                )
+                time.sleep(delay)
+
+    def upsert_in_transaction(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        conflict_columns: list[str],
+        update_columns: list[str],
+        method: str = "insert",
+        stats: Optional[UpsertStats] = None,
+        generation: Optional[int] = None,
+        raw_blobs: bool = False,
+    ) -> int:
+        """upsert_batch in its own transaction, retried on transient errors.
+
+        Stats are only folded into ``stats`` once the batch has committed, so
+        a retried batch is never double counted.
+        """
+
+        def attempt(cur) -> tuple[int, UpsertStats]:
+            batch_stats = UpsertStats()
+            written = self.upsert_batch(
+                cur,
+                table,
+                columns,
+                rows,
+                conflict_columns,
+                update_columns,
+                method=method,
+                stats=batch_stats,
+                generation=generation,
+                raw_blobs=raw_blobs,
+            )
+            return written, batch_stats
+
+        written, batch_stats = self.run_transaction(attempt, label=f"upsert {table}")
+        if stats is not None:
+            stats.add(batch_stats)
+        return written
+
     def upsert_batch(
         self,
         cur,
@@ -58,33 +376,436 @@ class Database:
         rows: Sequence[tuple],
         conflict_columns: list[str],
         update_columns: list[str],
+        method: str = "insert",
+        stats: Optional[UpsertStats] = None,
+        generation: Optional[int] = None,
+        raw_blobs: bool = False,
     ) -> int:
-        """Bulk upsert using execute_values with ON CONFLICT DO UPDATE.
+        """Bulk upsert with ON CONFLICT DO UPDATE, skipping unchanged rows.
+
+        ``method`` selects how rows reach the server:
+
+          - "insert": execute_values with a multi-row VALUES list (default)
+          - "copy":   COPY FROM STDIN into a session-local staging table, then
+                      one set-based INSERT ... SELECT ... ON CONFLICT merge
+
+        A content_hash over the update columns is appended to every row and
+        the DO UPDATE is guarded by ``content_hash IS DISTINCT FROM``, so rows
+        whose payload is unchanged keep their existing tuple (no new heap
+        version, index entries, TOAST or WAL).  Soft-deleted rows that show
+        up again are always rewritten and revived.
 
-        Returns the number of rows affected.
+        When ``generation`` is given (mark-and-sweep, see sweep_unseen), rows
+        are also stamped with it.  Unchanged rows then get a narrow stamp that
+        keeps every other column -- including the TOAST pointer of
+        raw_response -- as it is, so the update stays HOT-eligible.
 
-        PG18 note: PostgreSQL 18 supports RETURNING OLD/NEW on DML statements,
-        enabling change-detection (did the row actually change?) in a single
-        round-trip.  This is not yet used here because psycopg2's
-        execute_values does not support RETURNING with batch operations.
-        Consider migrating to psycopg3's executemany + RETURNING OLD/NEW for
-        per-row change tracking in a future iteration.
+        With ``raw_blobs`` the raw_response payloads go to the tenant's
+        content-addressed raw_response_blobs (only digests not stored yet are
+        sent) and rows keep '{}' plus a raw_response_digest reference.
+
+        Returns the number of rows written (inserted + changed).  Pass
+        ``stats`` to accumulate the inserted/updated/unchanged breakdown.
         """
         if not rows:
             return 0
+        if method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method {method!r}")
+        if raw_blobs and "raw_response" in columns:
+            columns, rows, update_columns, blobs = _externalise_raw(
+                columns, rows, update_columns
+            )
+            self._store_blobs(cur, blobs)
+
+        columns, rows, conflict_list, on_conflict = prepare_upsert(
+            table, columns, rows, conflict_columns, update_columns, generation
+        )
+        start = time.monotonic()
+        if method == "copy":
+            written = self._copy_merge(
+                cur, table, columns, rows, conflict_list, on_conflict
+            )
+        else:
+            written = self._insert_values(cur, table, columns, rows, on_conflict)
+        self.metrics.statement(
+            table,
+            f"INSERT INTO {table} ({', '.join(columns)}) /* {method} */ {on_conflict}",
+            time.monotonic() - start,
+            len(rows),
+            estimate_row_bytes(rows),
+        )
+        return tally(written, len(rows), stats)
+
+    def _store_blobs(self, cur, blobs: dict[tuple[str, str], str]) -> int:
+        """Insert the payloads whose digests the tenant has not stored yet.
 
-        col_list = ", ".join(columns)
-        conflict_list = ", ".join(conflict_columns)
-        set_clauses = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
-        # Always refresh timestamps on update
-        set_clauses += ", updated_at = NOW(), last_synced_at = NOW()"
+        The existence check ships digests only, so payloads that are already
+        stored (the common case on every sync after the first) never cross
+        the wire.  Returns the number of new blobs.
+        """
+        by_tenant: dict[str, dict[str, str]] = {}
+        for (tenant_id, digest), payload in blobs.items():
+            by_tenant.setdefault(tenant_id, {})[digest] = payload
+        added = nbytes = 0
+        start = time.monotonic()
+        for tenant_id, payloads in by_tenant.items():
+            cur.execute(_BLOB_EXISTING_SQL, (tenant_id, list(payloads)))
+            for (digest,) in cur.fetchall():
+                payloads.pop(digest, None)
+            if not payloads:
+                continue
+            sizes = [len(p.encode()) for p in payloads.values()]
+            cur.execute(
+                _BLOB_INSERT_SQL,
+                (tenant_id, list(payloads), list(payloads.values()), sizes),
+            )
+            added += cur.rowcount
+            nbytes += sum(sizes)
+        self.metrics.statement(
+            RAW_BLOB_TABLE, _BLOB_INSERT_SQL, time.monotonic() - start, added, nbytes
+        )
+        return added
 
-        sql = (
-            f"INSERT INTO {table} ({col_list}) VALUES %s "
-            f"ON CONFLICT ({conflict_list}) DO UPDATE SET {set_clauses}"
+    def _insert_values(
+        self,
+        cur,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        on_conflict: str,
+    ) -> list[tuple]:
+        """Insert method: execute_values pages; returns the RETURNING rows."""
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s {on_conflict}"
+        row_bytes = max(1, estimate_row_bytes(rows) // len(rows))
+        page_size = max(1, min(len(rows), MAX_STATEMENT_BYTES // row_bytes))
+        return psycopg2.extras.execute_values(
+            cur, sql, rows, page_size=page_size, fetch=True
         )
 
-        psycopg2.extras.execute_values(cur, sql, rows, page_size=500)
+    def _copy_rows(self, cur, copy_sql: str, rows: Sequence[tuple]) -> None:
+        cur.copy_expert(copy_sql, _copy_buffer(rows))
+
+    @staticmethod
+    def _json(value: Any):
+        """Adapt a Python object for a JSONB parameter."""
+        return psycopg2.extras.Json(value)
+
+    def _copy_merge(
+        self,
+        cur,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        conflict_list: str,
+        on_conflict: str,
+    ) -> list[tuple]:
+        """Stream rows into a temp staging table via COPY, then merge once.
+
+        See copy_stage_sql.  Returns the merge's RETURNING rows.
+        """
+        create, copy, merge, truncate = copy_stage_sql(
+            table, columns, conflict_list, on_conflict
+        )
+        cur.execute(create)
+        self._copy_rows(cur, copy, rows)
+        cur.execute(merge)
+        written = cur.fetchall()
+        # Leave the stage empty for any further batches in this transaction
+        cur.execute(truncate)
+        return written
+
+    def parallel_upsert(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        conflict_columns: list[str],
+        update_columns: list[str],
+        workers: int = 4,
+        batch_size: int = 500,
+        method: str = "insert",
+        stats: Optional[UpsertStats] = None,
+        generation: Optional[int] = None,
+        raw_blobs: bool = False,
+        timings: Optional[list[tuple[int, float, int]]] = None,
+    ) -> int:
+        """Upsert rows concurrently over several pooled connections.
+
+        Rows are de-duplicated by conflict key (last occurrence wins), sorted
+        by key and hash-partitioned by key into ``workers`` partitions.  Each
+        partition is written by its own thread in ``batch_size`` transactions.
+        Because no key appears in two partitions, concurrent ON CONFLICT
+        writers never wait on each other's row locks and cannot deadlock.
+
+        ``workers`` is capped at max_connections - 1 so the caller's thread
+        keeps a connection (ThreadedConnectionPool raises rather than blocks
+        when exhausted).  Returns the number of rows written.  ``timings``,
+        like ``stats``, is filled in for the caller: one (rows, seconds,
+        estimated bytes) entry per committed batch, for BatchSizeTuner.observe.
+        """
+        if not rows:
+            return 0
+        key_idx = [columns.index(c) for c in conflict_columns]
+        unique = {tuple(row[i] for i in key_idx): row for row in rows}
+        keys = sorted(unique)
+
+        workers = max(1, min(workers, self.max_connections - 1))
+        workers = min(workers, -(-len(keys) // batch_size))
+        partitions: list[list[tuple]] = [[] for _ in range(workers)]
+        for key in keys:
+            partitions[hash(key) % workers].append(unique[key])
+
+        def write(
+            part: list[tuple],
+        ) -> tuple[int, UpsertStats, list[tuple[int, float, int]]]:
+            part_stats = UpsertStats()
+            part_timings: list[tuple[int, float, int]] = []
+            written = 0
+            for i in range(0, len(part), batch_size):
+                batch = part[i : i + batch_size]
+                start = time.monotonic()
+                written += self.upsert_in_transaction(
+                    table,
+                    columns,
+                    batch,
+                    conflict_columns,
+                    update_columns,
+                    method=method,
+                    stats=part_stats,
+                    generation=generation,
+                    raw_blobs=raw_blobs,
+                )
+                part_timings.append(
+                    (len(batch), time.monotonic() - start, estimate_row_bytes(batch))
+                )
+            return written, part_stats, part_timings
+
+        total = 0
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"upsert-{table}"
+        ) as pool:
+            for written, part_stats, part_timings in pool.map(write, partitions):
+                total += written
+                if stats is not None:
+                    stats.add(part_stats)
+                if timings is not None:
+                    timings.extend(part_timings)
+        return total
+
+    # ------------------------------------------------------------------
+    # Read replica
+    # ------------------------------------------------------------------
+
+    @property
+    def has_replica(self) -> bool:
+        return self._replica_pool is not None
+
+    def primary_lsn(self) -> int:
+        """Current WAL position of the primary, in bytes (a read fence)."""
+        with self.transaction() as cur:
+            cur.execute("SELECT pg_current_wal_lsn() - '0/0'::pg_lsn")
+            return int(cur.fetchone()[0])
+
+    def _check_replica(self) -> None:
+        lag = lsn = None
+        try:
+            with self.connection(self._replica_pool) as conn:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(_REPLICA_STATUS_SQL)
+                        lag, lsn = cur.fetchone()
+                finally:
+                    if not conn.closed:
+                        conn.rollback()
+        except Exception as exc:
+            logger.warning("Replica status check failed, reading from primary: %s", exc)
+        if lag is None or lag > self.replica_max_lag_seconds:
+            if self._replica_lag is not None and (
+                self._replica_lag <= self.replica_max_lag_seconds
+            ):
+                logger.warning(
+                    "Replica lag %s exceeds %.0fs, reading from primary",
+                    "unknown" if lag is None else f"{lag:.1f}s",
+                    self.replica_max_lag_seconds,
+                )
+        self._replica_lag = None if lag is None else float(lag)
+        self._replica_lsn = -1 if lsn is None else int(lsn)
+        self._replica_checked_at = time.monotonic()
+
+    def _read_pool(self, min_lsn: Optional[int] = None):
+        """Replica pool if it is healthy, within max lag and past ``min_lsn``."""
+        if self._replica_pool is None:
+            return self._pool
+        deadline = time.monotonic() + REPLICA_FENCE_WAIT_SECONDS
+        while True:
+            with self._replica_lock:
+                now = time.monotonic()
+                if now - self._replica_checked_at >= self.replica_check_seconds or (
+                    min_lsn is not None and self._replica_lsn < min_lsn
+                ):
+                    self._check_replica()
+                lag, lsn = self._replica_lag, self._replica_lsn
+            if lag is None or lag > self.replica_max_lag_seconds:
+                return self._pool
+            if min_lsn is None or lsn >= min_lsn:
+                return self._replica_pool
+            if time.monotonic() >= deadline:
+                return self._pool
+            time.sleep(0.05)
+
+    @contextmanager
+    def _read_connection(self, min_lsn: Optional[int] = None) -> Generator:
+        pool = self._read_pool(min_lsn)
+        with self.connection(pool) as conn:
+            try:
+                if pool is self._pool:
+                    with conn.cursor() as cur:
+                        cur.execute("SET TRANSACTION READ ONLY")
+                yield conn
+            except self._DISCONNECT_ERRORS:
+                if pool is self._replica_pool:
+                    # Re-check the replica before routing the next read to it
+                    self._replica_checked_at = float("-inf")
+                raise
+            finally:
+                if not conn.closed:
+                    conn.rollback()
+
+    @contextmanager
+    def read_only(self, min_lsn: Optional[int] = None) -> Generator:
+        """Yield a cursor in a read-only transaction, preferably on the replica.
+
+        Without a replica, or while its replay lag exceeds
+        DB_REPLICA_MAX_LAG_SECONDS (checked at most every
+        DB_REPLICA_CHECK_SECONDS) or its status cannot be read, the read runs
+        on the primary.  ``min_lsn`` (from primary_lsn()) additionally
+        requires the replica to have replayed up to that point -- use it to
+        read back rows committed earlier in the same sync.
+        """
+        with self._read_connection(min_lsn) as conn:
+            with conn.cursor() as cur:
+                yield cur
+
+    def copy_into(self, cur, table: str, columns: list[str], rows: Sequence[tuple]):
+        """COPY rows into ``table`` (e.g. a temp table) on ``cur``'s connection."""
+        self._copy_rows(cur, f"COPY {table} ({', '.join(columns)}) FROM STDIN", rows)
+
+    # ------------------------------------------------------------------
+    # Streaming reads
+    # ------------------------------------------------------------------
+
+    def iter_query(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        itersize: Optional[int] = None,
+        replica: bool = False,
+    ) -> Iterator[tuple]:
+        """Stream a query's rows as tuples through a named server-side cursor.
+
+        Rows are fetched ``itersize`` at a time (default config itersize), so
+        memory stays bounded whatever the result size.  One pooled connection
+        and its read transaction are held until the iterator is exhausted or
+        closed -- for loops doing slow per-row work such as API calls, prefer
+        iter_keyset, which holds neither between chunks.
+
+        ``replica=True`` reads through read_only(), fenced at the primary's
+        current WAL position so everything committed before the call is seen.
+        """
+        min_lsn = self.primary_lsn() if replica and self.has_replica else None
+        with self._read_connection(min_lsn) if replica else self.connection() as conn:
+            try:
+                with conn.cursor(name=f"iter_{uuid.uuid4().hex[:12]}") as cur:
+                    cur.itersize = itersize or self.itersize
+                    cur.execute(sql, params)
+                    yield from cur
+            finally:
+                if not conn.closed:
+                    conn.rollback()
+
+    def iter_keyset(
+        self,
+        table: str,
+        columns: list[str],
+        key_columns: list[str],
+        where: str = "TRUE",
+        params: Sequence[Any] = (),
+        chunk_size: Optional[int] = None,
+        replica: bool = False,
+    ) -> Iterator[list[tuple]]:
+        """Yield ``columns`` of ``table`` in key order, one chunk per query.
+
+        Keyset pagination: each chunk is a separate short transaction that
+        resumes after the last key seen (``(keys) > (last)``), so no
+        connection or snapshot is held while the caller works on a chunk.
+        ``key_columns`` must be among ``columns`` and unique under ``where``
+        (ideally a suffix of a tenant-leading unique index).  ``replica``
+        behaves as in iter_query, with one fence for the whole iteration.
+        """
+        min_lsn = self.primary_lsn() if replica and self.has_replica else None
+        size = chunk_size or self.itersize
+        key_idx = [columns.index(c) for c in key_columns]
+        keys = ", ".join(key_columns)
+        after = f" AND ({keys}) > ({', '.join(['%s'] * len(key_columns))})"
+        last: Optional[tuple] = None
+        while True:
+            with self.read_only(min_lsn) if replica else self.transaction() as cur:
+                cur.execute(
+                    f"SELECT {', '.join(columns)} FROM {table} "
+                    f"WHERE ({where}){after if last else ''} "
+                    f"ORDER BY {keys} LIMIT %s",
+                    (*params, *(last or ()), size),
+                )
+                chunk = cur.fetchall()
+            if chunk:
+                yield chunk
+            if len(chunk) < size:
+                return
+            last = tuple(chunk[-1][i] for i in key_idx)
+
+    def next_sync_generation(self) -> int:
+        """Allocate a new, monotonically increasing sync generation."""
+        with self.transaction() as cur:
+            cur.execute("SELECT nextval('ingestion_sync_generation_seq')")
+            return cur.fetchone()[0]
+
+    def prune_raw_blobs(self, tenant_id: str, min_age_seconds: float = 86400) -> int:
+        """Delete the tenant's unreferenced raw_response_blobs.
+
+        Only blobs older than ``min_age_seconds`` go, so a payload stored by
+        a sync still in flight is kept.  Returns the number deleted.
+        """
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.prune_raw_blobs(tenant_id, min_age_seconds)
+        with self.transaction() as cur:
+            start = time.monotonic()
+            cur.execute(_BLOB_PRUNE_SQL, (tenant_id, min_age_seconds))
+            deleted = cur.fetchone()[0]
+            self.metrics.statement(
+                RAW_BLOB_TABLE, _BLOB_PRUNE_SQL, time.monotonic() - start, deleted
+            )
+        return deleted
+
+    def sweep_unseen(
+        self,
+        cur,
+        table: str,
+        tenant_id: str,
+        generation: int,
+        scope: Optional[dict[str, Any]] = None,
+    ) -> int:
+        """Soft-delete live rows not stamped by ``generation`` (or any later one).
+
+        One set-based UPDATE per table, driven by the tenant-leading unique
+        index.  ``scope`` adds equality filters (column -> value) for partial
+        syncs.  Returns the number of rows soft-deleted.
+        """
+        filters = "".join(f" AND {col} = %s" for col in scope or {})
+        sql = SWEEP_SQL.format(table=table, filters=filters)
+        start = time.monotonic()
+        cur.execute(sql, (tenant_id, generation, *(scope or {}).values()))
+        self.metrics.statement(table, sql, time.monotonic() - start, cur.rowcount)
         return cur.rowcount
 
     # ------------------------------------------------------------------
@@ -99,18 +820,19 @@ class Database:
         metadata: Optional[dict] = None,
     ) -> str:
         """Insert a new ingestion_runs row with status RUNNING. Returns the run id."""
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.record_run_start(tenant_id, provider, entity_type, metadata)
         run_id = str(uuid.uuid4())
         with self.transaction() as cur:
             cur.execute(
-                """INSERT INTO ingestion_runs
-                   (id, tenant_id, provider, entity_type, status, run_metadata)
-                   VALUES (%s, %s, %s, %s, 'RUNNING', %s)""",
+                RUN_START_SQL,
                 (
                     run_id,
                     tenant_id,
                     provider,
                     entity_type,
-                    psycopg2.extras.Json(metadata or {}),
+                    self._json(metadata or {}),
                 ),
             )
         return run_id
@@ -124,29 +846,125 @@ class Database:
         records_deleted: int = 0,
         error_message: Optional[str] = None,
         error_detail: Optional[dict] = None,
+        metadata: Optional[dict] = None,
     ) -> None:
-        """Finalise an ingestion_runs row."""
+        """Finalise an ingestion_runs row. ``metadata`` is merged into run_metadata."""
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.record_run_end(
+                run_id,
+                tenant_id,
+                status,
+                records_upserted,
+                records_deleted,
+                error_message,
+                error_detail,
+                metadata,
+            )
         with self.transaction() as cur:
             cur.execute(
-                """UPDATE ingestion_runs
-                   SET status = %s,
-                       finished_at = NOW(),
-                       records_upserted = %s,
-                       records_deleted = %s,
-                       error_message = %s,
-                       error_detail = %s
-                   WHERE id = %s AND tenant_id = %s""",
+                RUN_END_SQL,
                 (
                     status,
                     records_upserted,
                     records_deleted,
                     error_message,
-                    psycopg2.extras.Json(error_detail) if error_detail else None,
+                    self._json(error_detail) if error_detail else None,
+                    self._json(metadata or {}),
                     run_id,
                     tenant_id,
                 ),
             )
 
+    def get_last_run_metadata(self, tenant_id: str, provider: str) -> dict[str, Any]:
+        """run_metadata of the provider's latest successful run ({} if none)."""
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.get_last_run_metadata(tenant_id, provider)
+        with self.transaction() as cur:
+            cur.execute(LAST_RUN_METADATA_SQL, (tenant_id, provider))
+            row = cur.fetchone()
+        return (row[0] if row else None) or {}
+
+    def save_checkpoint(
+        self, run_id: str, tenant_id: str, checkpoint: dict[str, Any]
+    ) -> None:
+        """Store a running sync's progress in its run_metadata["checkpoint"]."""
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.save_checkpoint(run_id, tenant_id, checkpoint)
+        with self.transaction() as cur:
+            cur.execute(
+                _SAVE_CHECKPOINT_SQL, (self._json(checkpoint), run_id, tenant_id)
+            )
+
+    def get_resumable_checkpoint(
+        self,
+        tenant_id: str,
+        provider: str,
+        max_age_seconds: float,
+        live_seconds: float,
+    ) -> Optional[tuple[str, dict[str, Any]]]:
+        """(run id, checkpoint) of an interrupted run to resume, or None.
+
+        Only the provider's latest run qualifies, and only if it started
+        within ``max_age_seconds``, did not succeed and left a checkpoint.
+        A RUNNING run that saved its checkpoint within ``live_seconds`` is
+        taken to be still alive, not interrupted.
+        """
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.get_resumable_checkpoint(
+                tenant_id, provider, max_age_seconds, live_seconds
+            )
+        with self.transaction() as cur:
+            cur.execute(_LATEST_RUN_SQL, (tenant_id, provider, max_age_seconds))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        run_id, status, checkpoint, now = row
+        if status == "SUCCESS" or not checkpoint:
+            return None
+        if status == "RUNNING" and now - checkpoint.get("saved_at", 0) < live_seconds:
+            return None
+        return str(run_id), checkpoint
+
+    def close_interrupted_run(self, run_id: str, tenant_id: str, message: str) -> None:
+        """Mark a run left RUNNING by a killed process as FAILED."""
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.close_interrupted_run(run_id, tenant_id, message)
+        with self.transaction() as cur:
+            cur.execute(_INTERRUPTED_RUN_SQL, (message, run_id, tenant_id))
+
+    def shard_load(self, hours: int = 24) -> dict[str, Any]:
+        """Aggregate ingestion_runs activity on this shard over the last hours."""
+        with self.transaction() as cur:
+            cur.execute(
+                """SELECT COUNT(*),
+                          COUNT(DISTINCT tenant_id),
+                          COUNT(*) FILTER (WHERE status = 'RUNNING'),
+                          COUNT(*) FILTER (WHERE status = 'FAILED'),
+                          COALESCE(SUM(records_upserted), 0),
+                          COALESCE(SUM(records_deleted), 0),
+                          COALESCE(EXTRACT(EPOCH FROM
+                              SUM(COALESCE(finished_at, NOW()) - started_at)), 0)::float8
+                   FROM ingestion_runs
+                   WHERE started_at > NOW() - make_interval(hours => %s)""",
+                (hours,),
+            )
+            row = cur.fetchone()
+        keys = (
+            "runs",
+            "tenants",
+            "running",
+            "failed",
+            "records_upserted",
+            "records_deleted",
+            "run_seconds",
+        )
+        return dict(zip(keys, row))
+
     def get_recent_runs(
         self,
         tenant_id: str,
@@ -154,7 +972,10 @@ class Database:
         limit: int = 10,
     ) -> list[dict[str, Any]]:
         """Fetch recent ingestion runs for status display."""
-        with self.transaction() as cur:
+        shard = self.for_tenant(tenant_id)
+        if shard is not self:
+            return shard.get_recent_runs(tenant_id, provider, limit)
+        with self.read_only() as cur:
             if provider:
                 cur.execute(
                     """SELECT id, provider, entity_type, status, started_at,
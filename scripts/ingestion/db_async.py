@@ -0,0 +1,313 @@
+"""asyncio counterpart of Database on async psycopg 3.
+
+Meant to let a sync overlap network fetches and database writes in one
+event loop instead of alternating between them.  No provider or
+BaseProvider.sync_with_tracking path uses it yet: the provider SDKs
+(requests, googleapiclient, boto3, the GCP gRPC clients) are blocking, and
+providers get their fetch/write overlap from the thread-based pipeline
+(pipeline.py) on Database instead.  Today AsyncDatabase backs
+benchmarks/async_sync.py only.  The SQL -- ON CONFLICT change
+detection, sync-generation stamping, COPY staging merge, sweeps and run
+tracking -- is shared with db.Database through db_sql; only the driver
+calls differ.  Tenant shards, the read replica, instrumentation and the
+raw_response blob store are Database-only: AsyncDatabase rejects a config or
+call that asks for them rather than silently going without.
+
+Usage:
+    async with AsyncDatabase(config.database) as db:
+        async with db.transaction() as cur:
+            await db.upsert_batch(cur, table, columns, rows, conflict, update)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, Sequence, TypeVar
+
+import psycopg
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+
+from scripts.ingestion.config import DatabaseConfig
+from scripts.ingestion.db import LOAD_METHODS
+from scripts.ingestion.db_sql import (
+    LAST_RUN_METADATA_SQL,
+    RETRYABLE_SQLSTATES,
+    RUN_END_SQL,
+    RUN_START_SQL,
+    SWEEP_SQL,
+    UpsertStats,
+    copy_stage_sql,
+    prepare_upsert,
+    retry_delay,
+    row_insert_sql,
+    sqlstate,
+    tally,
+)
+
+logger = logging.getLogger("ingestion.db_async")
+
+T = TypeVar("T")
+
+
+class AsyncDatabase:
+    """AsyncConnectionPool wrapper mirroring Database's write interface.
+
+    Sized by DatabaseConfig.async_min_connections/async_max_connections.
+    Unlike ThreadedConnectionPool, the pool makes callers wait for a free
+    connection, so many concurrent tasks can share a small pool.
+    """
+
+    def __init__(self, config: DatabaseConfig) -> None:
+        unsupported = [
+            name
+            for name, wanted in (
+                ("shards", config.shards),
+                ("replica_url", config.replica_url),
+                ("metrics_sink", config.metrics_sink != "none"),
+            )
+            if wanted
+        ]
+        if unsupported:
+            raise ValueError(
+                f"AsyncDatabase does not support {', '.join(unsupported)}; "
+                "use Database"
+            )
+        self.max_connections = config.async_max_connections
+        self.retry_attempts = config.retry_attempts
+        self.retry_base_delay = config.retry_base_delay
+        self.retry_max_delay = config.retry_max_delay
+        self._pool = AsyncConnectionPool(
+            config.url,
+            min_size=config.async_min_connections,
+            max_size=config.async_max_connections,
+            kwargs={"prepare_threshold": 0},
+            open=False,
+        )
+
+    async def open(self) -> None:
+        await self._pool.open(wait=True)
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    async def __aenter__(self) -> AsyncDatabase:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncGenerator:
+        """Yield a cursor inside an auto-commit/rollback transaction."""
+        async with self._pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    yield cur
+
+    @staticmethod
+    def is_retryable(exc: BaseException) -> bool:
+        """Same classification as Database.is_retryable."""
+        state = sqlstate(exc)
+        if state:
+            return state in RETRYABLE_SQLSTATES or state.startswith("08")
+        return isinstance(exc, (psycopg.OperationalError, psycopg.InterfaceError))
+
+    async def run_transaction(
+        self, fn: Callable[[Any], Awaitable[T]], label: str = "batch"
+    ) -> T:
+        """Async Database.run_transaction: await ``fn(cur)``, retrying transients."""
+        attempt = 0
+        while True:
+            try:
+                async with self.transaction() as cur:
+                    return await fn(cur)
+            except Exception as exc:
+                if attempt >= self.retry_attempts or not self.is_retryable(exc):
+                    raise
+                delay = retry_delay(
+                    attempt, self.retry_base_delay, self.retry_max_delay
+                )
+                attempt += 1
+                logger.warning(
+                    "Transient database error in %s (%s), retrying in %.2fs "
+                    "(attempt %d/%d): %s",
+                    label,
+                    sqlstate(exc) or type(exc).__name__,
+                    delay,
+                    attempt,
+                    self.retry_attempts,
+                    exc,
+                )
+                await asyncio.sleep(delay)
+
+    async def upsert_in_transaction(
+        self,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        conflict_columns: list[str],
+        update_columns: list[str],
+        method: str = "insert",
+        stats: Optional[UpsertStats] = None,
+        generation: Optional[int] = None,
+        raw_blobs: bool = False,
+    ) -> int:
+        """Async Database.upsert_in_transaction."""
+
+        async def attempt(cur) -> tuple[int, UpsertStats]:
+            batch_stats = UpsertStats()
+            written = await self.upsert_batch(
+                cur,
+                table,
+                columns,
+                rows,
+                conflict_columns,
+                update_columns,
+                method=method,
+                stats=batch_stats,
+                generation=generation,
+                raw_blobs=raw_blobs,
+            )
+            return written, batch_stats
+
+        written, batch_stats = await self.run_transaction(
+            attempt, label=f"upsert {table}"
+        )
+        if stats is not None:
+            stats.add(batch_stats)
+        return written
+
+    async def upsert_batch(
+        self,
+        cur,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        conflict_columns: list[str],
+        update_columns: list[str],
+        method: str = "insert",
+        stats: Optional[UpsertStats] = None,
+        generation: Optional[int] = None,
+        raw_blobs: bool = False,
+    ) -> int:
+        """Async Database.upsert_batch: same SQL, methods and return value.
+
+        "insert" sends one single-row prepared INSERT per row in a pipeline;
+        "copy" streams rows into the staging table and merges once.
+        ``raw_blobs`` is not supported.
+        """
+        if not rows:
+            return 0
+        if method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method {method!r}")
+        if raw_blobs:
+            raise ValueError("AsyncDatabase does not support raw_blobs; use Database")
+
+        columns, rows, conflict_list, on_conflict = prepare_upsert(
+            table, columns, rows, conflict_columns, update_columns, generation
+        )
+        if method == "copy":
+            create, copy_sql, merge, truncate = copy_stage_sql(
+                table, columns, conflict_list, on_conflict
+            )
+            await cur.execute(create)
+            async with cur.copy(copy_sql) as copy:
+                for row in rows:
+                    await copy.write_row(row)
+            await cur.execute(merge)
+            written = await cur.fetchall()
+            await cur.execute(truncate)
+        else:
+            written = []
+            async with cur.connection.pipeline():
+                await cur.executemany(
+                    row_insert_sql(table, columns, on_conflict), rows, returning=True
+                )
+                while True:
+                    written.extend(await cur.fetchall())
+                    if not cur.nextset():
+                        break
+        return tally(written, len(rows), stats)
+
+    async def next_sync_generation(self) -> int:
+        """Allocate a new, monotonically increasing sync generation."""
+        async with self.transaction() as cur:
+            await cur.execute("SELECT nextval('ingestion_sync_generation_seq')")
+            return (await cur.fetchone())[0]
+
+    async def sweep_unseen(
+        self,
+        cur,
+        table: str,
+        tenant_id: str,
+        generation: int,
+        scope: Optional[dict[str, Any]] = None,
+    ) -> int:
+        """Async Database.sweep_unseen."""
+        filters = "".join(f" AND {col} = %s" for col in scope or {})
+        await cur.execute(
+            SWEEP_SQL.format(table=table, filters=filters),
+            (tenant_id, generation, *(scope or {}).values()),
+        )
+        return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Ingestion run tracking
+    # ------------------------------------------------------------------
+
+    async def record_run_start(
+        self,
+        tenant_id: str,
+        provider: str,
+        entity_type: Optional[str] = None,
+        metadata: Optional[dict] = None,
+    ) -> str:
+        """Insert a new ingestion_runs row with status RUNNING. Returns the run id."""
+        run_id = str(uuid.uuid4())
+        async with self.transaction() as cur:
+            await cur.execute(
+                RUN_START_SQL,
+                (run_id, tenant_id, provider, entity_type, Jsonb(metadata or {})),
+            )
+        return run_id
+
+    async def record_run_end(
+        self,
+        run_id: str,
+        tenant_id: str,
+        status: str,
+        records_upserted: int = 0,
+        records_deleted: int = 0,
+        error_message: Optional[str] = None,
+        error_detail: Optional[dict] = None,
+        metadata: Optional[dict] = None,
+    ) -> None:
+        """Finalise an ingestion_runs row. ``metadata`` is merged into run_metadata."""
+        async with self.transaction() as cur:
+            await cur.execute(
+                RUN_END_SQL,
+                (
+                    status,
+                    records_upserted,
+                    records_deleted,
+                    error_message,
+                    Jsonb(error_detail) if error_detail else None,
+                    Jsonb(metadata or {}),
+                    run_id,
+                    tenant_id,
+                ),
+            )
+
+    async def get_last_run_metadata(
+        self, tenant_id: str, provider: str
+    ) -> dict[str, Any]:
+        """run_metadata of the provider's latest successful run ({} if none)."""
+        async with self.transaction() as cur:
+            await cur.execute(LAST_RUN_METADATA_SQL, (tenant_id, provider))
+            row = await cur.fetchone()
+        return (row[0] if row else None) or {}
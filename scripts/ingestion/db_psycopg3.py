@@ -0,0 +1,72 @@
+"""psycopg 3 Database backend: pipeline-mode executemany with RETURNING.
+
+psycopg2's execute_values has to inline every row into one multi-row VALUES
+statement per page.  psycopg 3 can instead send the same single-row INSERT
+once per row as a server-side prepared statement, pipelined so the client
+never waits for a round trip between rows, and still collect each row's
+RETURNING result.  Selected with DB_BACKEND=psycopg3; everything else
+(ON CONFLICT SQL, change detection, sweeps, run tracking) is inherited.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+import psycopg
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from scripts.ingestion.config import DatabaseConfig
+from scripts.ingestion.db import Database
+from scripts.ingestion.db_sql import row_insert_sql
+
+
+class Psycopg3Database(Database):
+    """Database on a psycopg_pool.ConnectionPool using pipeline mode."""
+
+    _DISCONNECT_ERRORS = (psycopg.OperationalError, psycopg.InterfaceError)
+
+    def _open_pool(self, config: DatabaseConfig) -> ConnectionPool:
+        # prepare_threshold=0 prepares each statement on its first execution;
+        # the upsert SQL for a table is identical for every batch of a sync.
+        return ConnectionPool(
+            config.url,
+            min_size=config.min_connections,
+            max_size=config.max_connections,
+            kwargs={"prepare_threshold": 0},
+            open=True,
+        )
+
+    def _close_pool(self, pool) -> None:
+        pool.close()
+
+    def _insert_values(
+        self,
+        cur,
+        table: str,
+        columns: list[str],
+        rows: Sequence[tuple],
+        on_conflict: str,
+    ) -> list[tuple]:
+        """Insert method: one pipelined executemany, RETURNING per row."""
+        written: list[tuple] = []
+        with cur.connection.pipeline():
+            cur.executemany(
+                row_insert_sql(table, columns, on_conflict), rows, returning=True
+            )
+            # One result set per row; rows skipped by the DO UPDATE guard
+            # produce an empty one.
+            while True:
+                written.extend(cur.fetchall())
+                if not cur.nextset():
+                    break
+        return written
+
+    def _copy_rows(self, cur, copy_sql: str, rows: Sequence[tuple]) -> None:
+        with cur.copy(copy_sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+    @staticmethod
+    def _json(value: Any):
+        return Jsonb(value)
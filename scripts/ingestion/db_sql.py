@@ -0,0 +1,209 @@
+"""SQL and driver-neutral helpers shared by the Database backends.
+
+db.Database (psycopg2), db_psycopg3.Psycopg3Database and
+db_async.AsyncDatabase build the same statements from these: the ON
+CONFLICT change detection and sync-generation stamping, the COPY staging
+merge, deletion sweeps and run tracking, plus the retry classification.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+# SQLSTATEs worth retrying a whole batch transaction for: serialization
+# failure, deadlock, lock timeout, admin/crash shutdown, too many
+# connections, and every connection exception (class 08)
+RETRYABLE_SQLSTATES = frozenset(
+    {"40001", "40P01", "55P03", "57P01", "57P02", "57P03", "53300"}
+)
+
+
+def content_hash(row: tuple, indexes: list[int]) -> str:
+    """Stable digest of the columns an upsert would overwrite."""
+    values = tuple(row[i] for i in indexes)
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class UpsertStats:
+    """Per-row outcome counts accumulated across upsert_batch calls."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "rows_inserted": self.inserted,
+            "rows_updated": self.updated,
+            "rows_unchanged": self.unchanged,
+        }
+
+    def add(self, other: UpsertStats) -> None:
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+
+
+def on_conflict_sql(
+    table: str, conflict_list: str, update_columns: list[str], stamped: bool
+) -> str:
+    """ON CONFLICT ... RETURNING tail shared by every upsert transfer method.
+
+    RETURNING yields (inserted, changed) per written row; rows skipped by the
+    WHERE guard are not returned at all.  ``changed`` relies on updated_at
+    only being set to NOW() -- the transaction timestamp -- on a real change.
+    Skipped rows keep their last_synced_at too (the time of the last write);
+    provider-level freshness comes from ingestion_provider_synced_at()
+    (schema/06_ingestion_change_detection.sql).
+
+    ``stamped`` (deletion detection) cannot skip unchanged rows: each is
+    updated once per run to record the generation, which costs a new heap
+    tuple and its WAL per row, like the unconditional upsert did.  Only the
+    data columns keep their old values (and TOAST pointers).  This is why
+    INGESTION_DETECT_DELETIONS is off by default.
+    """
+    changed = (
+        f"({table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        f"OR {table}.deleted_at IS NOT NULL)"
+    )
+    targets = [*update_columns, "content_hash"]
+    if stamped:
+        # Keep old values (and TOAST pointers) for rows that are only stamped
+        sets = [
+            f"{c} = CASE WHEN {changed} THEN EXCLUDED.{c} ELSE {table}.{c} END"
+            for c in targets
+        ]
+        sets += [
+            f"updated_at = CASE WHEN {changed} THEN NOW() ELSE {table}.updated_at END",
+            f"sync_generation = GREATEST({table}.sync_generation, "
+            f"EXCLUDED.sync_generation)",
+        ]
+        guard = (
+            f"{changed} OR {table}.sync_generation IS NULL "
+            f"OR {table}.sync_generation < EXCLUDED.sync_generation"
+        )
+    else:
+        sets = [f"{c} = EXCLUDED.{c}" for c in targets]
+        sets.append("updated_at = NOW()")
+        guard = changed
+    sets += ["last_synced_at = NOW()", "deleted_at = NULL"]
+    return (
+        f"ON CONFLICT ({conflict_list}) DO UPDATE SET {', '.join(sets)} "
+        f"WHERE {guard} "
+        f"RETURNING (xmax = 0) AS inserted, (updated_at = NOW()) AS changed"
+    )
+
+
+def prepare_upsert(
+    table: str,
+    columns: list[str],
+    rows: Sequence[tuple],
+    conflict_columns: list[str],
+    update_columns: list[str],
+    generation: Optional[int],
+) -> tuple[list[str], list[tuple], str, str]:
+    """Append content_hash (and sync_generation) to rows; build ON CONFLICT.
+
+    Returns (columns, rows, conflict_list, on_conflict) for either backend.
+    """
+    hash_idx = [columns.index(c) for c in update_columns]
+    extra: tuple = () if generation is None else (generation,)
+    rows = [row + (content_hash(row, hash_idx),) + extra for row in rows]
+    columns = [*columns, "content_hash"]
+    if generation is not None:
+        columns.append("sync_generation")
+    conflict_list = ", ".join(conflict_columns)
+    on_conflict = on_conflict_sql(
+        table, conflict_list, update_columns, stamped=generation is not None
+    )
+    return columns, rows, conflict_list, on_conflict
+
+
+def tally(written: Sequence[tuple], total: int, stats: Optional[UpsertStats]) -> int:
+    """Fold (inserted, changed) RETURNING rows into stats; return changed count."""
+    inserted = sum(1 for is_insert, _ in written if is_insert)
+    changed = sum(1 for _, is_changed in written if is_changed)
+    if stats is not None:
+        stats.inserted += inserted
+        stats.updated += changed - inserted
+        stats.unchanged += total - changed
+    return changed
+
+
+def copy_stage_sql(
+    table: str, columns: list[str], conflict_list: str, on_conflict: str
+) -> tuple[str, str, str, str]:
+    """(create, copy, merge, truncate) statements for the COPY staging merge.
+
+    The staging table lives for the session (pooled connections reuse it)
+    and is emptied on commit.  DISTINCT ON keeps the merge legal when a
+    batch repeats a conflict key, and the ORDER BY gives concurrent writers
+    a stable lock order.
+    """
+    col_list = ", ".join(columns)
+    # Column layouts differ with/without stamping; keep one stage per layout
+    layout = hashlib.blake2b(col_list.encode(), digest_size=4).hexdigest()
+    stage = f"_stage_{table}_{layout}"
+    return (
+        f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DELETE ROWS "
+        f"AS SELECT {col_list} FROM {table} WITH NO DATA",
+        f"COPY {stage} ({col_list}) FROM STDIN",
+        f"INSERT INTO {table} ({col_list}) "
+        f"SELECT DISTINCT ON ({conflict_list}) {col_list} FROM {stage} "
+        f"ORDER BY {conflict_list} {on_conflict}",
+        f"TRUNCATE {stage}",
+    )
+
+
+def row_insert_sql(table: str, columns: list[str], on_conflict: str) -> str:
+    """Single-row INSERT ... ON CONFLICT, executed once per row by executemany."""
+    placeholders = ", ".join(["%s"] * len(columns))
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({placeholders}) {on_conflict}"
+    )
+
+
+SWEEP_SQL = """UPDATE {table}
+    SET deleted_at = NOW(), updated_at = NOW()
+    WHERE tenant_id = %s
+      AND deleted_at IS NULL
+      AND (sync_generation IS NULL OR sync_generation < %s){filters}"""
+
+RUN_START_SQL = """INSERT INTO ingestion_runs
+   (id, tenant_id, provider, entity_type, status, run_metadata)
+   VALUES (%s, %s, %s, %s, 'RUNNING', %s)"""
+
+RUN_END_SQL = """UPDATE ingestion_runs
+   SET status = %s,
+       finished_at = NOW(),
+       records_upserted = %s,
+       records_deleted = %s,
+       error_message = %s,
+       error_detail = %s,
+       run_metadata = COALESCE(run_metadata, '{}'::jsonb) || %s
+   WHERE id = %s AND tenant_id = %s"""
+
+# Full syncs only; targeted entity runs (entity_type set) are skipped
+LAST_RUN_METADATA_SQL = """SELECT run_metadata FROM ingestion_runs
+   WHERE tenant_id = %s AND provider = %s AND status = 'SUCCESS'
+     AND entity_type IS NULL
+   ORDER BY started_at DESC LIMIT 1"""
+
+
+def sqlstate(exc: BaseException) -> Optional[str]:
+    # psycopg2 exposes .pgcode, psycopg 3 .sqlstate
+    return getattr(exc, "pgcode", None) or getattr(exc, "sqlstate", None)
+
+
+def retry_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given (0-based) attempt."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
@@ -20,7 +20,7 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
 from scripts.ingestion.config import load_config
-from scripts.ingestion.db import Database
+from scripts.ingestion.db import create_database
 from scripts.ingestion.logging_config import configure_logging
 
 logger = logging.getLogger("ingestion.lambda")
@@ -37,7 +37,7 @@ def handler(event: dict, context) -> dict:
     logger.info("Lambda invoked for provider=%s", provider)
 
     config = load_config()
-    db = Database(config.database)
+    db = create_database(config.database)
 
     try:
         if provider == "post-process":
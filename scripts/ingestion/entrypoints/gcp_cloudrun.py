@@ -19,7 +19,7 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 
 from scripts.ingestion.config import load_config
-from scripts.ingestion.db import Database
+from scripts.ingestion.db import create_database
 from scripts.ingestion.logging_config import configure_logging
 
 logger = logging.getLogger("ingestion.cloudrun")
@@ -36,7 +36,7 @@ def main() -> None:
     logger.info("Cloud Run Job started for provider=%s", provider)
 
     config = load_config()
-    db = Database(config.database)
+    db = create_database(config.database)
 
     try:
         if provider == "post-process":
@@ -3,47 +3,197 @@
 Uses the same CTE logic as scripts/seed_cloud_resources.py lines 284-391,
 but with soft-delete (SET deleted_at) then re-insert to avoid empty results
 during rebuild.
+
+A GrantScope limits the rebuild to one provider's grants on given resources
+or for given subjects (a group or team, or the group a user grant came
+through) -- what a targeted re-sync of one entity (cli.py sync --repo ...)
+can have changed.
+
+With a read replica configured (DATABASE_REPLICA_URL), the multi-way join
+runs on the replica first and its result is buffered locally (a RowBuffer,
+spilling past INGESTION_SPILL_RSS_MB).  Only then does the primary
+transaction open: it soft-deletes, copies the buffered rows into a
+temporary table and upserts from it, all on one connection, so grants are
+never left soft-deleted while the replica read is still streaming.
 """
 
 from __future__ import annotations
 
 import logging
+from dataclasses import dataclass
+from typing import Any, Optional
 
 from scripts.ingestion.config import IngestionConfig
 from scripts.ingestion.db import Database
+from scripts.ingestion.spill import RowBuffer
 
 logger = logging.getLogger("ingestion.grants_backfill")
 
+_GRANT_COLUMNS = [
+    "provider",
+    "resource_type",
+    "resource_id",
+    "resource_display_name",
+    "subject_type",
+    "subject_provider_id",
+    "subject_display_name",
+    "canonical_user_id",
+    "role_or_permission",
+    "access_path",
+    "via_group_id",
+    "via_group_display_name",
+]
+
+_STAGE_TABLE = "_grants_backfill_stage"
+
+# Applies to resource_access_grants and to the combined source rows alike
+_SCOPE_SQL = """provider = %(scope_provider)s
+  AND (resource_id = ANY(%(scope_resources)s)
+       OR subject_provider_id = ANY(%(scope_subjects)s)
+       OR via_group_id = ANY(%(scope_subjects)s))"""
+
+
+@dataclass(frozen=True)
+class GrantScope:
+    """Grants of ``provider`` on ``resource_ids`` or for ``subject_ids``."""
+
+    provider: str
+    resource_ids: tuple[str, ...] = ()
+    subject_ids: tuple[str, ...] = ()
+
 
 class GrantsBackfill:
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         self.config = config
-        self.db = db
+        self.db = db.for_tenant(config.tenant_id)
         self.tenant_id = config.tenant_id
 
-    def rebuild(self) -> dict[str, int]:
-        """Soft-delete existing grants, then re-insert from all provider sources."""
+    def rebuild(self, scope: Optional[GrantScope] = None) -> dict[str, int]:
+        """Soft-delete existing grants, then re-insert from all provider sources.
+
+        With ``scope`` only the grants it covers are rebuilt.
+        """
+        params: dict[str, Any] = {"tid": self.tenant_id}
+        where = ""
+        if scope is not None:
+            params.update(
+                scope_provider=scope.provider,
+                scope_resources=list(scope.resource_ids),
+                scope_subjects=list(scope.subject_ids),
+            )
+            where = f"\n  AND {_SCOPE_SQL}"
+        scoped = scope is not None
+        if not self.db.has_replica:
+            return self._replace(params, where, scoped, None)
+        with RowBuffer(
+            self.config.spill_rss_bytes,
+            directory=self.config.spill_dir,
+            label="grants",
+        ) as rows:
+            # Read in full before the primary transaction opens; fenced at
+            # the primary's current WAL position, so the replica has
+            # everything the provider syncs committed.
+            rows.extend(
+                self.db.iter_query(self._combined_sql(scoped), params, replica=True)
+            )
+            return self._replace(params, where, scoped, rows)
+
+    def _replace(
+        self,
+        params: dict[str, Any],
+        where: str,
+        scoped: bool,
+        rows: Optional[RowBuffer],
+    ) -> dict[str, int]:
+        """Soft-delete and re-insert in one transaction on one connection.
+
+        ``rows`` holds the grants computed on the replica; without it the
+        primary computes them itself.
+        """
         with self.db.transaction() as cur:
             # Step 1: Soft-delete existing grants
             cur.execute(
-                """UPDATE resource_access_grants
+                f"""UPDATE resource_access_grants
                    SET deleted_at = NOW()
-                   WHERE tenant_id = %s AND deleted_at IS NULL""",
-                (self.tenant_id,),
+                   WHERE tenant_id = %(tid)s AND deleted_at IS NULL{where}""",
+                params,
             )
             deleted = cur.rowcount
             logger.info("Soft-deleted %d existing grants", deleted)
 
             # Step 2: Re-insert from all provider sources
-            cur.execute(self._backfill_sql(), {"tid": self.tenant_id})
-            inserted = cur.rowcount
+            if rows is not None:
+                inserted = self._insert_staged(cur, rows)
+            else:
+                cur.execute(self._backfill_sql(scoped), params)
+                inserted = cur.rowcount
             logger.info("Inserted %d grants from provider sources", inserted)
 
         return {"deleted": deleted, "inserted": inserted}
 
-    def _backfill_sql(self) -> str:
-        return """
-WITH
+    def _insert_staged(self, cur, rows: RowBuffer) -> int:
+        """Upsert replica-computed grant rows through a temporary table."""
+        cur.execute(f"""CREATE TEMP TABLE {_STAGE_TABLE} ON COMMIT DROP AS
+                SELECT {', '.join(_GRANT_COLUMNS)}
+                FROM resource_access_grants WITH NO DATA""")
+        batch: list[tuple] = []
+        for row in rows:
+            batch.append(tuple(row))
+            if len(batch) >= self.db.itersize:
+                self.db.copy_into(cur, _STAGE_TABLE, _GRANT_COLUMNS, batch)
+                batch = []
+        if batch:
+            self.db.copy_into(cur, _STAGE_TABLE, _GRANT_COLUMNS, batch)
+        cur.execute(
+            f"""INSERT INTO resource_access_grants
+  (tenant_id, {', '.join(_GRANT_COLUMNS)}, raw_response, last_synced_at)
+SELECT %(tid)s::uuid, {', '.join(_GRANT_COLUMNS)}, '{{}}'::jsonb, NOW()
+FROM {_STAGE_TABLE}
+{_ON_CONFLICT_SQL}""",
+            {"tid": self.tenant_id},
+        )
+        return cur.rowcount
+
+    def _combined_sql(self, scoped: bool = False) -> str:
+        return _SOURCES_SQL + f"""SELECT DISTINCT ON ({_DISTINCT_KEY})
+  {', '.join(_GRANT_COLUMNS)}
+FROM combined{_scope_filter(scoped)}
+ORDER BY {_DISTINCT_KEY}
+"""
+
+    def _backfill_sql(self, scoped: bool = False) -> str:
+        return (
+            _SOURCES_SQL
+            + """INSERT INTO resource_access_grants
+  (tenant_id, provider, resource_type, resource_id, resource_display_name,
+   subject_type, subject_provider_id, subject_display_name, canonical_user_id,
+   role_or_permission, access_path, via_group_id, via_group_display_name,
+   raw_response, last_synced_at)
+SELECT DISTINCT ON (provider, resource_type, resource_id, subject_type, subject_provider_id, role_or_permission)
+  (SELECT v FROM tid),
+  provider, resource_type, resource_id, resource_display_name,
+  subject_type, subject_provider_id, subject_display_name, canonical_user_id,
+  role_or_permission, access_path, via_group_id, via_group_display_name,
+  '{}'::jsonb, NOW()
+FROM combined"""
+            + _scope_filter(scoped)
+            + """
+ORDER BY provider, resource_type, resource_id, subject_type, subject_provider_id, role_or_permission
+"""
+            + _ON_CONFLICT_SQL
+        )
+
+
+def _scope_filter(scoped: bool) -> str:
+    return f"\nWHERE {_SCOPE_SQL}" if scoped else ""
+
+
+_DISTINCT_KEY = (
+    "provider, resource_type, resource_id, subject_type, subject_provider_id, "
+    "role_or_permission"
+)
+
+_SOURCES_SQL = """WITH
 tid AS (SELECT %(tid)s::uuid AS v),
 
 -- AWS: group-level account assignments
@@ -55,8 +205,8 @@ aws_grp AS (
     aa.permission_set_name AS role_or_permission, 'direct' AS access_path,
     NULL::text AS via_group_id, NULL::text AS via_group_display_name
   FROM aws_account_assignments aa
-  JOIN aws_accounts acct ON acct.account_id = aa.account_id AND acct.tenant_id = aa.tenant_id
-  JOIN aws_identity_center_groups grp ON grp.group_id = aa.principal_id AND grp.tenant_id = aa.tenant_id
+  JOIN aws_accounts acct ON acct.account_id = aa.account_id AND acct.tenant_id = aa.tenant_id AND acct.deleted_at IS NULL
+  JOIN aws_identity_center_groups grp ON grp.group_id = aa.principal_id AND grp.tenant_id = aa.tenant_id AND grp.deleted_at IS NULL
   WHERE aa.tenant_id = (SELECT v FROM tid) AND aa.principal_type = 'GROUP' AND aa.deleted_at IS NULL
 ),
 
@@ -69,10 +219,10 @@ aws_usr AS (
        AND cupl.provider_user_id = mem.member_user_id LIMIT 1),
     aa.permission_set_name, 'group', aa.principal_id, grp.display_name
   FROM aws_account_assignments aa
-  JOIN aws_accounts acct ON acct.account_id = aa.account_id AND acct.tenant_id = aa.tenant_id
-  JOIN aws_identity_center_groups grp ON grp.group_id = aa.principal_id AND grp.tenant_id = aa.tenant_id
-  JOIN aws_identity_center_memberships mem ON mem.group_id = aa.principal_id AND mem.tenant_id = aa.tenant_id
-  JOIN aws_identity_center_users usr ON usr.user_id = mem.member_user_id AND usr.tenant_id = aa.tenant_id
+  JOIN aws_accounts acct ON acct.account_id = aa.account_id AND acct.tenant_id = aa.tenant_id AND acct.deleted_at IS NULL
+  JOIN aws_identity_center_groups grp ON grp.group_id = aa.principal_id AND grp.tenant_id = aa.tenant_id AND grp.deleted_at IS NULL
+  JOIN aws_identity_center_memberships mem ON mem.group_id = aa.principal_id AND mem.tenant_id = aa.tenant_id AND mem.deleted_at IS NULL
+  JOIN aws_identity_center_users usr ON usr.user_id = mem.member_user_id AND usr.tenant_id = aa.tenant_id AND usr.deleted_at IS NULL
   WHERE aa.tenant_id = (SELECT v FROM tid) AND aa.principal_type = 'GROUP' AND aa.deleted_at IS NULL
 ),
 
@@ -86,8 +236,8 @@ gcp_usr AS (
        AND gwu.primary_email = ib.member_id LIMIT 1),
     ib.role, 'direct', NULL, NULL
   FROM gcp_project_iam_bindings ib
-  JOIN gcp_projects proj ON proj.project_id = ib.project_id AND proj.tenant_id = ib.tenant_id
-  LEFT JOIN google_workspace_users gw ON gw.primary_email = ib.member_id AND gw.tenant_id = ib.tenant_id
+  JOIN gcp_projects proj ON proj.project_id = ib.project_id AND proj.tenant_id = ib.tenant_id AND proj.deleted_at IS NULL
+  LEFT JOIN google_workspace_users gw ON gw.primary_email = ib.member_id AND gw.tenant_id = ib.tenant_id AND gw.deleted_at IS NULL
   WHERE ib.tenant_id = (SELECT v FROM tid) AND ib.member_type = 'user' AND ib.deleted_at IS NULL
 ),
 
@@ -97,8 +247,8 @@ gcp_grp AS (
     'group', ib.member_id, gwg.name, NULL::uuid,
     ib.role, 'direct', NULL, NULL
   FROM gcp_project_iam_bindings ib
-  JOIN gcp_projects proj ON proj.project_id = ib.project_id AND proj.tenant_id = ib.tenant_id
-  LEFT JOIN google_workspace_groups gwg ON gwg.email = ib.member_id AND gwg.tenant_id = ib.tenant_id
+  JOIN gcp_projects proj ON proj.project_id = ib.project_id AND proj.tenant_id = ib.tenant_id AND proj.deleted_at IS NULL
+  LEFT JOIN google_workspace_groups gwg ON gwg.email = ib.member_id AND gwg.tenant_id = ib.tenant_id AND gwg.deleted_at IS NULL
   WHERE ib.tenant_id = (SELECT v FROM tid) AND ib.member_type = 'group' AND ib.deleted_at IS NULL
 ),
 
@@ -108,8 +258,8 @@ gh_team AS (
     'team', rtp.team_node_id, tm.name, NULL::uuid,
     rtp.permission, 'direct', NULL, NULL
   FROM github_repo_team_permissions rtp
-  JOIN github_repositories repo ON repo.node_id = rtp.repo_node_id AND repo.tenant_id = rtp.tenant_id
-  JOIN github_teams tm ON tm.node_id = rtp.team_node_id AND tm.tenant_id = rtp.tenant_id
+  JOIN github_repositories repo ON repo.node_id = rtp.repo_node_id AND repo.tenant_id = rtp.tenant_id AND repo.deleted_at IS NULL
+  JOIN github_teams tm ON tm.node_id = rtp.team_node_id AND tm.tenant_id = rtp.tenant_id AND tm.deleted_at IS NULL
   WHERE rtp.tenant_id = (SELECT v FROM tid) AND rtp.deleted_at IS NULL
 ),
 
@@ -122,8 +272,8 @@ gh_collab AS (
        AND cupl.provider_user_id = rcp.user_node_id LIMIT 1),
     rcp.permission, 'direct', NULL, NULL
   FROM github_repo_collaborator_permissions rcp
-  JOIN github_repositories repo ON repo.node_id = rcp.repo_node_id AND repo.tenant_id = rcp.tenant_id
-  JOIN github_users gu ON gu.node_id = rcp.user_node_id AND gu.tenant_id = rcp.tenant_id
+  JOIN github_repositories repo ON repo.node_id = rcp.repo_node_id AND repo.tenant_id = rcp.tenant_id AND repo.deleted_at IS NULL
+  JOIN github_users gu ON gu.node_id = rcp.user_node_id AND gu.tenant_id = rcp.tenant_id AND gu.deleted_at IS NULL
   WHERE rcp.tenant_id = (SELECT v FROM tid) AND rcp.deleted_at IS NULL
 ),
 
@@ -132,20 +282,9 @@ combined AS (
   SELECT * FROM gcp_usr UNION ALL SELECT * FROM gcp_grp UNION ALL
   SELECT * FROM gh_team UNION ALL SELECT * FROM gh_collab
 )
-INSERT INTO resource_access_grants
-  (tenant_id, provider, resource_type, resource_id, resource_display_name,
-   subject_type, subject_provider_id, subject_display_name, canonical_user_id,
-   role_or_permission, access_path, via_group_id, via_group_display_name,
-   raw_response, last_synced_at)
-SELECT DISTINCT ON (provider, resource_type, resource_id, subject_type, subject_provider_id, role_or_permission)
-  (SELECT v FROM tid),
-  provider, resource_type, resource_id, resource_display_name,
-  subject_type, subject_provider_id, subject_display_name, canonical_user_id,
-  role_or_permission, access_path, via_group_id, via_group_display_name,
-  '{}'::jsonb, NOW()
-FROM combined
-ORDER BY provider, resource_type, resource_id, subject_type, subject_provider_id, role_or_permission
-ON CONFLICT (tenant_id, provider, resource_type, resource_id, subject_type, subject_provider_id, role_or_permission)
+"""
+
+_ON_CONFLICT_SQL = """ON CONFLICT (tenant_id, provider, resource_type, resource_id, subject_type, subject_provider_id, role_or_permission)
 DO UPDATE SET
   resource_display_name = EXCLUDED.resource_display_name,
   subject_display_name = EXCLUDED.subject_display_name,
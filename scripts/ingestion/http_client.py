@@ -0,0 +1,231 @@
+"""Pooled HTTP client shared by the REST API providers.
+
+One HttpClient per provider wraps a requests.Session per calling thread
+(requests does not promise a Session is thread-safe, and a prefetch thread
+pages a listing while the provider thread sends per-item requests) with:
+
+  - keep-alive pools of HttpConfig.pool_size connections per host and
+    thread; callers beyond that wait for a free connection instead of
+    opening (and then discarding) extra ones
+  - gzip/deflate response compression
+  - connect/read timeouts per attempt and a time budget per call, retries
+    and waits included
+  - one retry policy for connection errors, timeouts, 429, 5xx and GitHub
+    primary and secondary rate limits: Retry-After is honoured first, then
+    X-RateLimit-Reset, otherwise full-jitter exponential backoff (at least
+    a minute for secondary limits, as GitHub asks)
+
+Only idempotent methods are retried.  When the retries or the budget run
+out, the last response is returned and the caller's raise_for_status()
+reports it; a last connection error is raised.
+
+Every attempt is recorded per endpoint (latency, status, wire bytes and
+retries by reason) in an HttpMetrics collector; BaseProvider stores the
+run's summary in ingestion_runs.run_metadata["http"].
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.ingestion.config import HttpConfig
+from scripts.ingestion.metrics import HttpMetrics, MetricsSink
+
+logger = logging.getLogger("ingestion.http")
+
+_RETRY_STATUSES = frozenset({500, 502, 503, 504})
+_IDEMPOTENT = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# GitHub: wait at least a minute after a secondary rate limit
+_SECONDARY_LIMIT_WAIT = 60.0
+
+
+def retry_reason(resp: requests.Response) -> Optional[str]:
+    """Why ``resp`` is worth retrying, or None."""
+    status = resp.status_code
+    if status in (403, 429):
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            return "rate_limit"
+        text = resp.text.lower()
+        if "secondary rate limit" in text:
+            return "secondary_rate_limit"
+        if "rate limit" in text:
+            return "rate_limit"
+        if status == 429:
+            return "throttled"
+        if "Retry-After" in resp.headers:
+            return "secondary_rate_limit"
+        return None  # a plain permission error
+    if status in _RETRY_STATUSES:
+        return f"http_{status}"
+    return None
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _wire_bytes(resp: requests.Response) -> int:
+    """Bytes received for the body, before decompression."""
+    try:
+        return int(resp.raw.tell())
+    except (AttributeError, TypeError, ValueError, OSError):
+        return len(resp.content)
+
+
+class HttpClient:
+    """requests.Session with pooling, timeouts, retries and metrics.
+
+    ``endpoint`` maps a URL path to its route template for the metrics;
+    by default the path itself is used.  ``mount`` is applied to each new
+    session, e.g. Cassette.mount.
+    """
+
+    def __init__(
+        self,
+        config: HttpConfig,
+        headers: Optional[dict[str, str]] = None,
+        provider: str = "",
+        sink: Optional[MetricsSink] = None,
+        endpoint: Optional[Callable[[str], str]] = None,
+        mount: Optional[Callable[[requests.Session], None]] = None,
+    ) -> None:
+        self.config = config
+        self.provider = provider
+        self.endpoint = endpoint or (lambda path: path)
+        self.metrics = HttpMetrics(sink, provider)
+        self.timeout = (config.connect_timeout, config.read_timeout)
+        self.headers = dict(headers or {})
+        self.mount = mount
+        self._local = threading.local()
+        self._sessions: list[requests.Session] = []
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's session, created on its first request."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_maxsize=self.config.pool_size, pool_block=True, max_retries=0
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = "gzip, deflate"
+            session.headers.update(self.headers)
+            if self.mount is not None:
+                self.mount(session)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def request(
+        self, method: str, url: str, endpoint: Optional[str] = None, **kwargs: Any
+    ) -> requests.Response:
+        """Send a request, retrying per the policy above.
+
+        ``kwargs`` go to requests.Session.request; ``endpoint`` overrides
+        the route template recorded in the metrics.
+        """
+        endpoint = endpoint or self.endpoint(urlsplit(url).path)
+        retryable = method.upper() in _IDEMPOTENT
+        kwargs.setdefault("timeout", self.timeout)
+        deadline = time.monotonic() + self.config.budget_seconds
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                reason = type(exc).__name__
+                self.metrics.request(endpoint, time.monotonic() - start, reason, 0)
+                if not retryable or not self._retry(
+                    endpoint, reason, self._backoff(attempt), attempt, deadline
+                ):
+                    raise
+                attempt += 1
+                continue
+            self.metrics.request(
+                endpoint, time.monotonic() - start, resp.status_code, _wire_bytes(resp)
+            )
+            reason = retry_reason(resp) if retryable else None
+            if reason is None or not self._retry(
+                endpoint, reason, self._wait(resp, reason, attempt), attempt, deadline
+            ):
+                return resp
+            attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (0-based) attempt."""
+        cap = min(
+            self.config.retry_max_delay, self.config.retry_base_delay * 2**attempt
+        )
+        return random.uniform(0, cap)
+
+    def _wait(self, resp: requests.Response, reason: str, attempt: int) -> float:
+        retry_after = _retry_after(resp.headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after
+        reset = resp.headers.get("X-RateLimit-Reset", "")
+        if reason == "rate_limit" and reset.isdigit():
+            return max(int(reset) - time.time(), 1.0)
+        if reason == "secondary_rate_limit":
+            return max(_SECONDARY_LIMIT_WAIT, self._backoff(attempt))
+        return self._backoff(attempt)
+
+    def _retry(
+        self, endpoint: str, reason: str, wait: float, attempt: int, deadline: float
+    ) -> bool:
+        """Sleep before retry ``attempt`` + 1; False when out of retries or time."""
+        wait = min(wait, self.config.max_wait_seconds)
+        if attempt >= self.config.retry_attempts or time.monotonic() + wait > deadline:
+            logger.warning(
+                "%s %s: %s, giving up after %d retries",
+                self.provider,
+                endpoint,
+                reason,
+                attempt,
+            )
+            return False
+        self.metrics.retry(endpoint, reason)
+        logger.warning(
+            "%s %s: %s, retrying in %.1fs (attempt %d/%d)",
+            self.provider,
+            endpoint,
+            reason,
+            wait,
+            attempt + 1,
+            self.config.retry_attempts,
+        )
+        time.sleep(wait)
+        return True
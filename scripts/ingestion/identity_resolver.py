@@ -17,7 +17,7 @@ logger = logging.getLogger("ingestion.identity_resolver")
 class IdentityResolver:
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         self.config = config
-        self.db = db
+        self.db = db.for_tenant(config.tenant_id)
         self.tenant_id = config.tenant_id
 
     def resolve(self) -> dict[str, int]:
@@ -0,0 +1,127 @@
+"""Incremental parsing of JSON array responses into compact records.
+
+``resp.json()`` turns a whole API page into a tree of dicts that stays alive
+while its rows are built, only to be re-encoded for raw_response.  Here the
+response body is decoded a slice at a time and split into its top-level
+array elements (iter_array_items); the mapped fields of each element are
+copied into a ``__slots__`` record, and the element's dict is dropped.  The
+record keeps the element's original text as its raw_response, so the payload
+is stored exactly as the API sent it and never re-encoded.
+
+Peak memory is one element plus one decoded slice instead of one page of
+dicts.  Elements are parsed by the standard library's C scanner
+(JSONDecoder.raw_decode), which also reports where each one ends.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from itertools import chain
+from typing import Any, Iterable, Iterator
+
+from scripts.ingestion.serialization import dumps
+
+_decoder = json.JSONDecoder()
+
+# Whitespace and the commas between array elements
+_SEPARATORS = re.compile(r"[\s,]*")
+
+# Bytes decoded per step; bounds the text held besides the current element
+_SLICE_BYTES = 1 << 16
+
+
+def _iter_text(chunks: Iterable[bytes]) -> Iterator[str]:
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        for i in range(0, len(chunk), _SLICE_BYTES):
+            yield utf8.decode(chunk[i : i + _SLICE_BYTES])
+    yield utf8.decode(b"", final=True)
+
+
+def iter_array_items(chunks: Iterable[bytes]) -> Iterator[tuple[str, Any]]:
+    """Yield ``(text, value)`` for each object/array element of a JSON array.
+
+    ``chunks`` is the UTF-8 response body in arbitrary pieces.  Scalar
+    elements are skipped (API listings are arrays of objects).  A body whose
+    top level is not an array is yielded whole, as a single item.  A
+    truncated or malformed body raises json.JSONDecodeError.
+    """
+    buf = ""
+    pos = 0
+    is_array = None
+    for text in chain(_iter_text(chunks), [None]):
+        final = text is None
+        buf = buf[pos:] + (text or "")
+        pos = 0
+        if is_array is None:
+            pos = _SEPARATORS.match(buf).end()
+            if pos == len(buf) and not final:
+                continue
+            is_array = buf.startswith("[", pos)
+            pos += 1 if is_array else 0
+        if not is_array:
+            if final and buf[pos:].strip():
+                body = buf[pos:].strip()
+                yield body, _decoder.decode(body)
+            continue
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos == len(buf) or buf[pos] == "]":
+                break
+            try:
+                value, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # element continues in the next slice
+            if end == len(buf) and not final:
+                break  # a number may continue in the next slice
+            if isinstance(value, (dict, list)):
+                yield buf[pos:end], value
+            pos = end
+
+
+class CompactRecord:
+    """An API item reduced to selected fields plus its raw JSON text.
+
+    Subclasses from record_type() declare the fields as ``__slots__``.
+    get() and ``[]`` behave like on the dict they replace: fields absent
+    from the item are missing, not None.
+    """
+
+    __slots__ = ("raw",)
+    FIELDS: tuple[str, ...] = ()
+
+    @classmethod
+    def from_item(cls, raw: str, data: Any) -> CompactRecord:
+        """Record for one element yielded by iter_array_items()."""
+        record = cls.__new__(cls)
+        for name in cls.FIELDS:
+            if name in data:
+                setattr(record, name, data[name])
+        record.raw = raw
+        return record
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+def record_type(name: str, fields: Iterable[str]) -> type[CompactRecord]:
+    """A CompactRecord subclass with one slot per field."""
+    fields = tuple(fields)
+    return type(name, (CompactRecord,), {"__slots__": fields, "FIELDS": fields})
+
+
+def raw_json(item: Any) -> str:
+    """raw_response text of an item: a record's own text, or dumps(item)."""
+    if isinstance(item, CompactRecord):
+        return item.raw
+    return dumps(item)
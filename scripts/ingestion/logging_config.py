@@ -21,7 +21,15 @@ class JsonFormatter(logging.Formatter):
         if record.exc_info and record.exc_info[1]:
             log_entry["exception"] = self.formatException(record.exc_info)
         # Merge extra fields attached by providers
-        for key in ("provider", "entity_type", "records", "duration_s", "run_id"):
+        for key in (
+            "provider",
+            "entity_type",
+            "records",
+            "unchanged",
+            "deleted",
+            "duration_s",
+            "run_id",
+        ):
             val = getattr(record, key, None)
             if val is not None:
                 log_entry[key] = val
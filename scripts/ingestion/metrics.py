@@ -0,0 +1,355 @@
+"""Database and HTTP instrumentation: pool waits, statement and call latency.
+
+Database records every pool checkout and every bulk statement in a
+DbMetrics collector; HttpClient records every API request, per endpoint,
+in an HttpMetrics collector.  Each observation is forwarded to a pluggable
+MetricsSink (DB_METRICS_SINK: "none", "log", or "package.module:Class" for
+StatsD/Prometheus/CloudWatch adapters) and aggregated into cumulative
+counters and fixed-bucket histograms.  BaseProvider diffs two snapshots to
+store per-run summaries in ingestion_runs.run_metadata["db"] and ["http"].
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger("ingestion.metrics")
+
+# Histogram upper bounds in milliseconds; a final bucket catches the rest
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_WS = re.compile(r"\s+")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\$\d+")
+
+
+def fingerprint(sql: str) -> str:
+    """Short stable id of a statement's shape (literals and params removed)."""
+    shape = _LITERALS.sub("?", _WS.sub(" ", sql).strip())
+    return hashlib.blake2b(shape.encode(), digest_size=6).hexdigest()
+
+
+class MetricsSink:
+    """Receives every observation.  The base class discards them.
+
+    Subclass and name it in DB_METRICS_SINK ("package.module:Class") to
+    forward to a metrics backend.  Methods are called on the hot path from
+    writer threads, so implementations must be thread-safe and cheap.
+    """
+
+    def timing(self, name: str, seconds: float, tags: dict[str, str]) -> None:
+        pass
+
+    def count(self, name: str, value: int, tags: dict[str, str]) -> None:
+        pass
+
+    def gauge(self, name: str, value: float, tags: dict[str, str]) -> None:
+        pass
+
+
+class LoggingSink(MetricsSink):
+    """Emit each observation as a DEBUG log line on ingestion.metrics."""
+
+    def timing(self, name: str, seconds: float, tags: dict[str, str]) -> None:
+        logger.debug("%s %.1fms %s", name, seconds * 1000, tags)
+
+    def count(self, name: str, value: int, tags: dict[str, str]) -> None:
+        logger.debug("%s +%d %s", name, value, tags)
+
+    def gauge(self, name: str, value: float, tags: dict[str, str]) -> None:
+        logger.debug("%s =%g %s", name, value, tags)
+
+
+def load_sink(spec: str) -> MetricsSink:
+    """Resolve DB_METRICS_SINK to a sink instance."""
+    if spec in ("", "none"):
+        return MetricsSink()
+    if spec == "log":
+        return LoggingSink()
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown metrics sink {spec!r}")
+    return getattr(importlib.import_module(module), attr)()
+
+
+class Histogram:
+    """Cumulative fixed-bucket latency histogram (milliseconds)."""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                break
+        else:
+            i = len(BUCKETS_MS)
+        self.buckets[i] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "buckets": list(self.buckets),
+            "count": self.count,
+            "total_ms": self.total_ms,
+        }
+
+
+def _summarise(before: Optional[dict], after: dict) -> dict[str, Any]:
+    """count/total/p50/p95 of the observations between two histogram dicts."""
+    before = before or {"buckets": [0] * len(after["buckets"]), "total_ms": 0.0}
+    buckets = [a - b for a, b in zip(after["buckets"], before["buckets"])]
+    count = sum(buckets)
+    summary: dict[str, Any] = {
+        "count": count,
+        "total_ms": round(after["total_ms"] - before["total_ms"], 1),
+    }
+    for label, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+        seen = 0
+        for i, n in enumerate(buckets):
+            seen += n
+            if count and seen >= q * count:
+                # Upper bound of the bucket; the overflow bucket reports ">"
+                summary[label] = (
+                    BUCKETS_MS[i] if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"
+                )
+                break
+    return summary
+
+
+class DbMetrics:
+    """Thread-safe collector behind Database.metrics."""
+
+    def __init__(
+        self,
+        sink: Optional[MetricsSink] = None,
+        slow_statement_ms: float = 1000.0,
+        leak_seconds: float = 600.0,
+    ) -> None:
+        self.sink = sink or MetricsSink()
+        self.slow_statement_ms = slow_statement_ms
+        self.leak_seconds = leak_seconds
+        self._lock = threading.Lock()
+        self._pool_wait = Histogram()
+        self._checkouts = 0
+        self._peak_checked_out = 0
+        self._leaks = 0
+        self._slow = 0
+        # id(conn) -> [thread name, checkout time, already reported as leak]
+        self._checked_out: dict[int, list] = {}
+        self._tables: dict[str, dict[str, Any]] = {}
+
+    # -- pool ------------------------------------------------------------
+
+    def checkout(self, conn: Any, waited: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._pool_wait.observe(waited * 1000)
+            self._checkouts += 1
+            self._checked_out[id(conn)] = [threading.current_thread().name, now, False]
+            in_use = len(self._checked_out)
+            self._peak_checked_out = max(self._peak_checked_out, in_use)
+            suspects = [
+                entry
+                for entry in self._checked_out.values()
+                if not entry[2] and now - entry[1] > self.leak_seconds
+            ]
+            for entry in suspects:
+                entry[2] = True
+                self._leaks += 1
+        for thread, since, _ in suspects:
+            logger.warning(
+                "Possible connection leak: held by thread %s for %.1fs",
+                thread,
+                now - since,
+            )
+        self.sink.timing("db.pool.wait", waited, {})
+        self.sink.gauge("db.pool.checked_out", in_use, {})
+
+    def checkin(self, conn: Any) -> None:
+        with self._lock:
+            entry = self._checked_out.pop(id(conn), None)
+            in_use = len(self._checked_out)
+        if entry is not None:
+            held = time.monotonic() - entry[1]
+            self.sink.timing("db.pool.held", held, {})
+            if entry[2]:
+                logger.warning("Leaked connection returned after %.1fs", held)
+        self.sink.gauge("db.pool.checked_out", in_use, {})
+
+    # -- statements ------------------------------------------------------
+
+    def statement(
+        self, table: str, sql: str, seconds: float, rows: int, nbytes: int = 0
+    ) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            stats = self._tables.get(table)
+            if stats is None:
+                stats = self._tables[table] = {
+                    "latency": Histogram(),
+                    "rows": 0,
+                    "bytes": 0,
+                }
+            stats["latency"].observe(ms)
+            stats["rows"] += rows
+            stats["bytes"] += nbytes
+            slow = ms >= self.slow_statement_ms
+            if slow:
+                self._slow += 1
+        tags = {"table": table}
+        self.sink.timing("db.statement", seconds, tags)
+        self.sink.count("db.rows", rows, tags)
+        self.sink.count("db.bytes", nbytes, tags)
+        if slow:
+            logger.warning(
+                "Slow statement %s on %s: %.0fms, %d rows, %d bytes: %.200s",
+                fingerprint(sql),
+                table,
+                ms,
+                rows,
+                nbytes,
+                _WS.sub(" ", sql),
+            )
+
+    # -- reporting -------------------------------------------------------
+
+    def snapshot(self) -> dict[str, Any]:
+        """Cumulative counters since the Database was created."""
+        with self._lock:
+            return {
+                "pool_wait": self._pool_wait.as_dict(),
+                "checkouts": self._checkouts,
+                "checked_out": len(self._checked_out),
+                "peak_checked_out": self._peak_checked_out,
+                "leaks": self._leaks,
+                "slow_statements": self._slow,
+                "tables": {
+                    table: {
+                        "latency": stats["latency"].as_dict(),
+                        "rows": stats["rows"],
+                        "bytes": stats["bytes"],
+                    }
+                    for table, stats in self._tables.items()
+                },
+            }
+
+    @staticmethod
+    def summary(before: dict[str, Any], after: dict[str, Any]) -> dict[str, Any]:
+        """Activity between two snapshots, compact enough for run_metadata.
+
+        The collector belongs to the shared Database, so runs executing
+        concurrently on it are included in each other's figures.
+        """
+        tables = {}
+        for table, stats in after["tables"].items():
+            prev = before["tables"].get(table)
+            latency = _summarise(prev and prev["latency"], stats["latency"])
+            if not latency["count"]:
+                continue
+            tables[table] = {
+                "statements": latency.pop("count"),
+                "rows": stats["rows"] - (prev["rows"] if prev else 0),
+                "bytes": stats["bytes"] - (prev["bytes"] if prev else 0),
+                **latency,
+            }
+        return {
+            "pool_wait": _summarise(before["pool_wait"], after["pool_wait"]),
+            "checkouts": after["checkouts"] - before["checkouts"],
+            "checked_out_at_end": after["checked_out"],
+            "peak_checked_out": after["peak_checked_out"],
+            "leaks": after["leaks"] - before["leaks"],
+            "slow_statements": after["slow_statements"] - before["slow_statements"],
+            "tables": tables,
+        }
+
+
+class HttpMetrics:
+    """Thread-safe per-endpoint collector behind HttpClient.metrics.
+
+    ``endpoint`` is a route template (``/orgs/{org}/members``), so that
+    every page and every org of a listing share one entry.
+    """
+
+    def __init__(self, sink: Optional[MetricsSink] = None, provider: str = "") -> None:
+        self.sink = sink or MetricsSink()
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict[str, Any]] = {}
+
+    def _entry(self, endpoint: str) -> dict[str, Any]:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {
+                "latency": Histogram(),
+                "errors": 0,
+                "bytes": 0,
+                "retries": {},
+            }
+        return stats
+
+    def request(self, endpoint: str, seconds: float, status: Any, nbytes: int) -> None:
+        """One attempt; ``status`` is the HTTP status or an exception name."""
+        failed = not isinstance(status, int) or status >= 400
+        with self._lock:
+            stats = self._entry(endpoint)
+            stats["latency"].observe(seconds * 1000)
+            stats["bytes"] += nbytes
+            if failed:
+                stats["errors"] += 1
+        tags = {"provider": self.provider, "endpoint": endpoint, "status": str(status)}
+        self.sink.timing("http.request", seconds, tags)
+        self.sink.count("http.bytes", nbytes, tags)
+
+    def retry(self, endpoint: str, reason: str) -> None:
+        with self._lock:
+            retries = self._entry(endpoint)["retries"]
+            retries[reason] = retries.get(reason, 0) + 1
+        self.sink.count(
+            "http.retries",
+            1,
+            {"provider": self.provider, "endpoint": endpoint, "reason": reason},
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        """Cumulative counters since the client was created."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "latency": stats["latency"].as_dict(),
+                    "errors": stats["errors"],
+                    "bytes": stats["bytes"],
+                    "retries": dict(stats["retries"]),
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    @staticmethod
+    def summary(before: dict[str, Any], after: dict[str, Any]) -> dict[str, Any]:
+        """Per-endpoint requests, errors, wire bytes, retries and latency."""
+        endpoints = {}
+        for endpoint, stats in after.items():
+            prev = before.get(endpoint)
+            latency = _summarise(prev and prev["latency"], stats["latency"])
+            if not latency["count"]:
+                continue
+            retries = {
+                reason: n - (prev["retries"].get(reason, 0) if prev else 0)
+                for reason, n in stats["retries"].items()
+            }
+            endpoints[endpoint] = {
+                "requests": latency.pop("count"),
+                "errors": stats["errors"] - (prev["errors"] if prev else 0),
+                "bytes": stats["bytes"] - (prev["bytes"] if prev else 0),
+                "retries": {reason: n for reason, n in retries.items() if n},
+                **latency,
+            }
+        return endpoints
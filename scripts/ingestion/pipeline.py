@@ -0,0 +1,194 @@
+"""Bounded producer/consumer stages between provider fetches and writes.
+
+With INGESTION_PIPELINE_DEPTH above 0 a provider sync runs as three
+overlapping stages:
+
+  fetch      prefetch() runs each page iterator in its own thread and pushes
+             items into a queue of at most INGESTION_PREFETCH_ITEMS
+  transform  the provider thread builds rows and batches from those items
+  write      WritePipeline's thread drains a queue of at most
+             INGESTION_PIPELINE_DEPTH batches into upsert_in_transaction
+
+A full queue blocks its producer, so a slow stage throttles the ones before
+it and memory stays bounded by the two queue sizes.  StageTimes records how
+long each stage was busy and how long it waited on its neighbours; the
+summary says whether a run was API-bound or DB-bound.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+from scripts.ingestion.spool import SpoolBatch
+
+logger = logging.getLogger("ingestion.pipeline")
+
+T = TypeVar("T")
+
+# Queue entry kinds passed from a fetcher thread to its consumer
+_ITEM, _ERROR, _DONE = range(3)
+
+# How often a blocked fetcher checks whether its consumer has gone away
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class StageTimes:
+    """Seconds each stage spent working and waiting, summed over threads."""
+
+    fetch_busy: float = 0.0  # fetchers inside API calls
+    fetch_blocked: float = 0.0  # fetchers waiting for room in a full queue
+    transform_starved: float = 0.0  # row building waiting for fetched items
+    transform_blocked: float = 0.0  # row building waiting for the writer
+    write_busy: float = 0.0  # writer inside database transactions
+    write_idle: float = 0.0  # writer waiting for batches
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            setattr(self, stage, getattr(self, stage) + seconds)
+
+    def summary(self, wall_seconds: float) -> dict[str, Any]:
+        """Rounded timings plus the limiting stage, for run_metadata."""
+        with self._lock:
+            result: dict[str, Any] = {
+                f.name: round(getattr(self, f.name), 3) for f in fields(self)
+            }
+        result["wall"] = round(wall_seconds, 3)
+        result["bound"] = "db" if self.write_busy >= self.fetch_busy else "api"
+        return result
+
+
+def prefetch(items: Iterable[T], maxsize: int, times: StageTimes) -> Iterator[T]:
+    """Iterate ``items`` in a fetcher thread, at most ``maxsize`` items ahead.
+
+    Exceptions raised by ``items`` are re-raised in the consumer.  If the
+    consumer stops early the fetcher exits after its current item.
+    """
+    entries: queue.Queue[tuple[int, Any]] = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(entry: tuple[int, Any]) -> None:
+        start = time.monotonic()
+        while not stop.is_set():
+            try:
+                entries.put(entry, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        times.add("fetch_blocked", time.monotonic() - start)
+
+    def run() -> None:
+        try:
+            it = iter(items)
+            while not stop.is_set():
+                start = time.monotonic()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    times.add("fetch_busy", time.monotonic() - start)
+                put((_ITEM, item))
+            put((_DONE, None))
+        except BaseException as exc:
+            put((_ERROR, exc))
+
+    thread = threading.Thread(target=run, name="provider-fetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            start = time.monotonic()
+            kind, value = entries.get()
+            times.add("transform_starved", time.monotonic() - start)
+            if kind == _ITEM:
+                yield value
+            elif kind == _ERROR:
+                raise value
+            else:
+                return
+    finally:
+        stop.set()
+        thread.join()
+
+
+class WritePipeline:
+    """Bounded in-memory queue of batches drained by one writer thread.
+
+    One writer keeps batches committed in append order, like the spool.
+    After a write fails the remaining batches are discarded and the error
+    surfaces from the next append()/flush().
+    """
+
+    def __init__(
+        self,
+        write: Callable[[SpoolBatch], Any],
+        depth: int,
+        times: Optional[StageTimes] = None,
+    ) -> None:
+        self.times = times or StageTimes()
+        self._write = write
+        self._queue: queue.Queue[Optional[SpoolBatch]] = queue.Queue(
+            maxsize=max(1, depth)
+        )
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._drain, name="pipeline-writer", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, batch: SpoolBatch) -> None:
+        """Queue one batch, blocking while the queue is full."""
+        self._raise_writer_error()
+        start = time.monotonic()
+        self._queue.put(batch)
+        self.times.add("transform_blocked", time.monotonic() - start)
+
+    def flush(self) -> None:
+        """Block until every queued batch has been written."""
+        self._queue.join()
+        self._raise_writer_error()
+
+    def close(self) -> None:
+        """Flush, then stop the writer thread."""
+        try:
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _raise_writer_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Pipeline writer failed") from self._error
+
+    def _drain(self) -> None:
+        while True:
+            start = time.monotonic()
+            batch = self._queue.get()
+            self.times.add("write_idle", time.monotonic() - start)
+            try:
+                if batch is None:
+                    return
+                if self._error is None:
+                    start = time.monotonic()
+                    try:
+                        self._write(batch)
+                    finally:
+                        self.times.add("write_busy", time.monotonic() - start)
+            except Exception as exc:
+                self._error = exc
+                logger.error("Pipeline writer stopped on %s: %s", batch.table, exc)
+            finally:
+                self._queue.task_done()
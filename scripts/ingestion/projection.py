@@ -0,0 +1,82 @@
+"""Field projection of API items to the fields ingestion keeps.
+
+Providers store about a dozen mapped columns plus raw_response, but the
+APIs return whole objects (Google users with ``projection="full"``, GitHub
+repositories with ~130 fields).  For providers listed in
+INGESTION_RAW_PROJECTION_PROVIDERS a FieldMask is built per listing from
+the paths its RowMapper reads, plus any INGESTION_RAW_EXTRA_FIELDS for the
+table:
+
+  - Google APIs get it as a partial-response ``fields=`` mask, so the
+    unwanted fields are never sent
+  - other providers' items are trimmed to it before row building, so
+    raw_response (and its content_hash) holds only the allow-listed fields
+
+Paths are dotted (``name.fullName``); a path selects its whole value, and
+inside lists every element is projected.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+
+def _tree(paths: Iterable[str]) -> dict[str, dict]:
+    """Nested dict of path segments; an empty dict selects the whole value."""
+    tree: dict[str, dict] = {}
+    # Stable order: the Google mask string ends up in request URLs (and
+    # cassette keys), so it must not depend on set iteration order
+    for path in sorted(dict.fromkeys(paths), key=lambda p: p.count(".")):
+        node = tree
+        keys = path.split(".")
+        for i, key in enumerate(keys):
+            if key in node and not node[key]:
+                break  # an enclosing path already keeps the whole value
+            if i == len(keys) - 1:
+                node[key] = {}
+            else:
+                node = node.setdefault(key, {})
+    return tree
+
+
+def _projector(tree: dict[str, dict]) -> Callable[[Any], Any]:
+    """Function copying the fields of ``tree`` out of a value.
+
+    Built once per mask: whole-value keys are copied by one dict
+    comprehension, nested keys by their own projectors.
+    """
+    whole = tuple(key for key, sub in tree.items() if not sub)
+    nested = tuple((key, _projector(sub)) for key, sub in tree.items() if sub)
+
+    def project(value: Any) -> Any:
+        if isinstance(value, list):
+            return [project(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        result = {key: value[key] for key in whole if key in value}
+        for key, sub in nested:
+            if key in value:
+                result[key] = sub(value[key])
+        return result
+
+    return project
+
+
+def _google_mask(tree: dict[str, dict]) -> str:
+    return ",".join(
+        f"{key}({_google_mask(sub)})" if sub else key for key, sub in tree.items()
+    )
+
+
+class FieldMask:
+    """An allow-list of dotted field paths."""
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self.paths = tuple(dict.fromkeys(paths))
+        self._tree = _tree(self.paths)
+        self.apply: Callable[[Any], Any] = _projector(self._tree)
+        """A copy of an item holding only the allow-listed fields."""
+
+    def google_fields(self, collection: str) -> str:
+        """Partial-response mask for a Google list call returning ``collection``."""
+        return f"nextPageToken,{collection}({_google_mask(self._tree)})"
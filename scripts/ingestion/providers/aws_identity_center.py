@@ -2,20 +2,112 @@
 
 from __future__ import annotations
 
-import json
 import logging
+from typing import Iterator, Optional, Sequence
 
 import boto3
 
 from scripts.ingestion.base_provider import BaseProvider
 from scripts.ingestion.config import IngestionConfig
 from scripts.ingestion.db import Database
+from scripts.ingestion.grants_backfill import GrantScope
+from scripts.ingestion.rowmap import ITEM, Arg, Call, Const, Field, RowMapper
+from scripts.ingestion.serialization import dumps
 
 logger = logging.getLogger("ingestion.aws_identity_center")
 
 
+def _primary_email(emails: Sequence[dict]) -> Optional[str]:
+    """The Primary email's value, else the first email's."""
+    primary = None
+    for e in emails:
+        if e.get("Primary"):
+            primary = e.get("Value")
+            break
+    if not primary and emails:
+        primary = emails[0].get("Value")
+    return primary
+
+
+USER_ROWS = RowMapper(
+    "aws_identity_center_users",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "identity_store_id": Arg("identity_store_id"),
+        "user_id": Field("UserId"),
+        "user_name": Field("UserName", ""),
+        "display_name": Field("DisplayName", None),
+        "active": Field("Active", True, extra=True),
+        "user_status": Field("UserStatus", None),
+        "email": Call(_primary_email, Field("Emails", ())),
+        "given_name": Field("Name.GivenName", None),
+        "family_name": Field("Name.FamilyName", None),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "identity_store_id"),
+    schema=("aws_identity_center", "DescribeUserResponse"),
+)
+
+GROUP_ROWS = RowMapper(
+    "aws_identity_center_groups",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "identity_store_id": Arg("identity_store_id"),
+        "group_id": Field("GroupId"),
+        "display_name": Field("DisplayName", ""),
+        "description": Field("Description", None),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "identity_store_id"),
+    schema=("aws_identity_center", "DescribeGroupResponse"),
+)
+
+MEMBERSHIP_ROWS = RowMapper(
+    "aws_identity_center_memberships",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "membership_id": Field("MembershipId"),
+        "identity_store_id": Arg("identity_store_id"),
+        "group_id": Arg("group_id"),
+        "member_user_id": Field("MemberId.UserId", ""),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "identity_store_id", "group_id"),
+    schema=("aws_identity_center", "DescribeGroupMembershipResponse"),
+)
+
+# sso-admin responses are not in providerschema, so no schema check
+ASSIGNMENT_ROWS = RowMapper(
+    "aws_account_assignments",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "identity_store_id": Arg("identity_store_id"),
+        "account_id": Field("AccountId"),
+        "permission_set_arn": Field("PermissionSetArn"),
+        "permission_set_name": Call(
+            dict.get, Arg("ps_names"), Field("PermissionSetArn"), ""
+        ),
+        "principal_type": Field("PrincipalType"),
+        "principal_id": Field("PrincipalId"),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "identity_store_id", "ps_names"),
+)
+
+
 class AwsIdentityCenterProvider(BaseProvider):
     PROVIDER_NAME = "aws_identity_center"
+    ENTITY_KINDS = ("account",)
+    SWEEP_TABLES = (
+        "aws_identity_center_users",
+        "aws_identity_center_groups",
+        "aws_identity_center_memberships",
+        "aws_account_assignments",
+    )
 
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         super().__init__(config, db)
@@ -24,49 +116,40 @@ class AwsIdentityCenterProvider(BaseProvider):
             raise ValueError("AWS Identity Center config not set")
         self._identity_store_id = idc.identity_store_id
         self._sso_instance_arn = idc.sso_instance_arn
-        self._ids_client = boto3.client("identitystore", region_name=idc.region)
-        self._sso_client = boto3.client("sso-admin", region_name=idc.region)
+        self._ids_client = self._boto3_client(
+            boto3.client("identitystore", region_name=idc.region)
+        )
+        self._sso_client = self._boto3_client(
+            boto3.client("sso-admin", region_name=idc.region)
+        )
 
     def sync(self) -> dict[str, int]:
         results: dict[str, int] = {}
-        results["users"] = self._sync_users()
-        results["groups"] = self._sync_groups()
-        results["memberships"] = self._sync_memberships()
-        results["account_assignments"] = self._sync_account_assignments()
+        results["users"] = self._run_step("users", self._sync_users)
+        results["groups"] = self._run_step("groups", self._sync_groups)
+        results["memberships"] = self._run_step("memberships", self._sync_memberships)
+        results["account_assignments"] = self._run_step(
+            "account_assignments", self._sync_account_assignments
+        )
         return results
 
-    def _paginate(self, client, method: str, key: str, **kwargs) -> list[dict]:
-        """Generic paginator for boto3 APIs."""
-        items: list[dict] = []
+    def _paginate(self, client, method: str, key: str, **kwargs) -> Iterator:
+        """Yield the items of a boto3 paginated call; pages are fetched lazily."""
         paginator = client.get_paginator(method)
         for page in paginator.paginate(**kwargs):
-            items.extend(page.get(key, []))
-        return items
+            yield from page.get(key, [])
 
     def _sync_users(self) -> int:
         logger.info("Syncing AWS Identity Center users")
-        all_users = self._paginate(
+        users = self._paginate(
             self._ids_client,
             "list_users",
             "Users",
             IdentityStoreId=self._identity_store_id,
         )
+        users = self._project(users, USER_ROWS)
 
         total = 0
-        columns = [
-            "tenant_id",
-            "identity_store_id",
-            "user_id",
-            "user_name",
-            "display_name",
-            "active",
-            "user_status",
-            "email",
-            "given_name",
-            "family_name",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "identity_store_id", "user_id"]
         update = [
             "user_name",
@@ -79,106 +162,67 @@ class AwsIdentityCenterProvider(BaseProvider):
             "raw_response",
         ]
 
-        for batch in self._batch_rows(all_users):
-            rows = []
-            for u in batch:
-                emails = u.get("Emails", [])
-                primary_email = None
-                for e in emails:
-                    if e.get("Primary"):
-                        primary_email = e.get("Value")
-                        break
-                if not primary_email and emails:
-                    primary_email = emails[0].get("Value")
-
-                name = u.get("Name", {})
-                rows.append(
-                    (
-                        self.tenant_id,
-                        self._identity_store_id,
-                        u["UserId"],
-                        u.get("UserName", ""),
-                        u.get("DisplayName"),
-                        u.get("Active", True),
-                        u.get("UserStatus"),
-                        primary_email,
-                        name.get("GivenName"),
-                        name.get("FamilyName"),
-                        json.dumps(u, default=str),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "aws_identity_center_users", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(users, table="aws_identity_center_users"):
+            total += self._upsert(
+                "aws_identity_center_users",
+                USER_ROWS.columns,
+                USER_ROWS.rows(batch, self.tenant_id, self._identity_store_id),
+                conflict,
+                update,
+            )
         logger.info("Synced %d AWS Identity Center users", total)
         return total
 
     def _sync_groups(self) -> int:
         logger.info("Syncing AWS Identity Center groups")
-        all_groups = self._paginate(
+        groups = self._paginate(
             self._ids_client,
             "list_groups",
             "Groups",
             IdentityStoreId=self._identity_store_id,
         )
+        groups = self._project(groups, GROUP_ROWS)
 
         total = 0
-        columns = [
-            "tenant_id",
-            "identity_store_id",
-            "group_id",
-            "display_name",
-            "description",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "identity_store_id", "group_id"]
         update = ["display_name", "description", "raw_response"]
 
-        for batch in self._batch_rows(all_groups):
-            rows = []
-            for g in batch:
-                rows.append(
-                    (
-                        self.tenant_id,
-                        self._identity_store_id,
-                        g["GroupId"],
-                        g.get("DisplayName", ""),
-                        g.get("Description"),
-                        json.dumps(g, default=str),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "aws_identity_center_groups", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(groups, table="aws_identity_center_groups"):
+            total += self._upsert(
+                "aws_identity_center_groups",
+                GROUP_ROWS.columns,
+                GROUP_ROWS.rows(batch, self.tenant_id, self._identity_store_id),
+                conflict,
+                update,
+            )
         logger.info("Synced %d AWS Identity Center groups", total)
         return total
 
     def _sync_memberships(self) -> int:
         logger.info("Syncing AWS Identity Center memberships")
-        # Get all group IDs
-        with self.db.transaction() as cur:
-            cur.execute(
-                """SELECT group_id FROM aws_identity_center_groups
-                   WHERE tenant_id = %s AND identity_store_id = %s AND deleted_at IS NULL""",
-                (self.tenant_id, self._identity_store_id),
+        self._flush_writes()
+        # Stream group IDs in key order instead of loading them all up front;
+        # a resumed run starts after the last group it finished
+        where = "tenant_id = %s AND identity_store_id = %s AND deleted_at IS NULL"
+        params: tuple = (self.tenant_id, self._identity_store_id)
+        last = self.checkpoint.key("memberships")
+        if last is not None:
+            where += " AND group_id > %s"
+            params += (last,)
+        group_ids = (
+            gid
+            for chunk in self.db.iter_keyset(
+                "aws_identity_center_groups",
+                ["group_id"],
+                ["group_id"],
+                where,
+                params,
+                replica=True,
             )
-            group_ids = [row[0] for row in cur.fetchall()]
+            for (gid,) in chunk
+        )
 
         total = 0
-        columns = [
-            "tenant_id",
-            "membership_id",
-            "identity_store_id",
-            "group_id",
-            "member_user_id",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "identity_store_id", "membership_id"]
         update = ["group_id", "member_user_id", "raw_response"]
 
@@ -190,43 +234,57 @@ class AwsIdentityCenterProvider(BaseProvider):
                 IdentityStoreId=self._identity_store_id,
                 GroupId=gid,
             )
-            for batch in self._batch_rows(members):
-                rows = []
-                for m in batch:
-                    member_id_obj = m.get("MemberId", {})
-                    user_id = member_id_obj.get("UserId", "")
-                    rows.append(
-                        (
-                            self.tenant_id,
-                            m["MembershipId"],
-                            self._identity_store_id,
-                            gid,
-                            user_id,
-                            json.dumps(m, default=str),
-                            "NOW()",
-                        )
-                    )
-                with self.db.transaction() as cur:
-                    total += self.db.upsert_batch(
-                        cur,
-                        "aws_identity_center_memberships",
-                        columns,
-                        rows,
-                        conflict,
-                        update,
-                    )
+            members = self._project(members, MEMBERSHIP_ROWS)
+            for batch in self._batch_rows(
+                members, table="aws_identity_center_memberships"
+            ):
+                total += self._upsert(
+                    "aws_identity_center_memberships",
+                    MEMBERSHIP_ROWS.columns,
+                    MEMBERSHIP_ROWS.rows(
+                        batch, self.tenant_id, self._identity_store_id, gid
+                    ),
+                    conflict,
+                    update,
+                )
+            self._finish_key("memberships", gid)
         logger.info("Synced %d AWS Identity Center memberships", total)
         return total
 
     def _sync_account_assignments(self) -> int:
         logger.info("Syncing AWS account assignments")
-        # Get permission sets
-        ps_arns: list[str] = []
-        paginator = self._sso_client.get_paginator("list_permission_sets")
-        for page in paginator.paginate(InstanceArn=self._sso_instance_arn):
-            ps_arns.extend(page.get("PermissionSets", []))
+        # Get permission sets (a few hundred at most; their names are needed
+        # for every assignment)
+        ps_arns: list[str] = list(
+            self._paginate(
+                self._sso_client,
+                "list_permission_sets",
+                "PermissionSets",
+                InstanceArn=self._sso_instance_arn,
+            )
+        )
+        ps_names = self._permission_set_names(ps_arns)
+
+        # Get provisioned accounts per permission set
+        total = 0
+        # A resumed run skips the permission sets it finished
+        unfinished = self.checkpoint.unfinished("account_assignments", ps_arns, ps_arns)
+        for ps_arn in unfinished:
+            # Accounts provisioned to this permission set
+            account_ids = self._paginate(
+                self._sso_client,
+                "list_accounts_for_provisioned_permission_set",
+                "AccountIds",
+                InstanceArn=self._sso_instance_arn,
+                PermissionSetArn=ps_arn,
+            )
+            for account_id in account_ids:
+                total += self._sync_assignments(account_id, ps_arn, ps_names)
+            self._finish_key("account_assignments", ps_arn)
+        logger.info("Synced %d AWS account assignments", total)
+        return total
 
-        # Resolve permission set names
+    def _permission_set_names(self, ps_arns: list[str]) -> dict[str, str]:
         ps_names: dict[str, str] = {}
         for arn in ps_arns:
             try:
@@ -237,20 +295,12 @@ class AwsIdentityCenterProvider(BaseProvider):
                 ps_names[arn] = desc["PermissionSet"].get("Name", arn)
             except Exception:
                 ps_names[arn] = arn
+        return ps_names
 
-        # Get provisioned accounts per permission set
-        total = 0
-        columns = [
-            "tenant_id",
-            "identity_store_id",
-            "account_id",
-            "permission_set_arn",
-            "permission_set_name",
-            "principal_type",
-            "principal_id",
-            "raw_response",
-            "last_synced_at",
-        ]
+    def _sync_assignments(
+        self, account_id: str, ps_arn: str, ps_names: dict[str, str]
+    ) -> int:
+        """Assignments of one permission set in one account."""
         conflict = [
             "tenant_id",
             "account_id",
@@ -263,52 +313,44 @@ class AwsIdentityCenterProvider(BaseProvider):
             "permission_set_name",
             "raw_response",
         ]
-
-        for ps_arn in ps_arns:
-            # List accounts provisioned to this permission set
-            acct_paginator = self._sso_client.get_paginator(
-                "list_accounts_for_provisioned_permission_set"
+        assignments = self._paginate(
+            self._sso_client,
+            "list_account_assignments",
+            "AccountAssignments",
+            InstanceArn=self._sso_instance_arn,
+            AccountId=account_id,
+            PermissionSetArn=ps_arn,
+        )
+        assignments = self._project(assignments, ASSIGNMENT_ROWS)
+        total = 0
+        for batch in self._batch_rows(assignments, table="aws_account_assignments"):
+            rows = ASSIGNMENT_ROWS.rows(
+                batch, self.tenant_id, self._identity_store_id, ps_names
+            )
+            total += self._upsert(
+                "aws_account_assignments",
+                ASSIGNMENT_ROWS.columns,
+                rows,
+                conflict,
+                update,
             )
-            account_ids: list[str] = []
-            for page in acct_paginator.paginate(
-                InstanceArn=self._sso_instance_arn,
-                PermissionSetArn=ps_arn,
-            ):
-                account_ids.extend(page.get("AccountIds", []))
-
-            for account_id in account_ids:
-                assignments = self._paginate(
-                    self._sso_client,
-                    "list_account_assignments",
-                    "AccountAssignments",
-                    InstanceArn=self._sso_instance_arn,
-                    AccountId=account_id,
-                    PermissionSetArn=ps_arn,
-                )
-                for batch in self._batch_rows(assignments):
-                    rows = []
-                    for a in batch:
-                        rows.append(
-                            (
-                                self.tenant_id,
-                                self._identity_store_id,
-                                a["AccountId"],
-                                a["PermissionSetArn"],
-                                ps_names.get(a["PermissionSetArn"], ""),
-                                a["PrincipalType"],
-                                a["PrincipalId"],
-                                json.dumps(a, default=str),
-                                "NOW()",
-                            )
-                        )
-                    with self.db.transaction() as cur:
-                        total += self.db.upsert_batch(
-                            cur,
-                            "aws_account_assignments",
-                            columns,
-                            rows,
-                            conflict,
-                            update,
-                        )
-        logger.info("Synced %d AWS account assignments", total)
         return total
+
+    def sync_entity(self, kind: str, key: str) -> dict[str, int]:
+        """Refresh the assignments of one account (``--account id``)."""
+        ps_arns: list[str] = list(
+            self._paginate(
+                self._sso_client,
+                "list_permission_sets_provisioned_to_account",
+                "PermissionSets",
+                InstanceArn=self._sso_instance_arn,
+                AccountId=key,
+            )
+        )
+        ps_names = self._permission_set_names(ps_arns)
+        total = 0
+        for ps_arn in ps_arns:
+            total += self._sync_assignments(key, ps_arn, ps_names)
+        self._sweep_scope("aws_account_assignments", account_id=key)
+        self.grant_scopes.append(GrantScope("aws", resource_ids=(key,)))
+        return {"account_assignments": total}
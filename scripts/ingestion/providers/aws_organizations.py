@@ -2,71 +2,100 @@
 
 from __future__ import annotations
 
-import json
 import logging
+from typing import Any, Iterator, Optional
 
 import boto3
 
 from scripts.ingestion.base_provider import BaseProvider
 from scripts.ingestion.config import IngestionConfig
 from scripts.ingestion.db import Database
+from scripts.ingestion.grants_backfill import GrantScope
+from scripts.ingestion.rowmap import ITEM, Arg, Call, Const, Field, RowMapper
+from scripts.ingestion.serialization import dumps
 
 logger = logging.getLogger("ingestion.aws_organizations")
 
 
+def _timestamp(value: Any) -> Any:
+    """boto3 datetimes as ISO 8601 text; empty values unchanged."""
+    if value:
+        return value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return value
+
+
+# Organizations responses are not in providerschema, so no schema check;
+# _org_id and _parent_id are added by _iter_accounts
+ACCOUNT_ROWS = RowMapper(
+    "aws_accounts",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "account_id": Field("Id"),
+        "name": Field("Name", ""),
+        "email": Field("Email", None),
+        "status": Field("Status", "ACTIVE"),
+        "joined_method": Field("JoinedMethod", None),
+        "joined_at": Call(_timestamp, Field("JoinedTimestamp", None)),
+        "org_id": Field("_org_id", None),
+        "parent_id": Field("_parent_id", None),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+)
+
+
 class AwsOrganizationsProvider(BaseProvider):
     PROVIDER_NAME = "aws_organizations"
+    ENTITY_KINDS = ("account",)
+    SWEEP_TABLES = ("aws_accounts",)
 
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         super().__init__(config, db)
         aws_orgs = config.aws_organizations
         if not aws_orgs:
             raise ValueError("AWS Organizations config not set")
-        self._client = boto3.client("organizations", region_name=aws_orgs.region)
+        self._client = self._boto3_client(
+            boto3.client("organizations", region_name=aws_orgs.region)
+        )
 
     def sync(self) -> dict[str, int]:
         return {"accounts": self._sync_accounts()}
 
-    def _sync_accounts(self) -> int:
-        logger.info("Syncing AWS Organization accounts")
+    def _iter_accounts(self, org_id: Optional[str]) -> Iterator[dict]:
+        """Yield every account, page by page, with its org and parent resolved."""
+        paginator = self._client.get_paginator("list_accounts")
+        for page in paginator.paginate():
+            for acct in page.get("Accounts", []):
+                yield self._resolve_parent(acct, org_id)
 
-        # Get organization info
+    def _resolve_parent(self, acct: dict, org_id: Optional[str]) -> dict:
+        acct["_org_id"] = org_id
+        try:
+            parents = self._client.list_parents(ChildId=acct["Id"])
+            parent_list = parents.get("Parents", [])
+            acct["_parent_id"] = parent_list[0]["Id"] if parent_list else None
+        except Exception:
+            acct["_parent_id"] = None
+        return acct
+
+    def _org_id(self) -> Optional[str]:
         try:
             org_resp = self._client.describe_organization()
-            org_id = org_resp["Organization"]["Id"]
+            return org_resp["Organization"]["Id"]
         except Exception:
-            org_id = None
+            return None
 
-        # List all accounts
-        all_accounts: list[dict] = []
-        paginator = self._client.get_paginator("list_accounts")
-        for page in paginator.paginate():
-            all_accounts.extend(page.get("Accounts", []))
-
-        # Resolve parent for each account
-        for acct in all_accounts:
-            acct["_org_id"] = org_id
-            try:
-                parents = self._client.list_parents(ChildId=acct["Id"])
-                parent_list = parents.get("Parents", [])
-                acct["_parent_id"] = parent_list[0]["Id"] if parent_list else None
-            except Exception:
-                acct["_parent_id"] = None
+    def _sync_accounts(self) -> int:
+        logger.info("Syncing AWS Organization accounts")
+        accounts = self._project(self._iter_accounts(self._org_id()), ACCOUNT_ROWS)
 
         total = 0
-        columns = [
-            "tenant_id",
-            "account_id",
-            "name",
-            "email",
-            "status",
-            "joined_method",
-            "joined_at",
-            "org_id",
-            "parent_id",
-            "raw_response",
-            "last_synced_at",
-        ]
+        for batch in self._batch_rows(accounts, table="aws_accounts"):
+            total += self._upsert_accounts(batch)
+        logger.info("Synced %d AWS accounts", total)
+        return total
+
+    def _upsert_accounts(self, accounts: list[dict]) -> int:
         conflict = ["tenant_id", "account_id"]
         update = [
             "name",
@@ -79,34 +108,20 @@ class AwsOrganizationsProvider(BaseProvider):
             "raw_response",
         ]
 
-        for batch in self._batch_rows(all_accounts):
-            rows = []
-            for a in batch:
-                joined_at = a.get("JoinedTimestamp")
-                if joined_at:
-                    joined_at = (
-                        joined_at.isoformat()
-                        if hasattr(joined_at, "isoformat")
-                        else str(joined_at)
-                    )
-                rows.append(
-                    (
-                        self.tenant_id,
-                        a["Id"],
-                        a.get("Name", ""),
-                        a.get("Email"),
-                        a.get("Status", "ACTIVE"),
-                        a.get("JoinedMethod"),
-                        joined_at,
-                        a.get("_org_id"),
-                        a.get("_parent_id"),
-                        json.dumps(a, default=str),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "aws_accounts", columns, rows, conflict, update
-                )
-        logger.info("Synced %d AWS accounts", total)
-        return total
+        return self._upsert(
+            "aws_accounts",
+            ACCOUNT_ROWS.columns,
+            ACCOUNT_ROWS.rows(accounts, self.tenant_id),
+            conflict,
+            update,
+        )
+
+    def sync_entity(self, kind: str, key: str) -> dict[str, int]:
+        """Refresh one account row (``--account id``)."""
+        acct = self._client.describe_account(AccountId=key)["Account"]
+        acct = self._resolve_parent(acct, self._org_id())
+        counts = {
+            "accounts": self._upsert_accounts(list(self._project([acct], ACCOUNT_ROWS)))
+        }
+        self.grant_scopes.append(GrantScope("aws", resource_ids=(acct["Id"],)))
+        return counts
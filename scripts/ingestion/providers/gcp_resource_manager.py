@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-import json
 import logging
+from typing import Any, Iterator
 
 from google.cloud import resourcemanager_v3
 from google.iam.v1 import iam_policy_pb2
@@ -12,12 +12,20 @@ from google.oauth2 import service_account
 from scripts.ingestion.base_provider import BaseProvider
 from scripts.ingestion.config import IngestionConfig
 from scripts.ingestion.db import Database
+from scripts.ingestion.grants_backfill import GrantScope
+from scripts.ingestion.serialization import dumps
 
 logger = logging.getLogger("ingestion.gcp_resource_manager")
 
 
 class GcpResourceManagerProvider(BaseProvider):
     PROVIDER_NAME = "gcp_resource_manager"
+    ENTITY_KINDS = ("project",)
+    SWEEP_TABLES = (
+        "gcp_organisations",
+        "gcp_projects",
+        "gcp_project_iam_bindings",
+    )
 
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         super().__init__(config, db)
@@ -26,23 +34,35 @@ class GcpResourceManagerProvider(BaseProvider):
             raise ValueError("GCP config not set")
         self._org_id = gcp.org_id
 
-        if gcp.sa_key_file:
+        self._sa_key_file = gcp.sa_key_file
+        # Built lazily: a replaying cassette needs no credentials
+        self._org_client = self._grpc_client(
+            "organizations",
+            lambda: resourcemanager_v3.OrganizationsClient(
+                credentials=self._credentials()
+            ),
+        )
+        self._proj_client = self._grpc_client(
+            "projects",
+            lambda: resourcemanager_v3.ProjectsClient(credentials=self._credentials()),
+        )
+
+    def _credentials(self) -> Any:
+        if self._sa_key_file:
             # Local dev / explicit service account key file
-            creds = service_account.Credentials.from_service_account_file(
-                gcp.sa_key_file
+            return service_account.Credentials.from_service_account_file(
+                self._sa_key_file
             )
-        else:
-            # Cloud Run / Workload Identity: use Application Default Credentials
-            creds = None  # Client libraries auto-discover ADC when creds=None
-
-        self._org_client = resourcemanager_v3.OrganizationsClient(credentials=creds)
-        self._proj_client = resourcemanager_v3.ProjectsClient(credentials=creds)
+        # Cloud Run / Workload Identity: use Application Default Credentials
+        return None  # Client libraries auto-discover ADC when creds=None
 
     def sync(self) -> dict[str, int]:
         results: dict[str, int] = {}
-        results["organisations"] = self._sync_org()
-        results["projects"] = self._sync_projects()
-        results["iam_bindings"] = self._sync_iam_bindings()
+        results["organisations"] = self._run_step("organisations", self._sync_org)
+        results["projects"] = self._run_step("projects", self._sync_projects)
+        results["iam_bindings"] = self._run_step(
+            "iam_bindings", self._sync_iam_bindings
+        )
         return results
 
     def _sync_org(self) -> int:
@@ -55,10 +75,10 @@ class GcpResourceManagerProvider(BaseProvider):
             org = self._org_client.get_organization(name=org_name)
         except Exception:
             logger.warning("Could not fetch org %s, trying search", org_name)
-            orgs = list(self._org_client.search_organizations())
-            if not orgs:
+            org = next(iter(self._org_client.search_organizations()), None)
+            if org is None:
+                self._mark_partial("gcp_organisations", f"{org_name} not found")
                 return 0
-            org = orgs[0]
 
         columns = [
             "tenant_id",
@@ -84,15 +104,12 @@ class GcpResourceManagerProvider(BaseProvider):
                 org.display_name,
                 getattr(org, "directory_customer_id", None),
                 org.state.name if org.state else "ACTIVE",
-                json.dumps(raw),
+                dumps(raw),
                 "NOW()",
             )
         ]
 
-        with self.db.transaction() as cur:
-            return self.db.upsert_batch(
-                cur, "gcp_organisations", columns, rows, conflict, update
-            )
+        return self._upsert("gcp_organisations", columns, rows, conflict, update)
 
     def _sync_projects(self) -> int:
         logger.info("Syncing GCP projects")
@@ -100,12 +117,17 @@ class GcpResourceManagerProvider(BaseProvider):
         if not org_name.startswith("organizations/"):
             org_name = f"organizations/{org_name}"
 
-        all_projects: list = []
         request = resourcemanager_v3.SearchProjectsRequest(query=f"parent:{org_name}")
-        for project in self._proj_client.search_projects(request=request):
-            all_projects.append(project)
+        # The pager fetches the next page only when iteration reaches it
+        projects = self._proj_client.search_projects(request=request)
 
         total = 0
+        for batch in self._batch_rows(projects, table="gcp_projects"):
+            total += self._upsert_projects(batch)
+        logger.info("Synced %d GCP projects", total)
+        return total
+
+    def _upsert_projects(self, projects: list[Any]) -> int:
         columns = [
             "tenant_id",
             "project_id",
@@ -129,54 +151,78 @@ class GcpResourceManagerProvider(BaseProvider):
             "raw_response",
         ]
 
-        for batch in self._batch_rows(all_projects):
-            rows = []
-            for p in batch:
-                parent = p.parent or ""
-                org_id_val = parent if parent.startswith("organizations/") else None
-                folder_id_val = parent if parent.startswith("folders/") else None
-                labels = dict(p.labels) if p.labels else {}
-
-                raw = {
-                    "projectId": p.project_id,
-                    "name": p.name,
-                    "displayName": p.display_name,
-                    "state": p.state.name if p.state else "ACTIVE",
-                    "parent": parent,
-                }
-                rows.append(
-                    (
-                        self.tenant_id,
-                        p.project_id,
-                        p.name.split("/")[-1] if p.name else "",
-                        p.display_name,
-                        p.state.name if p.state else "ACTIVE",
-                        org_id_val,
-                        folder_id_val,
-                        json.dumps(labels),
-                        json.dumps(raw),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "gcp_projects", columns, rows, conflict, update
+        rows = []
+        for p in projects:
+            parent = p.parent or ""
+            org_id_val = parent if parent.startswith("organizations/") else None
+            folder_id_val = parent if parent.startswith("folders/") else None
+            labels = dict(p.labels) if p.labels else {}
+
+            raw = {
+                "projectId": p.project_id,
+                "name": p.name,
+                "displayName": p.display_name,
+                "state": p.state.name if p.state else "ACTIVE",
+                "parent": parent,
+            }
+            rows.append(
+                (
+                    self.tenant_id,
+                    p.project_id,
+                    p.name.split("/")[-1] if p.name else "",
+                    p.display_name,
+                    p.state.name if p.state else "ACTIVE",
+                    org_id_val,
+                    folder_id_val,
+                    dumps(labels),
+                    dumps(raw),
+                    "NOW()",
                 )
-        logger.info("Synced %d GCP projects", total)
-        return total
+            )
+        return self._upsert("gcp_projects", columns, rows, conflict, update)
 
     def _sync_iam_bindings(self) -> int:
         logger.info("Syncing GCP project IAM bindings")
-        # Get all project IDs
-        with self.db.transaction() as cur:
-            cur.execute(
-                """SELECT project_id FROM gcp_projects
-                   WHERE tenant_id = %s AND lifecycle_state = 'ACTIVE' AND deleted_at IS NULL""",
-                (self.tenant_id,),
+        self._flush_writes()
+        # Stream project IDs in key order instead of loading them all up front;
+        # a resumed run starts after the last project it finished
+        where = "tenant_id = %s AND lifecycle_state = 'ACTIVE' AND deleted_at IS NULL"
+        params: tuple = (self.tenant_id,)
+        last = self.checkpoint.key("iam_bindings")
+        if last is not None:
+            where += " AND project_id > %s"
+            params += (last,)
+        project_ids = (
+            pid
+            for chunk in self.db.iter_keyset(
+                "gcp_projects",
+                ["project_id"],
+                ["project_id"],
+                where,
+                params,
+                replica=True,
             )
-            project_ids = [row[0] for row in cur.fetchall()]
+            for (pid,) in chunk
+        )
 
         total = 0
+        for pid in project_ids:
+            try:
+                request = iam_policy_pb2.GetIamPolicyRequest(resource=f"projects/{pid}")
+                policy = self._proj_client.get_iam_policy(request=request)
+            except Exception as e:
+                logger.warning("Could not get IAM policy for project %s: %s", pid, e)
+                self._mark_partial(
+                    "gcp_project_iam_bindings", f"IAM policy fetch failed for {pid}"
+                )
+                continue
+
+            total += self._upsert_bindings(pid, policy)
+            self._finish_key("iam_bindings", pid)
+        logger.info("Synced %d GCP IAM bindings", total)
+        return total
+
+    def _upsert_bindings(self, pid: str, policy: Any) -> int:
         columns = [
             "tenant_id",
             "project_id",
@@ -194,54 +240,53 @@ class GcpResourceManagerProvider(BaseProvider):
             "condition_title",
             "raw_response",
         ]
+        return self._upsert_rows(
+            "gcp_project_iam_bindings",
+            columns,
+            self._binding_rows(pid, policy),
+            conflict,
+            update,
+        )
 
-        for pid in project_ids:
-            try:
-                request = iam_policy_pb2.GetIamPolicyRequest(resource=f"projects/{pid}")
-                policy = self._proj_client.get_iam_policy(request=request)
-            except Exception as e:
-                logger.warning("Could not get IAM policy for project %s: %s", pid, e)
-                continue
+    def _binding_rows(self, pid: str, policy: Any) -> Iterator[tuple]:
+        """One row per (binding, member) of a project's IAM policy."""
+        for binding in policy.bindings:
+            role = binding.role
+            condition = binding.condition if binding.condition else None
+            cond_expr = condition.expression if condition else None
+            cond_title = condition.title if condition else None
 
-            bindings_rows: list[tuple] = []
-            for binding in policy.bindings:
-                role = binding.role
-                condition = binding.condition if binding.condition else None
-                cond_expr = condition.expression if condition else None
-                cond_title = condition.title if condition else None
-
-                for member in binding.members:
-                    # Parse member type prefix
-                    if ":" in member:
-                        member_type, member_id = member.split(":", 1)
-                    else:
-                        member_type = member
-                        member_id = member
-
-                    raw = {"role": role, "member": member}
-                    bindings_rows.append(
-                        (
-                            self.tenant_id,
-                            pid,
-                            role,
-                            member_type,
-                            member_id,
-                            cond_expr,
-                            cond_title,
-                            json.dumps(raw),
-                            "NOW()",
-                        )
-                    )
-
-            for batch in self._batch_rows(bindings_rows):
-                with self.db.transaction() as cur:
-                    total += self.db.upsert_batch(
-                        cur,
-                        "gcp_project_iam_bindings",
-                        columns,
-                        batch,
-                        conflict,
-                        update,
-                    )
-        logger.info("Synced %d GCP IAM bindings", total)
-        return total
+            for member in binding.members:
+                # Parse member type prefix
+                if ":" in member:
+                    member_type, member_id = member.split(":", 1)
+                else:
+                    member_type = member
+                    member_id = member
+
+                raw = {"role": role, "member": member}
+                yield (
+                    self.tenant_id,
+                    pid,
+                    role,
+                    member_type,
+                    member_id,
+                    cond_expr,
+                    cond_title,
+                    dumps(raw),
+                    "NOW()",
+                )
+
+    def sync_entity(self, kind: str, key: str) -> dict[str, int]:
+        """Refresh one project (``--project id``) and its IAM bindings."""
+        project = self._proj_client.get_project(name=f"projects/{key}")
+        pid = project.project_id
+        request = iam_policy_pb2.GetIamPolicyRequest(resource=f"projects/{pid}")
+        policy = self._proj_client.get_iam_policy(request=request)
+        counts = {
+            "projects": self._upsert_projects([project]),
+            "iam_bindings": self._upsert_bindings(pid, policy),
+        }
+        self._sweep_scope("gcp_project_iam_bindings", project_id=pid)
+        self.grant_scopes.append(GrantScope("gcp", resource_ids=(pid,)))
+        return counts
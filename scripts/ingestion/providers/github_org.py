@@ -2,22 +2,272 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import time
-from typing import Any, Optional
-
-import requests
+import re
+from typing import Any, Iterable, Iterator, Optional
 
 from scripts.ingestion.base_provider import BaseProvider
 from scripts.ingestion.config import IngestionConfig
 from scripts.ingestion.db import Database
+from scripts.ingestion.grants_backfill import GrantScope
+from scripts.ingestion.jsonstream import (
+    CompactRecord,
+    iter_array_items,
+    raw_json,
+    record_type,
+)
+from scripts.ingestion.projection import FieldMask
+from scripts.ingestion.rowmap import ITEM, Arg, Call, Const, Field, RowMapper
 
 logger = logging.getLogger("ingestion.github")
 
+# Compact records for the streamed listings: the fields the row builders read
+GitHubMember = record_type(
+    "GitHubMember",
+    (
+        "id",
+        "node_id",
+        "login",
+        "name",
+        "email",
+        "type",
+        "site_admin",
+        "avatar_url",
+        "role",
+    ),
+)
+GitHubTeam = record_type(
+    "GitHubTeam",
+    (
+        "id",
+        "node_id",
+        "name",
+        "slug",
+        "description",
+        "privacy",
+        "permission",
+        "parent",
+    ),
+)
+GitHubRepo = record_type(
+    "GitHubRepo",
+    (
+        "id",
+        "node_id",
+        "name",
+        "full_name",
+        "private",
+        "visibility",
+        "archived",
+        "default_branch",
+        "description",
+        "fork",
+        "language",
+        "pushed_at",
+    ),
+)
+GitHubRepoTeam = record_type("GitHubRepoTeam", ("node_id", "permission"))
+GitHubCollaborator = record_type(
+    "GitHubCollaborator", ("node_id", "permissions", "type")
+)
+
+
+# Fields GET /orgs/{org}/teams/{slug} and GET /repos/{owner}/{repo} return
+# beyond the items of the org's team and repository listings
+_TEAM_FULL_FIELDS = frozenset(
+    {"members_count", "repos_count", "created_at", "updated_at", "organization"}
+)
+_REPO_FULL_FIELDS = frozenset(
+    {
+        "organization",
+        "parent",
+        "source",
+        "template_repository",
+        "network_count",
+        "subscribers_count",
+        "security_and_analysis",
+    }
+)
+
+
+def _as_listed(item: dict, full_fields: frozenset) -> dict:
+    """A single-object response cut to the fields its listing item has.
+
+    Targeted refreshes store it as raw_response, so it must match what a
+    full sync stores or content_hash flips between the two.
+    """
+    return {key: value for key, value in item.items() if key not in full_fields}
+
+
+def _highest_permission(perms: dict) -> str:
+    """GitHub returns permissions as an object; pick the highest."""
+    for level in ("admin", "maintain", "push", "triage", "pull"):
+        if perms.get(level):
+            return level
+    return "read"
+
+
+def _is_outside_collaborator(perms: dict, user_type: Optional[str]) -> bool:
+    return perms.get("admin", False) is False and user_type != "User"
+
+
+# URL path segments replaced by their route parameter in the HTTP metrics
+_ROUTE_PARAMS = (
+    (re.compile(r"/orgs/[^/]+"), "/orgs/{org}"),
+    (re.compile(r"/teams/[^/]+(?=/)"), "/teams/{team}"),
+    (re.compile(r"/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+)
+
+
+def _endpoint(path: str) -> str:
+    for pattern, route in _ROUTE_PARAMS:
+        path = pattern.sub(route, path)
+    return path
+
+
+USER_ROWS = RowMapper(
+    "github_users",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "github_id": Field("id"),
+        "node_id": Field("node_id"),
+        "login": Field("login"),
+        "name": Field("name", None),
+        "email": Field("email", None),
+        "type": Field("type", "User"),
+        "site_admin": Field("site_admin", False),
+        "avatar_url": Field("avatar_url", None),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    schema=("github_org", "simple-user"),
+)
+
+# Org and team member listings return simple-users; role is set only on
+# some API versions
+ORG_MEMBERSHIP_ROWS = RowMapper(
+    "github_org_memberships",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "org_node_id": Arg("org_node_id"),
+        "user_node_id": Field("node_id"),
+        "role": Field("role", "member", extra=True),
+        "state": Const("active"),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "org_node_id"),
+    schema=("github_org", "simple-user"),
+)
+
+TEAM_MEMBERSHIP_ROWS = RowMapper(
+    "github_team_memberships",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "team_node_id": Arg("team_node_id"),
+        "user_node_id": Field("node_id"),
+        "role": Field("role", "member", extra=True),
+        "state": Const("active"),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "team_node_id"),
+    schema=("github_org", "simple-user"),
+)
+
+TEAM_ROWS = RowMapper(
+    "github_teams",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "github_id": Field("id"),
+        "node_id": Field("node_id"),
+        "org_node_id": Arg("org_node_id"),
+        "name": Field("name"),
+        "slug": Field("slug"),
+        "description": Field("description", None),
+        "privacy": Field("privacy", None),
+        "permission": Field("permission", None),
+        "parent_team_id": Field("parent.id", None),
+        "parent_team_node_id": Field("parent.node_id", None),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "org_node_id"),
+    schema=("github_org", "team"),
+)
+
+REPO_ROWS = RowMapper(
+    "github_repositories",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "github_id": Field("id"),
+        "node_id": Field("node_id"),
+        "org_node_id": Arg("org_node_id"),
+        "name": Field("name"),
+        "full_name": Field("full_name"),
+        "private": Field("private", False),
+        "visibility": Field("visibility", None),
+        "archived": Field("archived", False),
+        "default_branch": Field("default_branch", None),
+        "description": Field("description", None),
+        "fork": Field("fork", False),
+        "language": Field("language", None),
+        "pushed_at": Field("pushed_at", None),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "org_node_id"),
+    schema=("github_org", "repository"),
+)
+
+REPO_TEAM_ROWS = RowMapper(
+    "github_repo_team_permissions",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "repo_node_id": Arg("repo_node_id"),
+        "team_node_id": Field("node_id"),
+        "permission": Field("permission", "pull"),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "repo_node_id"),
+    schema=("github_org", "team"),
+)
+
+# Collaborators are simple-users plus the caller's permissions on the repo
+COLLABORATOR_ROWS = RowMapper(
+    "github_repo_collaborator_permissions",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "repo_node_id": Arg("repo_node_id"),
+        "user_node_id": Field("node_id"),
+        "permission": Call(_highest_permission, Field("permissions", {}, extra=True)),
+        "is_outside_collaborator": Call(
+            _is_outside_collaborator,
+            Field("permissions", {}, extra=True),
+            Field("type", None),
+        ),
+        "raw_response": Call(raw_json, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "repo_node_id"),
+    schema=("github_org", "simple-user"),
+)
+
 
 class GitHubOrgProvider(BaseProvider):
     PROVIDER_NAME = "github"
+    ENTITY_KINDS = ("repo", "team")
+    SWEEP_TABLES = (
+        "github_organisations",
+        "github_users",
+        "github_org_memberships",
+        "github_teams",
+        "github_team_memberships",
+        "github_repositories",
+        "github_repo_team_permissions",
+        "github_repo_collaborator_permissions",
+    )
 
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         super().__init__(config, db)
@@ -27,39 +277,73 @@ class GitHubOrgProvider(BaseProvider):
         self._token = gh.token
         self._org_logins = gh.org_logins
         self._base = gh.api_base_url.rstrip("/")
-        self._session = requests.Session()
-        self._session.headers.update(
+        self._stream_json = config.stream_json
+        self._http_client(
             {
                 "Authorization": f"token {self._token}",
                 "Accept": "application/vnd.github+json",
                 "X-GitHub-Api-Version": "2022-11-28",
-            }
+            },
+            endpoint=_endpoint,
         )
 
-    def _get_paginated(self, url: str, params: Optional[dict] = None) -> list[dict]:
-        """Fetch all pages from a GitHub REST API endpoint."""
-        results: list[dict] = []
+    def _iter_paginated(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        record: Optional[type[CompactRecord]] = None,
+        mask: Optional[FieldMask] = None,
+        step: Optional[str] = None,
+    ) -> Iterator[Any]:
+        """Yield the items of a GitHub REST API endpoint, one page at a time.
+
+        The next page is requested only once the caller has consumed the
+        current one.  Non-list responses (e.g. /orgs/{org}) yield one item.
+
+        With INGESTION_STREAM_JSON and a ``record`` type, a page is not
+        decoded as a whole: each array element is decoded on its own into a
+        compact ``record`` that keeps the element's text as raw_response.
+        A ``mask`` (INGESTION_RAW_PROJECTION_PROVIDERS) instead trims each
+        element to its fields, as a dict.
+
+        With a checkpoint ``step`` every page's URL is reported to
+        self.checkpoint, and an interrupted run's listing restarts at its
+        saved page, past the items already written.
+        """
         params = dict(params or {})
         params.setdefault("per_page", "100")
-        attempt = 0
+        # Index of the page's first item; negative after a resume skipped some
+        index, skip = 0, 0
+        resume = self.checkpoint.resume_cursor(step) if step else None
+        if resume is not None:
+            url, skip = resume
+            params, index = {}, -skip
 
         while url:
-            resp = self._session.get(url, params=params)
-            if resp.status_code == 403 and "rate limit" in resp.text.lower():
-                reset = int(resp.headers.get("X-RateLimit-Reset", "0"))
-                wait = max(reset - int(time.time()), 1)
-                logger.warning("GitHub rate limit hit, waiting %ds", wait)
-                time.sleep(min(wait, 300))
-                attempt += 1
-                if attempt > 5:
-                    raise RuntimeError("GitHub rate limit exceeded after retries")
-                continue
+            # Rate limits, 5xx and dropped connections are retried there
+            resp = self.http.get(url, params=params)
             resp.raise_for_status()
-            data = resp.json()
-            if isinstance(data, list):
-                results.extend(data)
+            if step is not None:
+                self.checkpoint.page(step, index, resp.url)
+            if record is not None and self._stream_json:
+                # The body is read in full so the connection is released
+                # before the caller writes; only elements are decoded.
+                items: Iterable[Any] = (
+                    mask.apply(data) if mask else record.from_item(raw, data)
+                    for raw, data in iter_array_items([resp.content])
+                )
             else:
-                results.append(data)
+                data = resp.json()
+                if not isinstance(data, list):
+                    data = [data]
+                items = map(mask.apply, data) if mask else data
+            count = 0
+            for item in items:
+                count += 1
+                if count > skip:
+                    yield item
+            index += count
+            skip = 0
 
             # Follow Link header for pagination
             url = ""
@@ -69,8 +353,6 @@ class GitHubOrgProvider(BaseProvider):
                 if 'rel="next"' in part:
                     url = part.split(";")[0].strip().strip("<>")
                     break
-            attempt = 0
-        return results
 
     def sync(self) -> dict[str, int]:
         results: dict[str, int] = {}
@@ -81,56 +363,193 @@ class GitHubOrgProvider(BaseProvider):
         return results
 
     def _sync_org(self, org_login: str) -> dict[str, int]:
-        counts: dict[str, int] = {}
+        counts: dict[str, int] = dict.fromkeys(
+            (
+                "users",
+                "org_memberships",
+                "teams",
+                "team_memberships",
+                "repos",
+                "repo_team_permissions",
+                "repo_collaborator_permissions",
+            ),
+            0,
+        )
 
         # 1. Organisation itself
-        org_data = self._get_paginated(f"{self._base}/orgs/{org_login}")
-        org = org_data[0] if org_data else {}
+        org = next(self._iter_paginated(f"{self._base}/orgs/{org_login}"), {})
         org_node_id = org.get("node_id", "")
         counts["org"] = self._upsert_org(org)
 
-        # 2. Members
-        members = self._get_paginated(f"{self._base}/orgs/{org_login}/members")
-        counts["users"] = self._upsert_users(members)
-        counts["org_memberships"] = self._upsert_org_memberships(org_node_id, members)
-
-        # 3. Teams
-        teams = self._get_paginated(f"{self._base}/orgs/{org_login}/teams")
-        counts["teams"] = self._upsert_teams(org_node_id, teams)
-
-        # 4. Team memberships
-        tm_total = 0
-        for team in teams:
-            slug = team.get("slug", "")
-            team_node_id = team.get("node_id", "")
-            team_members = self._get_paginated(
-                f"{self._base}/orgs/{org_login}/teams/{slug}/members"
+        # 2. Members: each page batch feeds both tables
+        step = f"{org_login}/members"
+        if not self.checkpoint.done(step):
+            members = self._iter_paginated(
+                f"{self._base}/orgs/{org_login}/members",
+                record=GitHubMember,
+                mask=self._field_mask(USER_ROWS, ORG_MEMBERSHIP_ROWS),
+                step=step,
+            )
+            for batch in self._batch_rows(members, table="github_users", step=step):
+                counts["users"] += self._upsert_users(batch)
+                counts["org_memberships"] += self._upsert_org_memberships(
+                    org_node_id, batch
+                )
+            self._complete_step(step)
+
+        # 3. Teams, then the members of each team in the batch
+        step = f"{org_login}/teams"
+        if not self.checkpoint.done(step):
+            teams = self._iter_paginated(
+                f"{self._base}/orgs/{org_login}/teams",
+                record=GitHubTeam,
+                mask=self._field_mask(TEAM_ROWS),
+                step=step,
             )
-            tm_total += self._upsert_team_memberships(team_node_id, team_members)
-        counts["team_memberships"] = tm_total
-
-        # 5. Repositories
-        repos = self._get_paginated(f"{self._base}/orgs/{org_login}/repos")
-        counts["repos"] = self._upsert_repos(org_node_id, repos)
-
-        # 6. Repo team permissions + collaborator permissions
-        rtp_total = 0
-        rcp_total = 0
-        for repo in repos:
-            full_name = repo.get("full_name", "")
-            repo_node_id = repo.get("node_id", "")
-
-            repo_teams = self._get_paginated(f"{self._base}/repos/{full_name}/teams")
-            rtp_total += self._upsert_repo_team_perms(repo_node_id, repo_teams)
-
-            collabs = self._get_paginated(
-                f"{self._base}/repos/{full_name}/collaborators",
-                params={"affiliation": "all"},
+            for batch in self._batch_rows(teams, table="github_teams", step=step):
+                counts["teams"] += self._upsert_teams(org_node_id, batch)
+                slugs = [team.get("slug", "") for team in batch]
+                for team in self.checkpoint.unfinished(step, batch, slugs):
+                    slug = team.get("slug", "")
+                    counts["team_memberships"] += self._sync_team_members(
+                        org_login, slug, team.get("node_id", "")
+                    )
+                    self._finish_key(step, slug)
+            self._complete_step(step)
+
+        # 4. Repositories, then team + collaborator permissions per repo
+        step = f"{org_login}/repos"
+        if not self.checkpoint.done(step):
+            repos = self._iter_paginated(
+                f"{self._base}/orgs/{org_login}/repos",
+                record=GitHubRepo,
+                mask=self._field_mask(REPO_ROWS),
+                step=step,
             )
-            rcp_total += self._upsert_repo_collab_perms(repo_node_id, collabs)
-        counts["repo_team_permissions"] = rtp_total
-        counts["repo_collaborator_permissions"] = rcp_total
+            for batch in self._batch_rows(
+                repos, table="github_repositories", step=step
+            ):
+                counts["repos"] += self._upsert_repos(org_node_id, batch)
+                names = [repo.get("full_name", "") for repo in batch]
+                for repo in self.checkpoint.unfinished(step, batch, names):
+                    full_name = repo.get("full_name", "")
+                    self._sync_repo_perms(full_name, repo.get("node_id", ""), counts)
+                    self._finish_key(step, full_name)
+            self._complete_step(step)
+
+        return counts
+
+    def _sync_team_members(self, org_login: str, slug: str, team_node_id: str) -> int:
+        team_members = self._iter_paginated(
+            f"{self._base}/orgs/{org_login}/teams/{slug}/members",
+            record=GitHubMember,
+            mask=self._field_mask(TEAM_MEMBERSHIP_ROWS),
+        )
+        return self._upsert_team_memberships(team_node_id, team_members)
+
+    def _sync_repo_perms(
+        self, full_name: str, repo_node_id: str, counts: dict[str, int]
+    ) -> None:
+        """Team and collaborator permissions of one repository."""
+        repo_teams = self._iter_paginated(
+            f"{self._base}/repos/{full_name}/teams",
+            record=GitHubRepoTeam,
+            mask=self._field_mask(REPO_TEAM_ROWS),
+        )
+        counts["repo_team_permissions"] += self._upsert_repo_team_perms(
+            repo_node_id, repo_teams
+        )
+
+        collabs = self._iter_paginated(
+            f"{self._base}/repos/{full_name}/collaborators",
+            params={"affiliation": "all"},
+            record=GitHubCollaborator,
+            mask=self._field_mask(COLLABORATOR_ROWS),
+        )
+        counts["repo_collaborator_permissions"] += self._upsert_repo_collab_perms(
+            repo_node_id, collabs
+        )
+
+    # ------------------------------------------------------------------
+    # Targeted re-sync (cli.py sync --repo / --team)
+    # ------------------------------------------------------------------
+
+    def sync_entity(self, kind: str, key: str) -> dict[str, int]:
+        if kind == "repo":
+            return self._sync_one_repo(key)
+        return self._sync_one_team(key)
 
+    def _org_login(self, login: str) -> str:
+        """The configured org login matching ``login`` (case-insensitive)."""
+        for org_login in self._org_logins:
+            if org_login.lower() == login.lower():
+                return org_login
+        raise ValueError(f"GitHub org {login!r} is not in GITHUB_ORG_LOGINS")
+
+    def _sync_one_repo(self, full_name: str) -> dict[str, int]:
+        """A repository row and its team and collaborator permissions."""
+        owner, _, name = full_name.partition("/")
+        if not name:
+            raise ValueError(f"--repo expects org/name, got {full_name!r}")
+        self._org_login(owner)
+        repo = next(self._iter_paginated(f"{self._base}/repos/{owner}/{name}"))
+        # The owner of an org repository is the organisation
+        org_node_id = repo["owner"]["node_id"]
+        repo_node_id = repo["node_id"]
+        repo = _as_listed(repo, _REPO_FULL_FIELDS)
+        mask = self._field_mask(REPO_ROWS)
+        counts = {
+            "repos": self._upsert_repos(
+                org_node_id, [mask.apply(repo) if mask else repo]
+            ),
+            "repo_team_permissions": 0,
+            "repo_collaborator_permissions": 0,
+        }
+        self._sync_repo_perms(repo["full_name"], repo_node_id, counts)
+        self._sweep_scope("github_repo_team_permissions", repo_node_id=repo_node_id)
+        self._sweep_scope(
+            "github_repo_collaborator_permissions", repo_node_id=repo_node_id
+        )
+        self.grant_scopes.append(GrantScope("github", resource_ids=(repo_node_id,)))
+        return counts
+
+    def _sync_one_team(self, key: str) -> dict[str, int]:
+        """A team row, its members and its repository permissions.
+
+        ``key`` is ``org/slug``, or a bare slug with a single configured org.
+        """
+        login, _, slug = key.rpartition("/")
+        if login:
+            org_login = self._org_login(login)
+        elif len(self._org_logins) == 1:
+            org_login = self._org_logins[0]
+        else:
+            raise ValueError(f"--team expects org/slug with several orgs, got {key!r}")
+        org = next(self._iter_paginated(f"{self._base}/orgs/{org_login}"))
+        team = _as_listed(
+            next(self._iter_paginated(f"{self._base}/orgs/{org_login}/teams/{slug}")),
+            _TEAM_FULL_FIELDS,
+        )
+        mask = self._field_mask(TEAM_ROWS)
+        if mask is not None:
+            team = mask.apply(team)
+        team_node_id = team["node_id"]
+        counts = {
+            "teams": self._upsert_teams(org["node_id"], [team]),
+            "team_memberships": self._sync_team_members(
+                org_login, team["slug"], team_node_id
+            ),
+        }
+        repos = self._iter_paginated(
+            f"{self._base}/orgs/{org_login}/teams/{team['slug']}/repos",
+            record=GitHubRepo,
+        )
+        counts["repo_team_permissions"] = self._upsert_team_repo_perms(
+            team_node_id, repos
+        )
+        self._sweep_scope("github_team_memberships", team_node_id=team_node_id)
+        self._sweep_scope("github_repo_team_permissions", team_node_id=team_node_id)
+        self.grant_scopes.append(GrantScope("github", subject_ids=(team_node_id,)))
         return counts
 
     def _upsert_org(self, org: dict) -> int:
@@ -154,35 +573,20 @@ class GitHubOrgProvider(BaseProvider):
                 org["login"],
                 org.get("name"),
                 org.get("email"),
-                json.dumps(org),
+                raw_json(org),
                 "NOW()",
             )
         ]
-        with self.db.transaction() as cur:
-            return self.db.upsert_batch(
-                cur,
-                "github_organisations",
-                columns,
-                rows,
-                ["tenant_id", "node_id"],
-                ["login", "name", "email", "raw_response"],
-            )
+        return self._upsert(
+            "github_organisations",
+            columns,
+            rows,
+            ["tenant_id", "node_id"],
+            ["login", "name", "email", "raw_response"],
+        )
 
-    def _upsert_users(self, users: list[dict]) -> int:
+    def _upsert_users(self, users: Iterable[dict]) -> int:
         total = 0
-        columns = [
-            "tenant_id",
-            "github_id",
-            "node_id",
-            "login",
-            "name",
-            "email",
-            "type",
-            "site_admin",
-            "avatar_url",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "node_id"]
         update = [
             "login",
@@ -193,81 +597,32 @@ class GitHubOrgProvider(BaseProvider):
             "avatar_url",
             "raw_response",
         ]
-        for batch in self._batch_rows(users):
-            rows = []
-            for u in batch:
-                # Fetch full user to get name/email
-                rows.append(
-                    (
-                        self.tenant_id,
-                        u["id"],
-                        u["node_id"],
-                        u["login"],
-                        u.get("name"),
-                        u.get("email"),
-                        u.get("type", "User"),
-                        u.get("site_admin", False),
-                        u.get("avatar_url"),
-                        json.dumps(u),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "github_users", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(users, table="github_users"):
+            total += self._upsert(
+                "github_users",
+                USER_ROWS.columns,
+                USER_ROWS.rows(batch, self.tenant_id),
+                conflict,
+                update,
+            )
         return total
 
-    def _upsert_org_memberships(self, org_node_id: str, members: list[dict]) -> int:
+    def _upsert_org_memberships(self, org_node_id: str, members: Iterable[dict]) -> int:
         total = 0
-        columns = [
-            "tenant_id",
-            "org_node_id",
-            "user_node_id",
-            "role",
-            "state",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "org_node_id", "user_node_id"]
         update = ["role", "state", "raw_response"]
-        for batch in self._batch_rows(members):
-            rows = []
-            for m in batch:
-                rows.append(
-                    (
-                        self.tenant_id,
-                        org_node_id,
-                        m["node_id"],
-                        m.get("role", "member"),
-                        "active",
-                        json.dumps(m),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "github_org_memberships", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(members, table="github_org_memberships"):
+            total += self._upsert(
+                "github_org_memberships",
+                ORG_MEMBERSHIP_ROWS.columns,
+                ORG_MEMBERSHIP_ROWS.rows(batch, self.tenant_id, org_node_id),
+                conflict,
+                update,
+            )
         return total
 
-    def _upsert_teams(self, org_node_id: str, teams: list[dict]) -> int:
+    def _upsert_teams(self, org_node_id: str, teams: Iterable[dict]) -> int:
         total = 0
-        columns = [
-            "tenant_id",
-            "github_id",
-            "node_id",
-            "org_node_id",
-            "name",
-            "slug",
-            "description",
-            "privacy",
-            "permission",
-            "parent_team_id",
-            "parent_team_node_id",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "node_id"]
         update = [
             "org_node_id",
@@ -280,86 +635,34 @@ class GitHubOrgProvider(BaseProvider):
             "parent_team_node_id",
             "raw_response",
         ]
-        for batch in self._batch_rows(teams):
-            rows = []
-            for t in batch:
-                parent = t.get("parent") or {}
-                rows.append(
-                    (
-                        self.tenant_id,
-                        t["id"],
-                        t["node_id"],
-                        org_node_id,
-                        t["name"],
-                        t["slug"],
-                        t.get("description"),
-                        t.get("privacy"),
-                        t.get("permission"),
-                        parent.get("id"),
-                        parent.get("node_id"),
-                        json.dumps(t),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "github_teams", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(teams, table="github_teams"):
+            total += self._upsert(
+                "github_teams",
+                TEAM_ROWS.columns,
+                TEAM_ROWS.rows(batch, self.tenant_id, org_node_id),
+                conflict,
+                update,
+            )
         return total
 
-    def _upsert_team_memberships(self, team_node_id: str, members: list[dict]) -> int:
+    def _upsert_team_memberships(
+        self, team_node_id: str, members: Iterable[dict]
+    ) -> int:
         total = 0
-        columns = [
-            "tenant_id",
-            "team_node_id",
-            "user_node_id",
-            "role",
-            "state",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "team_node_id", "user_node_id"]
         update = ["role", "state", "raw_response"]
-        for batch in self._batch_rows(members):
-            rows = []
-            for m in batch:
-                rows.append(
-                    (
-                        self.tenant_id,
-                        team_node_id,
-                        m["node_id"],
-                        m.get("role", "member"),
-                        "active",
-                        json.dumps(m),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "github_team_memberships", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(members, table="github_team_memberships"):
+            total += self._upsert(
+                "github_team_memberships",
+                TEAM_MEMBERSHIP_ROWS.columns,
+                TEAM_MEMBERSHIP_ROWS.rows(batch, self.tenant_id, team_node_id),
+                conflict,
+                update,
+            )
         return total
 
-    def _upsert_repos(self, org_node_id: str, repos: list[dict]) -> int:
+    def _upsert_repos(self, org_node_id: str, repos: Iterable[dict]) -> int:
         total = 0
-        columns = [
-            "tenant_id",
-            "github_id",
-            "node_id",
-            "org_node_id",
-            "name",
-            "full_name",
-            "private",
-            "visibility",
-            "archived",
-            "default_branch",
-            "description",
-            "fork",
-            "language",
-            "pushed_at",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "node_id"]
         update = [
             "org_node_id",
@@ -375,113 +678,68 @@ class GitHubOrgProvider(BaseProvider):
             "pushed_at",
             "raw_response",
         ]
-        for batch in self._batch_rows(repos):
-            rows = []
-            for r in batch:
-                rows.append(
-                    (
-                        self.tenant_id,
-                        r["id"],
-                        r["node_id"],
-                        org_node_id,
-                        r["name"],
-                        r["full_name"],
-                        r.get("private", False),
-                        r.get("visibility"),
-                        r.get("archived", False),
-                        r.get("default_branch"),
-                        r.get("description"),
-                        r.get("fork", False),
-                        r.get("language"),
-                        r.get("pushed_at"),
-                        json.dumps(r),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "github_repositories", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(repos, table="github_repositories"):
+            total += self._upsert(
+                "github_repositories",
+                REPO_ROWS.columns,
+                REPO_ROWS.rows(batch, self.tenant_id, org_node_id),
+                conflict,
+                update,
+            )
         return total
 
-    def _upsert_repo_team_perms(self, repo_node_id: str, teams: list[dict]) -> int:
+    def _upsert_repo_team_perms(self, repo_node_id: str, teams: Iterable[dict]) -> int:
         total = 0
-        columns = [
-            "tenant_id",
-            "repo_node_id",
-            "team_node_id",
-            "permission",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "repo_node_id", "team_node_id"]
         update = ["permission", "raw_response"]
-        for batch in self._batch_rows(teams):
-            rows = []
-            for t in batch:
-                rows.append(
-                    (
-                        self.tenant_id,
-                        repo_node_id,
-                        t["node_id"],
-                        t.get("permission", "pull"),
-                        json.dumps(t),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur,
-                    "github_repo_team_permissions",
-                    columns,
-                    rows,
-                    conflict,
-                    update,
-                )
+        for batch in self._batch_rows(teams, table="github_repo_team_permissions"):
+            total += self._upsert(
+                "github_repo_team_permissions",
+                REPO_TEAM_ROWS.columns,
+                REPO_TEAM_ROWS.rows(batch, self.tenant_id, repo_node_id),
+                conflict,
+                update,
+            )
         return total
 
-    def _upsert_repo_collab_perms(self, repo_node_id: str, collabs: list[dict]) -> int:
-        total = 0
-        columns = [
-            "tenant_id",
-            "repo_node_id",
-            "user_node_id",
-            "permission",
-            "is_outside_collaborator",
-            "raw_response",
-            "last_synced_at",
-        ]
+    def _upsert_team_repo_perms(self, team_node_id: str, repos: Iterable[dict]) -> int:
+        """Permission rows of one team, for each repository it can access.
+
+        The rows come from each repository's team listing, as in a full
+        sync, so their raw_response and content_hash match and alternating
+        full and targeted runs do not rewrite them.
+        """
+        conflict = ["tenant_id", "repo_node_id", "team_node_id"]
+        update = ["permission", "raw_response"]
+        mask = self._field_mask(REPO_TEAM_ROWS)
+        rows = (
+            REPO_TEAM_ROWS.map(item, self.tenant_id, repo["node_id"])
+            for repo in repos
+            for item in self._iter_paginated(
+                f"{self._base}/repos/{repo['full_name']}/teams",
+                record=GitHubRepoTeam,
+                mask=mask,
+            )
+            if item["node_id"] == team_node_id
+        )
+        return self._upsert_rows(
+            "github_repo_team_permissions",
+            REPO_TEAM_ROWS.columns,
+            rows,
+            conflict,
+            update,
+        )
+
+    def _upsert_repo_collab_perms(
+        self, repo_node_id: str, collabs: Iterable[dict]
+    ) -> int:
         conflict = ["tenant_id", "repo_node_id", "user_node_id"]
         update = ["permission", "is_outside_collaborator", "raw_response"]
-        for batch in self._batch_rows(collabs):
-            rows = []
-            for c in batch:
-                # GitHub returns permissions as an object; pick the highest
-                perms = c.get("permissions", {})
-                permission = "read"
-                for level in ("admin", "maintain", "push", "triage", "pull"):
-                    if perms.get(level):
-                        permission = level
-                        break
-                rows.append(
-                    (
-                        self.tenant_id,
-                        repo_node_id,
-                        c["node_id"],
-                        permission,
-                        c.get("permissions", {}).get("admin", False) is False
-                        and c.get("type") != "User",
-                        json.dumps(c),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur,
-                    "github_repo_collaborator_permissions",
-                    columns,
-                    rows,
-                    conflict,
-                    update,
-                )
-        return total
+        rows = (COLLABORATOR_ROWS.map(c, self.tenant_id, repo_node_id) for c in collabs)
+        return self._upsert_rows(
+            "github_repo_collaborator_permissions",
+            COLLABORATOR_ROWS.columns,
+            rows,
+            conflict,
+            update,
+        )
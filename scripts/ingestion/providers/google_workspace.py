@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-import json
 import logging
+from typing import Any, Iterator, Optional
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
@@ -12,6 +12,10 @@ from googleapiclient.errors import HttpError
 from scripts.ingestion.base_provider import BaseProvider
 from scripts.ingestion.config import IngestionConfig
 from scripts.ingestion.db import Database
+from scripts.ingestion.grants_backfill import GrantScope
+from scripts.ingestion.projection import FieldMask
+from scripts.ingestion.rowmap import ITEM, Arg, Call, Const, Field, RowMapper
+from scripts.ingestion.serialization import dumps
 
 logger = logging.getLogger("ingestion.google_workspace")
 
@@ -21,9 +25,79 @@ SCOPES = [
     "https://www.googleapis.com/auth/admin.directory.group.member.readonly",
 ]
 
+# Table written from each Admin SDK list call (by its response collection)
+_LIST_TABLES = {
+    "users": "google_workspace_users",
+    "groups": "google_workspace_groups",
+    "members": "google_workspace_memberships",
+}
+
+USER_ROWS = RowMapper(
+    "google_workspace_users",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "google_id": Field("id"),
+        "primary_email": Field("primaryEmail"),
+        "name_full": Field("name.fullName", None, extra=True),
+        "suspended": Field("suspended", False),
+        "archived": Field("archived", False),
+        "is_admin": Field("isAdmin", False),
+        "is_delegated_admin": Field("isDelegatedAdmin", False),
+        "is_enrolled_in_2sv": Field("isEnrolledIn2Sv", False),
+        "is_enforced_in_2sv": Field("isEnforcedIn2Sv", False),
+        "customer_id": Field("customerId", None),
+        "suspension_reason": Field("suspensionReason", None),
+        "creation_time": Field("creationTime", None),
+        "last_login_time": Field("lastLoginTime", None),
+        "org_unit_path": Field("orgUnitPath", None),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    schema=("google_workspace", "User"),
+)
+
+GROUP_ROWS = RowMapper(
+    "google_workspace_groups",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "google_id": Field("id"),
+        "email": Field("email"),
+        "name": Field("name", None),
+        "description": Field("description", None),
+        "admin_created": Field("adminCreated", True),
+        "direct_members_count": Field("directMembersCount", None),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    schema=("google_workspace", "Group"),
+)
+
+MEMBERSHIP_ROWS = RowMapper(
+    "google_workspace_memberships",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "group_id": Arg("group_id"),
+        "member_id": Field("id"),
+        "member_type": Field("type", "USER"),
+        "member_email": Field("email", None),
+        "role": Field("role", "MEMBER"),
+        "status": Field("status", "ACTIVE"),
+        "raw_response": Call(dumps, ITEM),
+        "last_synced_at": Const("NOW()"),
+    },
+    args=("tenant_id", "group_id"),
+    schema=("google_workspace", "Member"),
+)
+
 
 class GoogleWorkspaceProvider(BaseProvider):
     PROVIDER_NAME = "google_workspace"
+    ENTITY_KINDS = ("group",)
+    SWEEP_TABLES = (
+        "google_workspace_users",
+        "google_workspace_groups",
+        "google_workspace_memberships",
+    )
 
     def __init__(self, config: IngestionConfig, db: Database) -> None:
         super().__init__(config, db)
@@ -31,6 +105,14 @@ class GoogleWorkspaceProvider(BaseProvider):
         if not gw:
             raise ValueError("Google Workspace config not set")
 
+        self._customer_id = gw.customer_id
+        if self.cassette is not None and self.cassette.replaying:
+            # Served from the cassette, without credentials
+            self._service = build(
+                "admin", "directory_v1", http=self.cassette.httplib2()
+            )
+            return
+
         if gw.sa_key_file:
             # Local dev / explicit service account key file
             creds = service_account.Credentials.from_service_account_file(
@@ -43,25 +125,56 @@ class GoogleWorkspaceProvider(BaseProvider):
             creds, _ = google.auth.default(scopes=SCOPES)
 
         self._creds = creds.with_subject(gw.admin_email)
-        self._customer_id = gw.customer_id
-        self._service = build("admin", "directory_v1", credentials=self._creds)
+        if self.cassette is not None:
+            # Recording: the authorised transport build() would create, wrapped
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.http import build_http
+
+            http = AuthorizedHttp(self._creds, http=build_http())
+            self._service = build(
+                "admin", "directory_v1", http=self.cassette.httplib2(http)
+            )
+        else:
+            self._service = build("admin", "directory_v1", credentials=self._creds)
 
     def sync(self) -> dict[str, int]:
         results: dict[str, int] = {}
-        results["users"] = self._sync_users()
-        results["groups"] = self._sync_groups()
-        results["memberships"] = self._sync_memberships()
+        results["users"] = self._run_step("users", self._sync_users)
+        results["groups"] = self._run_step("groups", self._sync_groups)
+        results["memberships"] = self._run_step("memberships", self._sync_memberships)
         return results
 
-    def _sync_users(self) -> int:
-        logger.info("Syncing Google Workspace users")
-        all_users: list[dict] = []
-        request = self._service.users().list(
-            customer=self._customer_id,
-            maxResults=500,
-            orderBy="email",
-            projection="full",
-        )
+    def _iter_list(
+        self,
+        resource: Any,
+        key: str,
+        missing_ok: bool = False,
+        mask: Optional[FieldMask] = None,
+        step: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Iterator[dict]:
+        """Yield the items of a paginated Admin SDK list call, page by page.
+
+        Pages are requested only as the caller consumes items.  With
+        ``missing_ok`` a 404 (e.g. a group deleted mid-sync) ends the listing
+        and excludes its table from the deletion sweep.
+        A ``mask`` is sent as the partial-response ``fields`` parameter.
+        With a checkpoint ``step`` every page's token is reported to
+        self.checkpoint, and an interrupted run's listing restarts at its
+        saved page, past the items already written.
+        """
+        if mask is not None:
+            kwargs["fields"] = mask.google_fields(key)
+        # Index of the page's first item; negative after a resume skipped some
+        index, skip = 0, 0
+        resume = self.checkpoint.resume_cursor(step) if step else None
+        if resume is not None:
+            token, skip = resume
+            index = -skip
+            if token:
+                kwargs["pageToken"] = token
+        token = kwargs.get("pageToken")
+        request = resource.list(**kwargs)
         while request is not None:
             try:
                 response = request.execute()
@@ -69,30 +182,43 @@ class GoogleWorkspaceProvider(BaseProvider):
                 if e.resp.status == 429:
                     self._rate_limit_sleep(0)
                     continue
+                if missing_ok and e.resp.status == 404:
+                    # Rows of the missing listing are left to a complete run
+                    self._mark_partial(_LIST_TABLES[key], f"{key} listing returned 404")
+                    return
+                if e.resp.status == 400 and resume is not None and resume[0]:
+                    # The saved page token expired before anything was yielded:
+                    # list from the start
+                    logger.warning("Saved %s page token rejected, restarting", key)
+                    kwargs.pop("pageToken")
+                    index, skip, token, resume = 0, 0, None, None
+                    request = resource.list(**kwargs)
+                    continue
                 raise
-            all_users.extend(response.get("users", []))
-            request = self._service.users().list_next(request, response)
+            items = response.get(key, [])
+            resume = None
+            if step is not None:
+                self.checkpoint.page(step, index, token)
+            yield from items[skip:]
+            index += len(items)
+            skip = 0
+            token = response.get("nextPageToken")
+            request = resource.list_next(request, response)
+
+    def _sync_users(self) -> int:
+        logger.info("Syncing Google Workspace users")
+        users = self._iter_list(
+            self._service.users(),
+            "users",
+            mask=self._field_mask(USER_ROWS),
+            customer=self._customer_id,
+            maxResults=500,
+            orderBy="email",
+            projection="full",
+            step="users",
+        )
 
         total = 0
-        columns = [
-            "tenant_id",
-            "google_id",
-            "primary_email",
-            "name_full",
-            "suspended",
-            "archived",
-            "is_admin",
-            "is_delegated_admin",
-            "is_enrolled_in_2sv",
-            "is_enforced_in_2sv",
-            "customer_id",
-            "suspension_reason",
-            "creation_time",
-            "last_login_time",
-            "org_unit_path",
-            "raw_response",
-            "last_synced_at",
-        ]
         conflict = ["tenant_id", "google_id"]
         update = [
             "primary_email",
@@ -111,67 +237,39 @@ class GoogleWorkspaceProvider(BaseProvider):
             "raw_response",
         ]
 
-        for batch in self._batch_rows(all_users):
-            rows = []
-            for u in batch:
-                name = u.get("name", {})
-                rows.append(
-                    (
-                        self.tenant_id,
-                        u["id"],
-                        u["primaryEmail"],
-                        name.get("fullName"),
-                        u.get("suspended", False),
-                        u.get("archived", False),
-                        u.get("isAdmin", False),
-                        u.get("isDelegatedAdmin", False),
-                        u.get("isEnrolledIn2Sv", False),
-                        u.get("isEnforcedIn2Sv", False),
-                        u.get("customerId"),
-                        u.get("suspensionReason"),
-                        u.get("creationTime"),
-                        u.get("lastLoginTime"),
-                        u.get("orgUnitPath"),
-                        json.dumps(u),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "google_workspace_users", columns, rows, conflict, update
-                )
+        for batch in self._batch_rows(
+            users, table="google_workspace_users", step="users"
+        ):
+            total += self._upsert(
+                "google_workspace_users",
+                USER_ROWS.columns,
+                USER_ROWS.rows(batch, self.tenant_id),
+                conflict,
+                update,
+            )
         logger.info("Synced %d Google Workspace users", total)
         return total
 
     def _sync_groups(self) -> int:
         logger.info("Syncing Google Workspace groups")
-        all_groups: list[dict] = []
-        request = self._service.groups().list(
-            customer=self._customer_id, maxResults=200
+        groups = self._iter_list(
+            self._service.groups(),
+            "groups",
+            mask=self._field_mask(GROUP_ROWS),
+            customer=self._customer_id,
+            maxResults=200,
+            step="groups",
         )
-        while request is not None:
-            try:
-                response = request.execute()
-            except HttpError as e:
-                if e.resp.status == 429:
-                    self._rate_limit_sleep(0)
-                    continue
-                raise
-            all_groups.extend(response.get("groups", []))
-            request = self._service.groups().list_next(request, response)
 
         total = 0
-        columns = [
-            "tenant_id",
-            "google_id",
-            "email",
-            "name",
-            "description",
-            "admin_created",
-            "direct_members_count",
-            "raw_response",
-            "last_synced_at",
-        ]
+        for batch in self._batch_rows(
+            groups, table="google_workspace_groups", step="groups"
+        ):
+            total += self._upsert_groups(batch)
+        logger.info("Synced %d Google Workspace groups", total)
+        return total
+
+    def _upsert_groups(self, groups: list[dict]) -> int:
         conflict = ["tenant_id", "google_id"]
         update = [
             "email",
@@ -181,52 +279,54 @@ class GoogleWorkspaceProvider(BaseProvider):
             "direct_members_count",
             "raw_response",
         ]
-
-        for batch in self._batch_rows(all_groups):
-            rows = []
-            for g in batch:
-                rows.append(
-                    (
-                        self.tenant_id,
-                        g["id"],
-                        g["email"],
-                        g.get("name"),
-                        g.get("description"),
-                        g.get("adminCreated", True),
-                        g.get("directMembersCount"),
-                        json.dumps(g),
-                        "NOW()",
-                    )
-                )
-            with self.db.transaction() as cur:
-                total += self.db.upsert_batch(
-                    cur, "google_workspace_groups", columns, rows, conflict, update
-                )
-        logger.info("Synced %d Google Workspace groups", total)
-        return total
+        return self._upsert(
+            "google_workspace_groups",
+            GROUP_ROWS.columns,
+            GROUP_ROWS.rows(groups, self.tenant_id),
+            conflict,
+            update,
+        )
 
     def _sync_memberships(self) -> int:
         logger.info("Syncing Google Workspace memberships")
-        # Fetch all group IDs first
-        with self.db.transaction() as cur:
-            cur.execute(
-                "SELECT google_id FROM google_workspace_groups WHERE tenant_id = %s AND deleted_at IS NULL",
-                (self.tenant_id,),
+        self._flush_writes()
+        # Stream group IDs in key order instead of loading them all up front;
+        # a resumed run starts after the last group it finished
+        where = "tenant_id = %s AND deleted_at IS NULL"
+        params: tuple = (self.tenant_id,)
+        last = self.checkpoint.key("memberships")
+        if last is not None:
+            where += " AND google_id > %s"
+            params += (last,)
+        group_ids = (
+            gid
+            for chunk in self.db.iter_keyset(
+                "google_workspace_groups",
+                ["google_id"],
+                ["google_id"],
+                where,
+                params,
+                replica=True,
             )
-            group_ids = [row[0] for row in cur.fetchall()]
+            for (gid,) in chunk
+        )
 
         total = 0
-        columns = [
-            "tenant_id",
-            "group_id",
-            "member_id",
-            "member_type",
-            "member_email",
-            "role",
-            "status",
-            "raw_response",
-            "last_synced_at",
-        ]
+        for gid in group_ids:
+            total += self._sync_group_members(gid, missing_ok=True)
+            self._finish_key("memberships", gid)
+        logger.info("Synced %d Google Workspace memberships", total)
+        return total
+
+    def _sync_group_members(self, gid: str, missing_ok: bool) -> int:
+        members = self._iter_list(
+            self._service.members(),
+            "members",
+            missing_ok=missing_ok,
+            mask=self._field_mask(MEMBERSHIP_ROWS),
+            groupKey=gid,
+            maxResults=200,
+        )
         conflict = ["tenant_id", "group_id", "member_id"]
         update = [
             "member_type",
@@ -235,47 +335,24 @@ class GoogleWorkspaceProvider(BaseProvider):
             "status",
             "raw_response",
         ]
+        rows = (MEMBERSHIP_ROWS.map(m, self.tenant_id, gid) for m in members)
+        return self._upsert_rows(
+            "google_workspace_memberships",
+            MEMBERSHIP_ROWS.columns,
+            rows,
+            conflict,
+            update,
+        )
 
-        for gid in group_ids:
-            members: list[dict] = []
-            request = self._service.members().list(groupKey=gid, maxResults=200)
-            while request is not None:
-                try:
-                    response = request.execute()
-                except HttpError as e:
-                    if e.resp.status == 429:
-                        self._rate_limit_sleep(0)
-                        continue
-                    if e.resp.status == 404:
-                        break
-                    raise
-                members.extend(response.get("members", []))
-                request = self._service.members().list_next(request, response)
-
-            for batch in self._batch_rows(members):
-                rows = []
-                for m in batch:
-                    rows.append(
-                        (
-                            self.tenant_id,
-                            gid,
-                            m["id"],
-                            m.get("type", "USER"),
-                            m.get("email"),
-                            m.get("role", "MEMBER"),
-                            m.get("status", "ACTIVE"),
-                            json.dumps(m),
-                            "NOW()",
-                        )
-                    )
-                with self.db.transaction() as cur:
-                    total += self.db.upsert_batch(
-                        cur,
-                        "google_workspace_memberships",
-                        columns,
-                        rows,
-                        conflict,
-                        update,
-                    )
-        logger.info("Synced %d Google Workspace memberships", total)
-        return total
+    def sync_entity(self, kind: str, key: str) -> dict[str, int]:
+        """Refresh one group (``--group email``) and its memberships."""
+        group = self._service.groups().get(groupKey=key).execute()
+        mask = self._field_mask(GROUP_ROWS)
+        counts = {
+            "groups": self._upsert_groups([mask.apply(group) if mask else group]),
+            "memberships": self._sync_group_members(group["id"], missing_ok=False),
+        }
+        self._sweep_scope("google_workspace_memberships", group_id=group["id"])
+        # GCP IAM bindings name groups by email
+        self.grant_scopes.append(GrantScope("gcp", subject_ids=(group["email"],)))
+        return counts
@@ -0,0 +1,233 @@
+"""Declarative row specs compiled into plain Python row builders.
+
+A RowMapper lists a table's columns in order, each with its source:
+
+  Field("name.fullName", None)   a dotted path into the API item, with a
+                                 default; without one the path is required
+                                 (``item["id"]``)
+  Arg("tenant_id")               a value passed by the caller per call
+  Const("NOW()")                 a literal
+  Call(fn, *sources)             fn applied to other sources (transforms)
+  ITEM                           the item itself (raw_response)
+
+At import time the spec is turned into the source of two functions --
+``map(item, *args)`` returning one row tuple and ``rows(items, *args)``
+returning a list of them -- built from the same ``item["id"]``,
+``item.get("suspended", False)`` expressions the hand-written builders
+used, and exec()'d once.  A row therefore costs one function call (none
+per row inside rows()) and no per-field interpretation.
+
+Missing intermediate objects on a dotted path (or null ones) read as empty,
+like the ``item.get("name", {}).get("fullName")`` idiom they replace.
+
+When providerschema/field_path_index.json is present (a repository
+checkout, not the container image) every Field path is checked against the
+spec's ``schema`` entity at compile time; ``extra=True`` marks fields the
+API returns beyond the extracted schema.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Optional
+
+FIELD_PATH_INDEX = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "..",
+    "providerschema",
+    "field_path_index.json",
+)
+
+_REQUIRED = object()
+_EMPTY = MappingProxyType({})
+
+
+class Field:
+    """A value read from the item by dotted path."""
+
+    __slots__ = ("path", "default", "extra")
+
+    def __init__(self, path: str, default: Any = _REQUIRED, extra: bool = False):
+        self.path = path
+        self.default = default
+        self.extra = extra
+
+
+class Arg:
+    """A per-call value, passed after the item in argument order."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class Const:
+    """A literal value, the same for every row."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class Call:
+    """``fn(*sources)``; plain values among the sources are literals."""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any):
+        self.fn = fn
+        self.args = tuple(a if _is_source(a) else Const(a) for a in args)
+
+
+class _Item:
+    def __repr__(self) -> str:
+        return "ITEM"
+
+
+ITEM = _Item()
+
+
+def _is_source(value: Any) -> bool:
+    return isinstance(value, (Field, Arg, Const, Call, _Item))
+
+
+@lru_cache(maxsize=1)
+def _field_paths() -> Optional[dict[str, dict[str, list[str]]]]:
+    try:
+        with open(FIELD_PATH_INDEX) as fh:
+            return json.load(fh)["field_paths"]
+    except FileNotFoundError:
+        return None
+
+
+class RowMapper:
+    """Compiled row builder for one table.
+
+    ``columns`` maps column name to source, in table column order;
+    ``args`` names the Arg values map()/rows() take after the item(s);
+    ``schema`` is a (provider, entity) pair of field_path_index.json.
+    ``paths`` lists the Field paths the row reads.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: dict[str, Any],
+        args: tuple[str, ...] = ("tenant_id",),
+        schema: Optional[tuple[str, str]] = None,
+    ) -> None:
+        self.table = table
+        self.columns = list(columns)
+        self.args = args
+        self.schema = schema
+        self.paths = tuple(dict.fromkeys(f.path for f in _fields(columns.values())))
+        self._check_paths(columns.values())
+        self.source, namespace = self._generate(list(columns.values()))
+        exec(compile(self.source, f"<rowmap {table}>", "exec"), namespace)
+        self.map: Callable[..., tuple] = namespace["map_row"]
+        self.rows: Callable[..., list[tuple]] = namespace["map_rows"]
+
+    def __call__(self, item: Any, *args: Any) -> tuple:
+        return self.map(item, *args)
+
+    def _generate(self, sources: list[Any]) -> tuple[str, dict[str, Any]]:
+        namespace: dict[str, Any] = {"_EMPTY": _EMPTY}
+        # Lookups used more than once are bound to a local on first use
+        uses: dict[tuple, int] = {}
+        for field in _fields(sources):
+            keys = tuple(field.path.split("."))
+            for key in [keys[:i] for i in range(1, len(keys))] + [_leaf_key(field)]:
+                uses[key] = uses.get(key, 0) + 1
+        locals_: dict[tuple, str] = {}
+
+        def bind(value: Any) -> str:
+            name = f"_v{len(namespace)}"
+            namespace[name] = value
+            return name
+
+        def reuse(key: tuple, code: str) -> str:
+            if uses.get(key, 0) < 2:
+                return code
+            if key in locals_:
+                return locals_[key]
+            name = locals_[key] = f"_l{len(locals_)}"
+            return f"({name} := {code})"
+
+        def expr(source: Any) -> str:
+            if isinstance(source, Field):
+                *parents, leaf = source.path.split(".")
+                code = "item"
+                for i, key in enumerate(parents, 1):
+                    code = reuse(tuple(parents[:i]), f"({code}.get({key!r}) or _EMPTY)")
+                if source.default is _REQUIRED:
+                    code = f"{code}[{leaf!r}]"
+                elif source.default is None:
+                    code = f"{code}.get({leaf!r})"
+                else:
+                    code = f"{code}.get({leaf!r}, {literal(source.default)})"
+                return reuse(_leaf_key(source), code)
+            if isinstance(source, Arg):
+                if source.name not in self.args:
+                    raise ValueError(
+                        f"{self.table}: Arg {source.name!r} not in args {self.args}"
+                    )
+                return source.name
+            if isinstance(source, Const):
+                return literal(source.value)
+            if isinstance(source, Call):
+                return f"{bind(source.fn)}({', '.join(map(expr, source.args))})"
+            if source is ITEM:
+                return "item"
+            raise TypeError(f"{self.table}: not a row source: {source!r}")
+
+        def literal(value: Any) -> str:
+            if value is None or isinstance(value, (bool, int, str)):
+                return repr(value)
+            return bind(value)
+
+        row = f"({', '.join(expr(s) for s in sources)},)"
+        params = "".join(f", {name}" for name in self.args)
+        source = (
+            f"def map_row(item{params}):\n"
+            f"    return {row}\n"
+            f"\n"
+            f"def map_rows(items{params}):\n"
+            f"    return [{row} for item in items]\n"
+        )
+        return source, namespace
+
+    def _check_paths(self, sources: Iterable[Any]) -> None:
+        index = _field_paths()
+        if self.schema is None or index is None:
+            return
+        provider, entity = self.schema
+        try:
+            known = set(index[provider][entity])
+        except KeyError:
+            raise ValueError(
+                f"{self.table}: no schema {provider}/{entity} in field_path_index"
+            ) from None
+        for field in _fields(sources):
+            if not field.extra and field.path not in known:
+                raise ValueError(
+                    f"{self.table}: {field.path!r} is not a {provider}/{entity} "
+                    "field (pass extra=True for fields outside the schema)"
+                )
+
+
+def _leaf_key(field: Field) -> tuple:
+    return (*field.path.split("."), repr(field.default))
+
+
+def _fields(sources: Iterable[Any]) -> Iterable[Field]:
+    for source in sources:
+        if isinstance(source, Field):
+            yield source
+        elif isinstance(source, Call):
+            yield from _fields(source.args)
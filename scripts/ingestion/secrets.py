@@ -116,3 +116,18 @@ def resolve_database_url() -> str:
     password = resolve_secret(password)
 
     return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+
+
+def resolve_shard_map() -> dict[str, str]:
+    """Resolve DB_SHARD_MAP (tenant_id -> DSN) with cloud secret support.
+
+    The value is a JSON object, or "@/path/to/file.json" holding one.  Each
+    DSN may itself be a secret reference.  Unset means no sharding.
+    """
+    raw = os.environ.get("DB_SHARD_MAP", "").strip()
+    if not raw:
+        return {}
+    if raw.startswith("@"):
+        with open(raw[1:]) as fh:
+            raw = fh.read()
+    return {tenant: resolve_secret(dsn) for tenant, dsn in json.loads(raw).items()}
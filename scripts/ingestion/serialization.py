@@ -0,0 +1,53 @@
+"""JSON encoding (and decoding) of provider payloads for row building.
+
+Every provider row carries one or more JSONB values (raw_response, labels).
+dumps() encodes them with orjson when it is installed and with the standard
+library otherwise.  Both paths produce the same compact text -- no spaces
+after separators, non-ASCII kept as is, datetimes as ISO 8601 -- so a row's
+content_hash and raw_response digest do not depend on which one ran.
+
+orjson returns UTF-8 bytes.  They are decoded to str once here rather than
+handed to the driver: psycopg2 binds bytes as bytea, not as JSON text, and
+the decode is a validated copy rather than a second encode.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+# Name of the active encoder, reported by the serialization benchmark
+ENCODER = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """Fallback for types the encoders do not handle natively."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def dumps(value: Any) -> str:
+    """Encode ``value`` as compact JSON text for a JSONB column."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS).decode()
+    return _encoder.encode(value)
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON text or UTF-8 bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,139 @@
+"""Memory-budgeted row buffer that spills to a local temp file.
+
+BaseProvider._upsert_rows has to hold a table's whole row set when it fans
+it out over several writer connections (Database.parallel_upsert partitions
+by key).  A 200k-member group or a 50k-repo org would then sit in memory at
+once, which a 512 MB Lambda or Cloud Run task cannot afford.
+
+RowBuffer keeps appended rows in a list until the process RSS crosses
+``budget_bytes``.  From then on the rows held so far, and every row after
+them, go to a gzip-compressed temp file in blocks of ``block_rows`` (one
+JSON line per block).  Iterating the buffer streams the spilled rows back
+from disk in append order, followed by any rows still in memory.  The file
+is unlinked when the buffer is closed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+import resource
+import sys
+import tempfile
+from typing import IO, Iterable, Iterator, Optional
+
+from scripts.ingestion.serialization import dumps, loads
+
+logger = logging.getLogger("ingestion.spill")
+
+# Rows appended between two RSS checks
+_CHECK_EVERY = 1000
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process.
+
+    Read from /proc on Linux (Lambda, Cloud Run, containers).  Elsewhere the
+    peak RSS is used, which overestimates and so spills early, never late.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RowBuffer:
+    """Append-only row buffer; ``budget_bytes`` 0 never spills."""
+
+    def __init__(
+        self,
+        budget_bytes: int = 0,
+        directory: Optional[str] = None,
+        block_rows: int = 1000,
+        label: str = "rows",
+    ) -> None:
+        self.budget_bytes = budget_bytes
+        self.directory = directory
+        self.block_rows = block_rows
+        self.label = label
+        self.rows: list[tuple] = []
+        self.spilled_rows = 0
+        self._count = 0
+        self._file: Optional[IO[bytes]] = None
+        self._gzip: Optional[gzip.GzipFile] = None
+
+    def __enter__(self) -> RowBuffer:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def append(self, row: tuple) -> None:
+        self.rows.append(row)
+        self._count += 1
+        if self._file is not None:
+            if len(self.rows) >= self.block_rows:
+                self._write_block()
+        elif (
+            self.budget_bytes
+            and self._count % _CHECK_EVERY == 0
+            and rss_bytes() > self.budget_bytes
+        ):
+            self._spill()
+
+    def extend(self, rows: Iterable[tuple]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def __iter__(self) -> Iterator[tuple]:
+        """Yield every row in append order; no appends once started."""
+        if self._gzip is not None:
+            self._gzip.close()
+            self._gzip = None
+            self._file.seek(0)
+            with gzip.GzipFile(fileobj=self._file, mode="rb") as fh:
+                for line in fh:
+                    for row in loads(line):
+                        yield tuple(row)
+        yield from self.rows
+
+    def close(self) -> None:
+        """Drop the rows and delete the spill file."""
+        self.rows = []
+        if self._gzip is not None:
+            self._gzip.close()
+            self._gzip = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _spill(self) -> None:
+        # An anonymous temp file: unlinked already, so a crash leaves nothing
+        self._file = tempfile.TemporaryFile(
+            prefix="ingestion-spill-", dir=self.directory
+        )
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode="wb", compresslevel=1)
+        logger.info(
+            "RSS above %d MiB; spilling %s to disk after %d rows",
+            self.budget_bytes // 2**20,
+            self.label,
+            self._count,
+        )
+        while self.rows:
+            self._write_block()
+
+    def _write_block(self) -> None:
+        block = self.rows[: self.block_rows]
+        del self.rows[: self.block_rows]
+        self._gzip.write(dumps(block).encode() + b"\n")
+        self.spilled_rows += len(block)
@@ -0,0 +1,241 @@
+"""On-disk write-ahead spool between provider fetches and database writes.
+
+With INGESTION_SPOOL_DIR set, BaseProvider._upsert appends each prepared
+batch to a gzip-compressed, append-only segment file and returns at once;
+a writer thread drains sealed segments into the database in order.  API
+fetching therefore keeps its own pace while Postgres is slow, failing over
+or in a maintenance window, and batches already fetched survive a crash.
+
+Layout: one directory per (tenant, provider) holding
+``{seq:08d}.{table}.seg.gz`` files.  A segment holds batches of one table
+only (one gzip member, one JSON line per batch); it is sealed when it
+reaches ``segment_bytes`` or the next batch is for another table, so
+draining sealed segments by sequence number preserves append order.  A
+segment is deleted only after all its batches committed.  Segments left by
+a crashed process -- including the one still open, up to its last complete
+member -- are replayed first when the spool is next opened; the upserts are
+idempotent, so replaying a partially written segment is harmless.  Each
+batch carries the run_id of the run that fetched it, so the replaying run
+can report leftovers apart from its own rows.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from scripts.ingestion.serialization import dumps, loads
+
+logger = logging.getLogger("ingestion.spool")
+
+SEGMENT_SUFFIX = ".seg.gz"
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+@dataclass
+class SpoolBatch:
+    """One prepared upsert batch, as handed to Database.upsert_in_transaction."""
+
+    table: str
+    columns: list[str]
+    rows: list[tuple]
+    conflict: list[str]
+    update: list[str]
+    generation: Optional[int] = None
+    run_id: Optional[str] = None
+
+    def encode(self) -> bytes:
+        """One JSON line, encoded like live row values (serialization.dumps)."""
+        return (
+            dumps(
+                {
+                    "table": self.table,
+                    "columns": self.columns,
+                    "rows": self.rows,
+                    "conflict": self.conflict,
+                    "update": self.update,
+                    "generation": self.generation,
+                    "run_id": self.run_id,
+                }
+            ).encode()
+            + b"\n"
+        )
+
+    @classmethod
+    def decode(cls, line: bytes) -> SpoolBatch:
+        data = loads(line)
+        data["rows"] = [tuple(row) for row in data["rows"]]
+        return cls(**data)
+
+
+def read_segment(path: str) -> Iterator[SpoolBatch]:
+    """Yield the batches of a segment, stopping at a torn trailing write."""
+    try:
+        with gzip.open(path, "rb") as fh:
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                yield SpoolBatch.decode(line)
+    except (EOFError, zlib.error, gzip.BadGzipFile, ValueError) as exc:
+        logger.warning(
+            "Spool segment %s is truncated (%s); replayed up to it", path, exc
+        )
+
+
+class Spool:
+    """Append-only segment spool with a single background writer.
+
+    ``write`` persists one batch (BaseProvider passes its retried
+    Database upsert).  When it raises an error that ``is_retryable``
+    accepts, the writer keeps retrying the same batch with backoff for up to
+    ``max_stall_seconds`` before giving up; the error then surfaces from the
+    next append()/flush() and the segments stay on disk for replay.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        write: Callable[[SpoolBatch], None],
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        max_stall_seconds: float = 900.0,
+        is_retryable: Callable[[BaseException], bool] = lambda exc: False,
+    ) -> None:
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_stall_seconds = max_stall_seconds
+        self._write = write
+        self._is_retryable = is_retryable
+        self._queue: queue.Queue[Optional[str]] = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        self._open_path: Optional[str] = None
+        self._open_table: Optional[str] = None
+        self._open_fh = None
+
+        os.makedirs(directory, exist_ok=True)
+        leftovers = self._segments()
+        self._seq = (
+            int(os.path.basename(leftovers[-1]).split(".")[0]) if leftovers else 0
+        )
+        if leftovers:
+            logger.info(
+                "Replaying %d spooled segment(s) from %s", len(leftovers), directory
+            )
+        for path in leftovers:
+            self._queue.put(path)
+
+    def _segments(self) -> list[str]:
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._drain, name="spool-writer", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, batch: SpoolBatch) -> None:
+        """Durably queue one batch (flushed to the OS, fsynced when sealed)."""
+        self._raise_writer_error()
+        if self._open_fh is not None and (
+            self._open_table != batch.table
+            or self._open_fh.tell() >= self.segment_bytes
+        ):
+            self._seal()
+        if self._open_fh is None:
+            self._seq += 1
+            self._open_path = os.path.join(
+                self.directory, f"{self._seq:08d}.{batch.table}{SEGMENT_SUFFIX}"
+            )
+            self._open_table = batch.table
+            self._open_fh = open(self._open_path, "ab")
+        # One gzip member per batch: a crash can only tear the last one
+        self._open_fh.write(gzip.compress(batch.encode(), compresslevel=1))
+        self._open_fh.flush()
+
+    def flush(self) -> None:
+        """Seal the open segment and block until the writer has drained all."""
+        self._seal()
+        self._queue.join()
+        self._raise_writer_error()
+
+    def close(self) -> None:
+        """Flush, then stop the writer thread."""
+        try:
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _seal(self) -> None:
+        if self._open_fh is None:
+            return
+        os.fsync(self._open_fh.fileno())
+        self._open_fh.close()
+        self._queue.put(self._open_path)
+        self._open_fh = None
+        self._open_path = None
+        self._open_table = None
+
+    def _raise_writer_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(
+                f"Spool writer failed; segments kept in {self.directory}"
+            ) from self._error
+
+    def _drain(self) -> None:
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                if self._error is None:
+                    self._drain_segment(path)
+            except Exception as exc:
+                self._error = exc
+                logger.error("Spool writer stopped on %s: %s", path, exc)
+            finally:
+                self._queue.task_done()
+
+    def _drain_segment(self, path: str) -> None:
+        for batch in read_segment(path):
+            self._write_with_stall(batch)
+        os.remove(path)
+
+    def _write_with_stall(self, batch: SpoolBatch) -> None:
+        stalled_since: Optional[float] = None
+        attempt = 0
+        while True:
+            try:
+                self._write(batch)
+                return
+            except Exception as exc:
+                now = time.monotonic()
+                stalled_since = stalled_since or now
+                if (
+                    not self._is_retryable(exc)
+                    or now - stalled_since >= self.max_stall_seconds
+                ):
+                    raise
+                delay = random.uniform(0, min(60.0, 2.0 * (2**attempt)))
+                attempt += 1
+                logger.warning(
+                    "Database unavailable for spooled %s batch, waiting %.1fs: %s",
+                    batch.table,
+                    delay,
+                    exc,
+                )
+                time.sleep(delay)
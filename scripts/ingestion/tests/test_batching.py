@@ -0,0 +1,71 @@
+"""BatchSizeTuner convergence, bounds and warm start."""
+
+from scripts.ingestion.batching import (
+    MAX_BATCH_SIZE,
+    MIN_BATCH_SIZE,
+    BatchSizeTuner,
+    estimate_row_bytes,
+)
+
+
+def _run(tuner, table, rows_per_second, row_bytes, batches=20):
+    sizes = []
+    for _ in range(batches):
+        size = tuner.size_for(table)
+        tuner.observe(table, size, size / rows_per_second, size * row_bytes)
+        sizes.append(tuner.size_for(table))
+    return sizes
+
+
+def test_converges_to_target_duration():
+    tuner = BatchSizeTuner(500, target_seconds=1.0)
+    sizes = _run(tuner, "memberships", rows_per_second=4000, row_bytes=100)
+    assert sizes[0] == 1000  # at most doubles per batch
+    assert sizes[-1] == 4000
+    assert sizes[-3:] == [4000] * 3
+
+
+def test_shrinks_slow_tables_at_most_by_half():
+    tuner = BatchSizeTuner(2000, target_seconds=1.0)
+    sizes = _run(tuner, "users", rows_per_second=250, row_bytes=100)
+    assert sizes[0] == 1000
+    assert sizes[-1] == 250
+
+
+def test_byte_budget_caps_wide_rows():
+    tuner = BatchSizeTuner(500, target_seconds=1.0)
+    sizes = _run(tuner, "users", rows_per_second=100_000, row_bytes=64 * 1024)
+    assert sizes[-1] == 256  # 16 MiB / 64 KiB
+
+
+def test_size_stays_within_bounds():
+    tuner = BatchSizeTuner(500)
+    assert _run(tuner, "fast", 10**9, 1)[-1] == MAX_BATCH_SIZE
+    assert _run(tuner, "slow", 1, 1)[-1] == MIN_BATCH_SIZE
+
+
+def test_short_tail_batches_are_ignored():
+    tuner = BatchSizeTuner(1000)
+    tuner.observe("users", 10, 5.0, 1000)
+    assert tuner.size_for("users") == 1000
+
+
+def test_disabled_keeps_static_size():
+    tuner = BatchSizeTuner(500, enabled=False)
+    _run(tuner, "users", 10_000, 10)
+    assert tuner.size_for("users") == 500
+    assert tuner.snapshot() == {}
+
+
+def test_snapshot_warm_start():
+    tuner = BatchSizeTuner(500)
+    _run(tuner, "users", 3000, 200)
+    warm = BatchSizeTuner(500)
+    warm.load(tuner.snapshot())
+    assert warm.size_for("users") == 3000
+    warm.load({"bad": {"size": "x"}, "missing": {}})
+    assert warm.size_for("bad") == 500
+
+
+def test_estimate_row_bytes():
+    assert estimate_row_bytes([("abc", 1, None, b"xy")]) == 3 + 8 + 8 + 2
@@ -0,0 +1,86 @@
+"""Checkpoint: page cursors, skip counts and per-item resume keys."""
+
+from scripts.ingestion.checkpoint import Checkpoint
+
+
+def _listing(checkpoint, step, pages):
+    """Yield items the way the providers' paginators do (see _iter_list)."""
+    index, skip, start = 0, 0, 0
+    resume = checkpoint.resume_cursor(step)
+    if resume is not None:
+        cursor, skip = resume
+        start, index = cursor, -skip
+    for cursor in range(start, len(pages)):
+        checkpoint.page(step, index, cursor)
+        yield from pages[cursor][skip:]
+        index += len(pages[cursor])
+        skip = 0
+
+
+PAGES = [["a", "b", "c"], ["d", "e", "f"], ["g", "h"]]
+
+
+def test_advance_points_at_first_unwritten_item():
+    checkpoint = Checkpoint()
+    items = _listing(checkpoint, "users", PAGES)
+    written = [next(items) for _ in range(4)]
+    checkpoint.advance("users", len(written))
+    assert checkpoint.resume_cursor("users") == (1, 1)
+
+
+def test_resume_skips_written_items_only():
+    checkpoint = Checkpoint()
+    items = _listing(checkpoint, "users", PAGES)
+    for _ in range(5):
+        next(items)
+    checkpoint.advance("users", 5)
+
+    resumed = Checkpoint(checkpoint.as_dict())
+    assert list(_listing(resumed, "users", PAGES)) == ["f", "g", "h"]
+
+
+def test_resumed_listing_keeps_advancing_from_negative_start():
+    checkpoint = Checkpoint({"steps": {"users": {"cursor": 1, "skip": 2}}})
+    items = _listing(checkpoint, "users", PAGES)
+    assert [next(items) for _ in range(2)] == ["f", "g"]
+    # Items are counted from the resume point, not the start of the listing
+    checkpoint.advance("users", 2)
+    assert checkpoint.resume_cursor("users") == (2, 1)
+
+
+def test_advance_before_any_page_is_a_no_op():
+    checkpoint = Checkpoint()
+    checkpoint.advance("users", 10)
+    assert checkpoint.resume_cursor("users") is None
+
+
+def test_complete_clears_step_progress():
+    checkpoint = Checkpoint({"steps": {"users": {"cursor": 1, "skip": 2}}})
+    checkpoint.complete("users")
+    assert checkpoint.done("users")
+    assert checkpoint.resume_cursor("users") is None
+    assert checkpoint.as_dict()["done"] == ["users"]
+
+
+def test_unfinished_skips_items_up_to_saved_key():
+    checkpoint = Checkpoint({"steps": {"teams": {"key": "b"}}})
+    assert checkpoint.unfinished("teams", ["a", "b", "c"], ["a", "b", "c"]) == ["c"]
+    # Only the first batch holding the key is trimmed
+    assert checkpoint.unfinished("teams", ["a", "b"], ["a", "b"]) == ["a", "b"]
+
+
+def test_unfinished_returns_batches_whole_until_key_appears():
+    checkpoint = Checkpoint({"steps": {"teams": {"key": "z"}}})
+    assert checkpoint.unfinished("teams", ["a", "b"], ["a", "b"]) == ["a", "b"]
+    assert checkpoint.unfinished("teams", ["y", "z"], ["y", "z"]) == []
+
+
+def test_state_round_trip():
+    state = {
+        "generation": 7,
+        "done": ["acme/members"],
+        "steps": {"acme/teams": {"key": "infra"}},
+        "seen": {"github_users": 120},
+        "partial": {"github_teams": "listing returned 404"},
+    }
+    assert Checkpoint(state).as_dict() == state
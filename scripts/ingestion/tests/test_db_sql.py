@@ -0,0 +1,62 @@
+"""Retry classification and backoff shared by the database backends."""
+
+import pytest
+
+from scripts.ingestion.db_sql import RETRYABLE_SQLSTATES, retry_delay, sqlstate
+
+
+class _Error(Exception):
+    def __init__(self, **attrs):
+        super().__init__("error")
+        self.__dict__.update(attrs)
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        "40001",  # serialization_failure
+        "40P01",  # deadlock_detected
+        "55P03",  # lock_not_available
+        "57P01",  # admin_shutdown
+        "57P02",  # crash_shutdown
+        "57P03",  # cannot_connect_now
+        "53300",  # too_many_connections
+    ],
+)
+def test_transient_states_are_retryable(state):
+    assert state in RETRYABLE_SQLSTATES
+
+
+@pytest.mark.parametrize("state", ["23505", "23503", "42P01", "22P02", "57014"])
+def test_data_and_query_errors_are_not_retryable(state):
+    assert state not in RETRYABLE_SQLSTATES
+
+
+def test_sqlstate_reads_either_driver():
+    assert sqlstate(_Error(pgcode="40P01")) == "40P01"  # psycopg2
+    assert sqlstate(_Error(sqlstate="40001")) == "40001"  # psycopg 3
+    assert sqlstate(ValueError()) is None
+
+
+def test_retry_delay_is_full_jitter_capped(monkeypatch):
+    monkeypatch.setattr("scripts.ingestion.db_sql.random.uniform", lambda a, b: b)
+    assert [retry_delay(n, 0.5, 3.0) for n in range(5)] == [0.5, 1.0, 2.0, 3.0, 3.0]
+    for attempt in range(10):
+        assert 0 <= retry_delay(attempt, 0.5, 3.0) <= 3.0
+
+
+def test_retry_delay_lower_bound_is_zero(monkeypatch):
+    monkeypatch.setattr("scripts.ingestion.db_sql.random.uniform", lambda a, b: a)
+    assert retry_delay(4, 0.5, 3.0) == 0
+
+
+def test_database_is_retryable():
+    psycopg2 = pytest.importorskip("psycopg2")
+    from scripts.ingestion.db import Database
+
+    db = Database.__new__(Database)
+    assert db.is_retryable(_Error(pgcode="40P01"))
+    assert db.is_retryable(_Error(pgcode="08006"))  # connection_failure
+    assert not db.is_retryable(_Error(pgcode="23505"))
+    assert db.is_retryable(psycopg2.OperationalError("server closed the connection"))
+    assert not db.is_retryable(ValueError())
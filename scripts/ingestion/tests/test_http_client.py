@@ -0,0 +1,161 @@
+"""HttpClient retry policy: Retry-After, rate limits and the time budget."""
+
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from scripts.ingestion.config import HttpConfig
+from scripts.ingestion.http_client import HttpClient, retry_reason
+
+URL = "https://api.example.com/orgs/acme/members"
+
+
+def _response(status, body=b"", **headers):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    return resp
+
+
+class _Adapter(BaseAdapter):
+    """Serves queued responses (or raises queued exceptions) in order."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        resp = self.responses.pop(0)
+        if isinstance(resp, Exception):
+            raise resp
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr("scripts.ingestion.http_client.time.sleep", waits.append)
+    return waits
+
+
+def _client(responses, **config):
+    adapter = _Adapter(responses)
+    client = HttpClient(
+        HttpConfig(**config),
+        provider="test",
+        mount=lambda session: session.mount("https://", adapter),
+    )
+    return client, adapter
+
+
+def test_retry_after_seconds_is_honoured(sleeps):
+    client, adapter = _client([_response(429, **{"Retry-After": "7"}), _response(200)])
+    assert client.get(URL).status_code == 200
+    assert sleeps == [7.0]
+    assert adapter.sent == 2
+
+
+def test_retry_after_http_date(sleeps):
+    when = formatdate(time.time() + 30, usegmt=True)
+    client, _ = _client([_response(503, **{"Retry-After": when}), _response(200)])
+    assert client.get(URL).status_code == 200
+    assert 25 <= sleeps[0] <= 30
+
+
+def test_rate_limit_reset_header(sleeps):
+    reset = str(int(time.time()) + 40)
+    client, _ = _client(
+        [
+            _response(
+                403, **{"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}
+            ),
+            _response(200),
+        ]
+    )
+    assert client.get(URL).status_code == 200
+    assert 35 <= sleeps[0] <= 40
+
+
+def test_secondary_rate_limit_waits_at_least_a_minute(sleeps):
+    body = b'{"message": "You have exceeded a secondary rate limit."}'
+    client, _ = _client([_response(403, body), _response(200)])
+    assert client.get(URL).status_code == 200
+    assert sleeps[0] >= 60
+
+
+def test_wait_is_capped_by_max_wait(sleeps):
+    client, _ = _client(
+        [_response(429, **{"Retry-After": "600"}), _response(200)],
+        max_wait_seconds=5,
+    )
+    assert client.get(URL).status_code == 200
+    assert sleeps == [5]
+
+
+def test_wait_past_budget_returns_last_response(sleeps):
+    client, adapter = _client(
+        [_response(429, **{"Retry-After": "30"}), _response(200)],
+        budget_seconds=10,
+    )
+    assert client.get(URL).status_code == 429
+    assert sleeps == []
+    assert adapter.sent == 1
+
+
+def test_retries_run_out(sleeps):
+    client, adapter = _client(
+        [_response(502)] * 3, retry_attempts=2, retry_max_delay=0.1
+    )
+    assert client.get(URL).status_code == 502
+    assert len(sleeps) == 2
+    assert adapter.sent == 3
+
+
+def test_last_connection_error_is_raised(sleeps):
+    client, _ = _client(
+        [requests.ConnectionError("reset")] * 2, retry_attempts=1, retry_max_delay=0.1
+    )
+    with pytest.raises(requests.ConnectionError):
+        client.get(URL)
+    assert len(sleeps) == 1
+
+
+def test_non_idempotent_requests_are_not_retried(sleeps):
+    client, adapter = _client([_response(503), _response(200)])
+    assert client.request("POST", URL).status_code == 503
+    assert adapter.sent == 1
+
+
+def test_metrics_count_retries(sleeps):
+    client, _ = _client([_response(429, **{"Retry-After": "1"}), _response(200)])
+    client.get(URL)
+    stats = client.metrics.snapshot()["/orgs/acme/members"]
+    assert stats["errors"] == 1
+    assert stats["retries"] == {"throttled": 1}
+
+
+@pytest.mark.parametrize(
+    "resp, reason",
+    [
+        (_response(403, **{"X-RateLimit-Remaining": "0"}), "rate_limit"),
+        (_response(429), "throttled"),
+        (_response(403, b"Resource not accessible by integration"), None),
+        (_response(403, **{"Retry-After": "5"}), "secondary_rate_limit"),
+        (_response(500), "http_500"),
+        (_response(404), None),
+    ],
+)
+def test_retry_reason(resp, reason):
+    assert retry_reason(resp) == reason
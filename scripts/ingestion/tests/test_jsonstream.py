@@ -0,0 +1,73 @@
+"""iter_array_items over bodies split at arbitrary points."""
+
+import json
+
+import pytest
+
+from scripts.ingestion import jsonstream
+from scripts.ingestion.jsonstream import iter_array_items, raw_json, record_type
+
+BODY = json.dumps(
+    [
+        {"id": 1, "login": 'octo"cat', "bio": "line\nbreak ] , ["},
+        {"id": 2, "name": "café ☃", "tags": ["a", "b"]},
+        [3, 4],
+        5,
+        {"id": 6, "escaped": "\\u005d \\\\"},
+    ],
+    ensure_ascii=False,
+).encode()
+
+
+def _split(body, size):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(BODY)])
+def test_items_survive_any_split(size):
+    items = list(iter_array_items(_split(BODY, size)))
+    values = [value for _, value in items]
+    # Scalars are skipped; objects and nested arrays are kept
+    assert values == [v for v in json.loads(BODY) if isinstance(v, (dict, list))]
+    for text, value in items:
+        assert json.loads(text) == value
+
+
+def test_small_slices(monkeypatch):
+    monkeypatch.setattr(jsonstream, "_SLICE_BYTES", 3)
+    values = [value for _, value in iter_array_items([BODY])]
+    assert values[1]["name"] == "café ☃"
+
+
+def test_text_is_the_original_element():
+    body = b'[ {"a" : 1 ,"b":"\\u00e9"} ,\n{"c":[]}]'
+    assert [text for text, _ in iter_array_items(_split(body, 4))] == [
+        '{"a" : 1 ,"b":"\\u00e9"}',
+        '{"c":[]}',
+    ]
+
+
+def test_non_array_body_is_one_item():
+    assert list(iter_array_items([b' {"message": ', b'"Not Found"} '])) == [
+        ('{"message": "Not Found"}', {"message": "Not Found"})
+    ]
+
+
+def test_empty_array():
+    assert list(iter_array_items([b"[", b" ]"])) == []
+
+
+def test_truncated_body_raises():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array_items([b'[{"id": 1}, {"id": ']))
+
+
+def test_compact_record_keeps_raw_text():
+    User = record_type("User", ["id", "login"])
+    (raw, data), *_ = iter_array_items([BODY])
+    user = User.from_item(raw, data)
+    assert user["login"] == 'octo"cat'
+    assert user.get("name") is None
+    with pytest.raises(KeyError):
+        user["name"]
+    assert raw_json(user) == raw
@@ -0,0 +1,40 @@
+"""FieldMask allow-lists: Google partial-response masks and item trimming."""
+
+from scripts.ingestion.projection import FieldMask
+
+
+def test_google_fields_nests_dotted_paths():
+    mask = FieldMask(["id", "name.fullName", "name.familyName", "primaryEmail"])
+    assert (
+        mask.google_fields("users")
+        == "nextPageToken,users(id,primaryEmail,name(fullName,familyName))"
+    )
+
+
+def test_google_fields_whole_value_wins_over_subpaths():
+    mask = FieldMask(["name.fullName", "name", "emails.address"])
+    assert mask.google_fields("users") == "nextPageToken,users(name,emails(address))"
+
+
+def test_duplicate_paths_collapse():
+    mask = FieldMask(["id", "id", "kind"])
+    assert mask.paths == ("id", "kind")
+    assert mask.google_fields("members") == "nextPageToken,members(id,kind)"
+
+
+def test_apply_keeps_only_allow_listed_fields():
+    mask = FieldMask(["id", "owner.login", "topics"])
+    item = {
+        "id": 1,
+        "owner": {"login": "acme", "id": 9},
+        "topics": ["a"],
+        "size": 100,
+    }
+    assert mask.apply(item) == {"id": 1, "owner": {"login": "acme"}, "topics": ["a"]}
+    assert "size" in item  # the item itself is not modified
+
+
+def test_apply_projects_every_list_element():
+    mask = FieldMask(["emails.address"])
+    item = {"emails": [{"address": "a@x", "primary": True}, {"address": "b@x"}]}
+    assert mask.apply(item) == {"emails": [{"address": "a@x"}, {"address": "b@x"}]}
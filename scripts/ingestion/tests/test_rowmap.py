@@ -0,0 +1,87 @@
+"""RowMapper column sources compiled into row builders."""
+
+import pytest
+
+from scripts.ingestion.rowmap import ITEM, Arg, Call, Const, Field, RowMapper
+
+USER_ROWS = RowMapper(
+    "users",
+    {
+        "tenant_id": Arg("tenant_id"),
+        "id": Field("id"),
+        "full_name": Field("name.fullName", None),
+        "family_name": Field("name.familyName", None),
+        "suspended": Field("suspended", False),
+        "email": Call(str.lower, Field("primaryEmail")),
+        "label": Call("{}:{}".format, "user", Field("id")),
+        "provider": Const("GOOGLE"),
+        "synced_at": Const("NOW()"),
+        "raw_response": ITEM,
+    },
+)
+
+
+def test_field_paths_defaults_and_constants():
+    item = {
+        "id": "u1",
+        "name": {"fullName": "Ada Lovelace"},
+        "primaryEmail": "Ada@Example.com",
+    }
+    assert USER_ROWS(item, "t1") == (
+        "t1",
+        "u1",
+        "Ada Lovelace",
+        None,
+        False,
+        "ada@example.com",
+        "user:u1",
+        "GOOGLE",
+        "NOW()",
+        item,
+    )
+
+
+def test_missing_or_null_parent_reads_as_empty():
+    for item in (
+        {"id": "u2", "primaryEmail": "x"},
+        {"id": "u2", "name": None, "primaryEmail": "x"},
+    ):
+        row = USER_ROWS(item, "t1")
+        assert row[2] is None and row[3] is None
+
+
+def test_required_field_raises_key_error():
+    with pytest.raises(KeyError):
+        USER_ROWS({"primaryEmail": "x"}, "t1")
+
+
+def test_rows_matches_map():
+    items = [{"id": str(i), "primaryEmail": "E", "suspended": True} for i in range(3)]
+    assert USER_ROWS.rows(items, "t1") == [USER_ROWS.map(i, "t1") for i in items]
+
+
+def test_columns_and_paths():
+    assert USER_ROWS.columns[:3] == ["tenant_id", "id", "full_name"]
+    assert USER_ROWS.paths == (
+        "id",
+        "name.fullName",
+        "name.familyName",
+        "suspended",
+        "primaryEmail",
+    )
+
+
+def test_non_literal_constants_are_bound():
+    marker = object()
+    mapper = RowMapper("t", {"a": Const(marker), "b": Const(1.5)}, args=())
+    assert mapper({}) == (marker, 1.5)
+
+
+def test_unknown_arg_is_rejected():
+    with pytest.raises(ValueError, match="not in args"):
+        RowMapper("t", {"a": Arg("org")})
+
+
+def test_unknown_source_is_rejected():
+    with pytest.raises(TypeError, match="not a row source"):
+        RowMapper("t", {"a": "id"})
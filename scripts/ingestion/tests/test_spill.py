@@ -0,0 +1,47 @@
+"""RowBuffer: in-memory rows, spilling past the RSS budget, streaming back."""
+
+from datetime import datetime, timezone
+
+from scripts.ingestion import spill
+from scripts.ingestion.spill import RowBuffer
+
+ROWS = [(i, f"user {i}", None, True) for i in range(2500)]
+
+
+def test_no_budget_never_spills():
+    with RowBuffer(0) as buffer:
+        buffer.extend(ROWS)
+        assert not buffer.spilled
+        assert len(buffer) == len(ROWS)
+        assert list(buffer) == ROWS
+
+
+def test_spilled_rows_stream_back_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(spill, "rss_bytes", lambda: 2**40)
+    with RowBuffer(1, directory=str(tmp_path), block_rows=300) as buffer:
+        buffer.extend(ROWS)
+        assert buffer.spilled
+        assert len(buffer) == len(ROWS)
+        # Rows after the spill go to disk in blocks; the tail stays in memory
+        assert len(buffer.rows) < 300
+        assert buffer.spilled_rows + len(buffer.rows) == len(ROWS)
+        assert list(buffer) == ROWS
+    assert buffer.rows == []
+
+
+def test_spill_checks_rss_only_every_thousand_rows(monkeypatch):
+    calls = []
+    monkeypatch.setattr(spill, "rss_bytes", lambda: calls.append(1) or 0)
+    with RowBuffer(1) as buffer:
+        buffer.extend(ROWS)
+    assert len(calls) == len(ROWS) // 1000
+
+
+def test_spilled_values_are_encoded_like_live_rows(monkeypatch):
+    monkeypatch.setattr(spill, "rss_bytes", lambda: 2**40)
+    stamp = datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+    with RowBuffer(1, block_rows=10) as buffer:
+        buffer.extend([("a", stamp, {"k": [1]})] * 1000)
+        assert buffer.spilled
+        first = next(iter(buffer))
+    assert first == ("a", "2026-03-04T05:06:07+00:00", {"k": [1]})
@@ -0,0 +1,112 @@
+"""Spool segments: encoding round-trip, ordered drain and crash replay."""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from scripts.ingestion.spool import SEGMENT_SUFFIX, Spool, SpoolBatch, read_segment
+
+
+def _batch(table, *keys, run_id="run-1"):
+    return SpoolBatch(
+        table,
+        ["id", "name", "synced_at"],
+        [(k, f"name {k}", datetime(2026, 1, 2, tzinfo=timezone.utc)) for k in keys],
+        ["id"],
+        ["name"],
+        generation=3,
+        run_id=run_id,
+    )
+
+
+def test_batch_round_trip():
+    batch = _batch("users", "a", "b")
+    decoded = SpoolBatch.decode(batch.encode())
+    assert decoded.table == "users"
+    assert decoded.rows == [(k, f"name {k}", "2026-01-02T00:00:00+00:00") for k in "ab"]
+    assert (decoded.conflict, decoded.update) == (["id"], ["name"])
+    assert (decoded.generation, decoded.run_id) == (3, "run-1")
+
+
+def test_batch_without_run_id_decodes():
+    line = b'{"table":"t","columns":["id"],"rows":[["a"]],"conflict":["id"],"update":[],"generation":null}\n'
+    assert SpoolBatch.decode(line).run_id is None
+
+
+def test_drains_in_append_order_and_removes_segments(tmp_path):
+    written = []
+    spool = Spool(str(tmp_path), written.append, segment_bytes=1)
+    spool.start()
+    spool.append(_batch("users", "a"))
+    spool.append(_batch("users", "b"))
+    spool.append(_batch("groups", "g"))
+    spool.close()
+    assert [(b.table, b.rows[0][0]) for b in written] == [
+        ("users", "a"),
+        ("users", "b"),
+        ("groups", "g"),
+    ]
+    assert os.listdir(tmp_path) == []
+
+
+def test_crashed_segments_are_replayed_first(tmp_path):
+    crashed = Spool(str(tmp_path), lambda batch: None)
+    crashed.append(_batch("users", "a", run_id="old"))
+    crashed.append(_batch("groups", "g", run_id="old"))
+    # No close(): the writer never ran and the groups segment is still open
+    crashed._open_fh.close()
+
+    written = []
+    spool = Spool(str(tmp_path), written.append)
+    spool.start()
+    spool.append(_batch("users", "b", run_id="new"))
+    spool.close()
+    assert [(b.table, b.run_id) for b in written] == [
+        ("users", "old"),
+        ("groups", "old"),
+        ("users", "new"),
+    ]
+    # Every segment, the crashed run's included, is drained and deleted
+    assert os.listdir(tmp_path) == []
+
+
+def test_torn_trailing_write_is_dropped(tmp_path):
+    spool = Spool(str(tmp_path), lambda batch: None)
+    spool.append(_batch("users", "a"))
+    path = spool._open_path
+    first = os.path.getsize(path)
+    spool.append(_batch("users", "b"))
+    spool._open_fh.close()
+    # Cut the second member in the middle of its compressed data
+    with open(path, "r+b") as fh:
+        fh.truncate((first + os.path.getsize(path)) // 2)
+    assert [b.rows[0][0] for b in read_segment(path)] == ["a"]
+
+
+def test_retryable_errors_stall_then_write(tmp_path, monkeypatch):
+    monkeypatch.setattr("scripts.ingestion.spool.time.sleep", lambda s: None)
+    attempts = []
+
+    def write(batch):
+        attempts.append(batch)
+        if len(attempts) < 3:
+            raise ConnectionError("database restarting")
+
+    spool = Spool(str(tmp_path), write, is_retryable=lambda exc: True)
+    spool.start()
+    spool.append(_batch("users", "a"))
+    spool.close()
+    assert len(attempts) == 3
+
+
+def test_writer_error_keeps_segments(tmp_path):
+    def write(batch):
+        raise ValueError("bad row")
+
+    spool = Spool(str(tmp_path), write)
+    spool.start()
+    spool.append(_batch("users", "a"))
+    with pytest.raises(RuntimeError, match="Spool writer failed"):
+        spool.close()
+    assert [name.endswith(SEGMENT_SUFFIX) for name in os.listdir(tmp_path)] == [True]